@@ -0,0 +1,675 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio ベースの非同期メタ情報抽出機能
+"""
+
+import asyncio
+import codecs
+import http.client
+import logging
+import ssl
+from datetime import datetime
+from email.parser import BytesHeaderParser
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from .extractor import (
+    _SKIPPED,
+    DEFAULT_BASE_URL,
+    DEFAULT_USER_AGENT,
+    DeadlineExpiredError,
+    InvalidURLError,
+    MetadataParser,
+    NetworkError,
+)
+from .jsonld import JsonLdDocument, JsonLdScanner, decode_block, has_description
+from .metrics import Metrics
+from .models import EpisodeMetadata, SeriesMetadata
+from .retry import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, Deadline, RetryPolicy
+from .session import DRAIN_LIMIT, REDIRECT_STATUSES, SessionStats, _ContentDecoder
+from .synopsis import (DEFAULT_SYNOPSIS_SOURCES, SeriesPage, SynopsisSource, fill_synopses, missing_synopses,
+                       scan_sources)
+
+
+logger = logging.getLogger(__name__)
+
+# 再利用した接続がサーバー側で既に閉じられていた場合に発生する例外
+_STALE_CONNECTION_ERRORS = (ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError)
+
+_ConnectionKey = Tuple[str, str, int]
+
+_asyncio_timeout = getattr(asyncio, 'timeout', None)
+
+
+async def _with_timeout(awaitable, timeout: Optional[float]):
+    """awaitable を timeout 秒以内に完了させます（超過時は組み込みの TimeoutError を送出）。"""
+    if timeout is None:
+        return await awaitable
+    try:
+        if _asyncio_timeout is not None:
+            # Python 3.11 以降はタスクを生成しない asyncio.timeout を使う
+            async with _asyncio_timeout(timeout):
+                return await awaitable
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        # Python 3.10 以前の asyncio.TimeoutError は OSError ではないため、通信エラーとして扱える形に変換する
+        raise TimeoutError(f"{timeout:g}秒以内に応答がありませんでした")
+
+
+class AsyncHTTPResponse:
+    """AsyncHTTPSession が返すレスポンス。ボディは展開済みのバイト列として読み出します。"""
+
+    def __init__(self, session: 'AsyncHTTPSession', key: _ConnectionKey,
+                 reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 status: int, reason: str, headers: http.client.HTTPMessage, method: str, url: str):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._session = session
+        self._key = key
+        self._reader = reader
+        self._writer = writer
+        self._decoder = _ContentDecoder((headers.get('Content-Encoding') or '').strip().lower())
+        self._chunked = 'chunked' in (headers.get('Transfer-Encoding') or '').lower()
+        length = headers.get('Content-Length')
+        self._length: Optional[int] = int(length) if length and not self._chunked else None
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            self._length = 0
+            self._chunked = False
+        self._will_close = (headers.get('Connection') or '').lower() == 'close'
+        self._complete = self._length == 0
+        self._remaining = self._length
+        self._closed = False
+
+    async def iter_chunks(self, chunk_size: int = 16384) -> AsyncIterator[bytes]:
+        """展開済みのボディを少しずつ返します。
+
+        Args:
+            chunk_size: 一度に受信する最大バイト数
+
+        Yields:
+            展開済みのボディ断片
+        """
+        if self._closed:
+            return
+        try:
+            async for data in self._iter_raw(chunk_size):
+                self._session._add_bytes(len(data))
+                for decoded in self._decoder.decode(data):
+                    yield decoded
+            tail = self._decoder.flush()
+            if tail:
+                yield tail
+        except GeneratorExit:
+            # 呼び出し側が読み出しを打ち切った場合、接続の扱いは close() に委ねる
+            raise
+        except BaseException:
+            self.close(reusable=False)
+            raise
+        self.close()
+
+    async def read(self) -> bytes:
+        """ボディ全体を読み出して返します。"""
+        return b''.join([chunk async for chunk in self.iter_chunks()])
+
+    def close(self, reusable: bool = True) -> None:
+        """レスポンスを閉じ、可能であれば接続をプールへ返却します。
+
+        Args:
+            reusable: 接続を再利用してよいか。ボディを最後まで読んでいない場合は無視されます。
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if reusable and self._complete and not self._will_close:
+            self._session._release(self._key, self._reader, self._writer)
+        else:
+            self._writer.close()
+
+    async def __aenter__(self) -> 'AsyncHTTPResponse':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        reusable = exc_info[0] is None
+        if (reusable and not self._closed and not self._complete
+                and self._remaining is not None and self._remaining <= DRAIN_LIMIT):
+            # 残りがわずかであれば、接続を閉じずに読み捨てて再利用する
+            try:
+                await self._session._read(self._reader.readexactly(self._remaining))
+                self._complete = True
+            except (OSError, EOFError):
+                reusable = False
+        self.close(reusable=reusable)
+
+    async def _iter_raw(self, chunk_size: int) -> AsyncIterator[bytes]:
+        reader = self._reader
+        read = self._session._read
+        if self._chunked:
+            while True:
+                line = await read(reader.readline())
+                if not line:
+                    raise http.client.IncompleteRead(b'')
+                size = int(line.split(b';', 1)[0].strip(), 16)
+                if size == 0:
+                    # トレーラーを読み飛ばす
+                    while True:
+                        line = await read(reader.readline())
+                        if line in (b'\r\n', b'\n', b''):
+                            break
+                    break
+                remaining = size
+                while remaining:
+                    data = await read(reader.read(min(remaining, chunk_size)))
+                    if not data:
+                        raise http.client.IncompleteRead(b'', remaining)
+                    remaining -= len(data)
+                    yield data
+                await read(reader.readexactly(2))
+        elif self._length is not None:
+            while self._remaining:
+                data = await read(reader.read(min(self._remaining, chunk_size)))
+                if not data:
+                    raise http.client.IncompleteRead(b'', self._remaining)
+                self._remaining -= len(data)
+                yield data
+        else:
+            # Content-Length がない場合は接続が閉じられるまで読む
+            self._will_close = True
+            while True:
+                data = await read(reader.read(chunk_size))
+                if not data:
+                    break
+                yield data
+        self._complete = True
+
+
+class AsyncHTTPSession:
+    """ホストごとに持続的接続をプールする asyncio 版HTTPセッション"""
+
+    def __init__(self, user_agent: Optional[str] = None, pool_size: int = 16,
+                 max_redirects: int = 5, connect_timeout: Optional[float] = None,
+                 read_timeout: Optional[float] = None):
+        """初期化
+
+        Args:
+            user_agent: 送信する User-Agent ヘッダー
+            pool_size: ホストごとに保持するアイドル接続の最大数
+            max_redirects: 追従するリダイレクトの最大回数
+            connect_timeout: 接続確立（TLSハンドシェイクを含む）のタイムアウト秒数（None で無制限）
+            read_timeout: 送受信1回ごとのタイムアウト秒数（None で無制限）
+        """
+        self.user_agent = user_agent
+        self.pool_size = pool_size
+        self.max_redirects = max_redirects
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.stats = SessionStats()
+        self._pool: Dict[_ConnectionKey, List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    async def request(self, url: str, headers: Optional[Dict[str, str]] = None,
+                      method: str = 'GET') -> AsyncHTTPResponse:
+        """リクエストを送信し、レスポンスを返します（リダイレクトは自動で追従）。
+
+        Args:
+            url: リクエスト先のURL（http/https）
+            headers: 追加のリクエストヘッダー
+            method: HTTPメソッド
+
+        Returns:
+            AsyncHTTPResponse。呼び出し側でボディを読み切るか close() する必要があります。
+
+        Raises:
+            ValueError: 対応していないスキームの場合
+            OSError, http.client.HTTPException: 通信エラーの場合
+        """
+        for _ in range(self.max_redirects + 1):
+            response = await self._send(url, headers, method)
+            location = response.headers.get('Location')
+            if response.status not in REDIRECT_STATUSES or not location:
+                return response
+            await response.read()
+            url = urljoin(url, location)
+            if response.status == 303:
+                method = 'GET'
+        return response
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        """GETリクエストを送信し、ステータスコードと展開済みボディを返します。"""
+        async with await self.request(url, headers) as response:
+            return response.status, await response.read()
+
+    def close(self) -> None:
+        """プール内のすべての接続を閉じます。"""
+        pool, self._pool = self._pool, {}
+        for connections in pool.values():
+            for _, writer in connections:
+                writer.close()
+
+    async def __aenter__(self) -> 'AsyncHTTPSession':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    async def _send(self, url: str, headers: Optional[Dict[str, str]], method: str) -> AsyncHTTPResponse:
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"対応していないURLです: {url}")
+        default_port = 443 if parts.scheme == 'https' else 80
+        key = (parts.scheme, parts.hostname, parts.port or default_port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        host_header = parts.hostname if key[2] == default_port else f'{parts.hostname}:{key[2]}'
+        request_headers = {'Host': host_header, 'Accept-Encoding': 'gzip, deflate'}
+        if self.user_agent:
+            request_headers['User-Agent'] = self.user_agent
+        if headers:
+            request_headers.update(headers)
+        lines = [f'{method} {path} HTTP/1.1'] + [f'{name}: {value}' for name, value in request_headers.items()]
+        payload = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1', errors='strict')
+
+        reader, writer, reused = await self._acquire(key)
+        try:
+            response = await self._exchange(key, reader, writer, payload, method, url)
+        except _STALE_CONNECTION_ERRORS + (http.client.RemoteDisconnected,):
+            writer.close()
+            if not reused:
+                raise
+            # サーバー側で閉じられたkeep-alive接続だったため、新しい接続で一度だけ再送する
+            reader, writer, _ = await self._acquire(key, fresh=True)
+            try:
+                response = await self._exchange(key, reader, writer, payload, method, url)
+            except BaseException:
+                writer.close()
+                raise
+        except BaseException:
+            writer.close()
+            raise
+
+        self.stats.requests += 1
+        return response
+
+    async def _exchange(self, key: _ConnectionKey, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        payload: bytes, method: str, url: str) -> AsyncHTTPResponse:
+        writer.write(payload)
+        await self._read(writer.drain())
+
+        status_line = await self._read(reader.readline())
+        if not status_line:
+            raise http.client.RemoteDisconnected('Remote end closed connection without response')
+        try:
+            version, status, *reason = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+            status_code = int(status)
+        except ValueError:
+            raise http.client.BadStatusLine(status_line.decode('latin-1', errors='replace'))
+        if not version.startswith('HTTP/'):
+            raise http.client.BadStatusLine(status_line.decode('latin-1', errors='replace'))
+
+        header_lines = []
+        while True:
+            line = await self._read(reader.readline())
+            if line in (b'\r\n', b'\n', b''):
+                break
+            header_lines.append(line)
+        headers = BytesHeaderParser(_class=http.client.HTTPMessage).parsebytes(b''.join(header_lines))
+        return AsyncHTTPResponse(self, key, reader, writer, status_code, reason[0] if reason else '',
+                                 headers, method, url)
+
+    async def _acquire(self, key: _ConnectionKey, fresh: bool = False):
+        if not fresh:
+            idle = self._pool.get(key)
+            while idle:
+                reader, writer = idle.pop()
+                if not reader.at_eof() and not writer.is_closing():
+                    self.stats.connections_reused += 1
+                    return reader, writer, True
+                writer.close()
+
+        scheme, host, port = key
+        ssl_context = None
+        if scheme == 'https':
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            ssl_context = self._ssl_context
+        reader, writer = await _with_timeout(asyncio.open_connection(host, port, ssl=ssl_context),
+                                             self.connect_timeout)
+        self.stats.connections_opened += 1
+        return reader, writer, False
+
+    def _release(self, key: _ConnectionKey, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        idle = self._pool.setdefault(key, [])
+        if len(idle) < self.pool_size:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+
+    def _add_bytes(self, count: int) -> None:
+        self.stats.bytes_received += count
+
+    def _read(self, awaitable):
+        return _with_timeout(awaitable, self.read_timeout)
+
+
+class AsyncAbemaMetadataExtractor(MetadataParser):
+    """AbemaTVからメタ情報を抽出する asyncio 版クラス
+
+    1つのイベントループ上で、セマフォで上限を設けた多数のページ取得を並行して実行します。
+    """
+
+    def __init__(self, user_agent: Optional[str] = None, max_concurrency: int = 16,
+                 session: Optional[AsyncHTTPSession] = None, stream_synopsis: bool = True,
+                 base_url: str = DEFAULT_BASE_URL,
+                 connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 series_deadline: Optional[float] = None,
+                 metrics: Optional[Metrics] = None,
+                 synopsis_sources: Optional[Sequence[SynopsisSource]] = None):
+        """初期化
+
+        Args:
+            user_agent: 使用するユーザーエージェント文字列。省略時はデフォルトを使用。
+            max_concurrency: 同時に実行するページ取得の最大数
+            session: 共有する非同期HTTPセッション。省略時は新規作成。
+            stream_synopsis: True の場合、あらすじ取得時に必要な JSON-LD を受信した時点で打ち切る
+            base_url: 取得対象とするサイトのベースURL（テスト用のローカルサーバー等を指定可能）
+            connect_timeout: 接続確立のタイムアウト秒数（session を省略した場合に使用）
+            read_timeout: 受信待ちのタイムアウト秒数（session を省略した場合に使用）
+            retry_policy: リトライ間隔を決めるポリシー。省略時はジッター付き指数バックオフ。
+            series_deadline: 1シリーズの抽出に許容する秒数。超過した時点で残りのあらすじ取得を
+                スキップします（None で無期限）。
+            metrics: 処理段階ごとの所要時間やカウンターを記録する Metrics。省略時は新規作成。
+            synopsis_sources: 個別ページを取得する前に、あらすじをまとめて取り出す取得元のリスト
+                （省略時は既定の取得元、空のリストですべての話を個別ページから取得）
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency は1以上を指定してください: {max_concurrency}")
+        self.user_agent = user_agent or DEFAULT_USER_AGENT
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.max_concurrency = max_concurrency
+        self.session = session or AsyncHTTPSession(user_agent=self.user_agent, pool_size=max_concurrency,
+                                                   connect_timeout=connect_timeout, read_timeout=read_timeout)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.series_deadline = series_deadline
+        self.metrics = metrics or Metrics()
+        self.stream_synopsis = stream_synopsis
+        self.synopsis_sources = list(DEFAULT_SYNOPSIS_SOURCES if synopsis_sources is None else synopsis_sources)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def collect_metrics(self) -> Dict[str, Any]:
+        """セッションの統計をゲージとして反映し、すべての計測値を返します。
+
+        Returns:
+            Metrics.snapshot() の辞書
+        """
+        stats = self.session.stats
+        self.metrics.set_gauge('session.requests', stats.requests)
+        self.metrics.set_gauge('session.connections_opened', stats.connections_opened)
+        self.metrics.set_gauge('session.connections_reused', stats.connections_reused)
+        self.metrics.set_gauge('session.bytes_received', stats.bytes_received)
+        return self.metrics.snapshot()
+
+    def close(self) -> None:
+        """セッションが保持している接続をすべて閉じます。"""
+        self.session.close()
+
+    async def __aenter__(self) -> 'AsyncAbemaMetadataExtractor':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    async def fetch_page(self, url: str, retries: int = 3, deadline: Optional[Deadline] = None) -> str:
+        """指定されたURLのウェブページを取得します（リトライ機能付き）。
+
+        Args:
+            url: 取得対象のURL
+            retries: 通信失敗時の最大リトライ回数
+            deadline: 処理期限。期限内に再試行できない場合はリトライせずに失敗します。
+
+        Returns:
+            HTMLコンテンツ文字列
+
+        Raises:
+            InvalidURLError: URLが無効、またはページが存在しない(404)場合
+            NetworkError: 通信エラーが解決しない場合
+        """
+        self._validate_url(url)
+
+        async def consume(response):
+            return await response.read()
+
+        with self.metrics.time('fetch'):
+            body = await self._request(url, retries, consume, deadline)
+        self.metrics.observe('page_bytes', len(body))
+        with self.metrics.time('decode'):
+            return body.decode('utf-8')
+
+    async def stream_jsonld(self, url: str, until: Callable[[Any], bool], retries: int = 1,
+                            deadline: Optional[Deadline] = None) -> JsonLdDocument:
+        """ページを逐次受信しながら JSON-LD ブロックを解析し、条件を満たした時点で受信を打ち切ります。
+
+        Args:
+            url: 取得対象のURL
+            until: デコード済みのブロックを受け取り、受信を終了してよければ True を返す関数
+            retries: 通信失敗時の最大リトライ回数
+            deadline: 処理期限。期限内に再試行できない場合はリトライせずに失敗します。
+
+        Returns:
+            打ち切り時点までに受信したブロックからなる JsonLdDocument
+        """
+        self._validate_url(url)
+
+        async def consume(response):
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            scanner = JsonLdScanner()
+            blocks = []
+            chunks = response.iter_chunks()
+            try:
+                async for chunk in chunks:
+                    for text in scanner.feed(decoder.decode(chunk)):
+                        block = decode_block(text)
+                        blocks.append(block)
+                        # 必要なブロックが揃った時点で残りを読まずに接続を閉じる
+                        if block is not None and until(block):
+                            return blocks
+            finally:
+                await chunks.aclose()
+            return blocks
+
+        with self.metrics.time('fetch'):
+            return JsonLdDocument(await self._request(url, retries, consume, deadline))
+
+    async def fetch_synopsis(self, episode_url: str, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """個別エピソードページからあらすじを取得します。
+
+        Args:
+            episode_url: エピソードのURL
+            deadline: 処理期限。同時実行数の空きを待つ間に期限を過ぎた場合は取得しません。
+
+        Returns:
+            あらすじ文字列。取得失敗時は None。
+        """
+        synopsis = await self._fetch_synopsis(episode_url, deadline)
+        return None if synopsis is _SKIPPED else synopsis
+
+    async def _fetch_synopsis(self, episode_url: str, deadline: Optional[Deadline]) -> Any:
+        # fetch_synopsis と同じだが、期限切れのため取得しなかった場合は _SKIPPED を返す
+        if deadline is not None and deadline.expired():
+            return _SKIPPED
+        try:
+            with self.metrics.time('synopsis'):
+                # あらすじ取得失敗は致命的ではないのでリトライ少なめ
+                if self.stream_synopsis:
+                    content = await self.stream_jsonld(episode_url, has_description, retries=1, deadline=deadline)
+                else:
+                    content = await self.fetch_page(episode_url, retries=1, deadline=deadline)
+                return self.extract_synopsis(content)
+        except asyncio.CancelledError:
+            raise
+        except DeadlineExpiredError:
+            # 同時実行数の空きを待つ間に期限を過ぎた
+            return _SKIPPED
+        except Exception as e:
+            self.metrics.increment('synopsis_failures')
+            logger.debug("あらすじを取得できませんでした: %s (%s)", episode_url, e, extra={'url': episode_url})
+            return None
+
+    async def extract_all_metadata(self, url: str, include_synopsis: bool = True,
+                                   on_series: Optional[Callable[[SeriesMetadata], None]] = None,
+                                   on_episode: Optional[Callable[[EpisodeMetadata], None]] = None) -> SeriesMetadata:
+        """シリーズURLからすべてのメタデータを抽出します。
+
+        Args:
+            url: シリーズのURL
+            include_synopsis: 各話のあらすじを取得するかどうか
+            on_series: シリーズページの解析後に一度だけ呼び出すコールバック
+            on_episode: 各エピソードの処理が終わるたびに話数順で呼び出すコールバック
+
+        series_deadline が設定されている場合、その秒数を超えた時点で残りのあらすじ取得をスキップします。
+
+        Returns:
+            抽出された全データを含む SeriesMetadata オブジェクト
+
+        Raises:
+            InvalidURLError: URLが無効な場合
+            NetworkError: 通信エラーの場合
+        """
+        with self.metrics.time('series'):
+            deadline = Deadline(self.series_deadline)
+            content = await self.fetch_page(url, deadline=deadline)
+            with self.metrics.time('jsonld_scan'):
+                document = JsonLdDocument.parse(content)
+            with self.metrics.time('episode_parse'):
+                metadata = SeriesMetadata(
+                    title=self.extract_series_title(document),
+                    source_url=url,
+                    extraction_date=datetime.now().strftime('%Y-%m-%d'),
+                    episodes=self.extract_episodes(document, url)
+                )
+            self.metrics.increment('episodes', len(metadata.episodes))
+            if on_series is not None:
+                on_series(metadata)
+
+            if include_synopsis:
+                with self.metrics.time('episode_parse'):
+                    lookups = scan_sources(self.synopsis_sources, SeriesPage(url, content, document))
+                await self._fill_bulk_synopses(url, metadata.episodes, lookups, deadline)
+                skipped = await self._fetch_synopses(metadata.episodes, on_episode, deadline)
+                if skipped:
+                    self.metrics.increment('synopsis_skipped', skipped)
+                    logger.warning("処理期限（%g秒）を超えたため、%d 話のあらすじ取得をスキップしました",
+                                   self.series_deadline, skipped, extra={'url': url, 'skipped': skipped})
+            elif on_episode is not None:
+                for episode in metadata.episodes:
+                    on_episode(episode)
+
+        return metadata
+
+    async def _fill_bulk_synopses(self, series_url: str, episodes: List[EpisodeMetadata], lookups,
+                                  deadline: Optional[Deadline]) -> None:
+        # AbemaMetadataExtractor.fill_bulk_synopses の非同期版
+        for source, lookup in zip(self.synopsis_sources, lookups):
+            filled = fill_synopses(episodes, lookup.synopses)
+            if lookup.document_url and missing_synopses(episodes) \
+                    and (deadline is None or not deadline.expired()):
+                self.metrics.increment('synopsis_documents')
+                try:
+                    content = await self.fetch_page(lookup.document_url, retries=1, deadline=deadline)
+                    filled += fill_synopses(episodes, source.parse_document(content, series_url))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.metrics.increment('synopsis_document_failures')
+                    logger.debug("あらすじの文書を取得できませんでした: %s (%s)", lookup.document_url, e,
+                                 extra={'url': lookup.document_url})
+            if filled:
+                self.metrics.increment(f'synopsis_source.{source.name}', filled)
+
+    async def _fetch_synopses(self, episodes: List[EpisodeMetadata],
+                              on_episode: Optional[Callable[[EpisodeMetadata], None]] = None,
+                              deadline: Optional[Deadline] = None) -> int:
+        # すべて同時に開始し、話数順に結果を待つことで順序を保つ
+        # シリーズ単位で取り出せなかった話のみ個別ページから取得する
+        tasks = [asyncio.ensure_future(self._fetch_synopsis(episode.url, deadline))
+                 if episode.url and not episode.synopsis else None
+                 for episode in episodes]
+        skipped = 0
+        try:
+            for episode, task in zip(episodes, tasks):
+                if task is not None:
+                    synopsis = await task
+                    # 期限切れで取得しなかった話のみを数える（期限前に失敗した話は含めない）
+                    if synopsis is _SKIPPED:
+                        skipped += 1
+                        synopsis = None
+                    episode.synopsis = synopsis
+                if on_episode is not None:
+                    on_episode(episode)
+        finally:
+            for task in tasks:
+                if task is not None and not task.done():
+                    task.cancel()
+        return skipped
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # イベントループ上で生成する必要があるため、初回使用時に作成する
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _request(self, url: str, retries: int, consume, deadline: Optional[Deadline] = None) -> Any:
+        """リトライ付きでリクエストを送信し、成功したレスポンス（2xx）を consume で処理します。"""
+        request_headers = {'User-Agent': self.user_agent}
+        last_exception = None
+
+        for attempt in range(retries):
+            status = None
+            retry_after = None
+            try:
+                async with self._get_semaphore():
+                    if deadline is not None and deadline.expired():
+                        raise DeadlineExpiredError(f"処理期限を過ぎたため取得しませんでした: {url}")
+                    self.metrics.increment('requests')
+                    async with await self.session.request(url, headers=request_headers) as response:
+                        status = response.status
+                        self.metrics.increment(f'http_status.{status}')
+                        logger.debug("GET %s -> %d", url, status, extra={'url': url, 'status': status})
+                        if 200 <= status < 300:
+                            return await consume(response)
+                        retry_after = response.headers.get('Retry-After')
+                        await response.read()
+
+                if status == 404:
+                    raise InvalidURLError(f"指定されたページが見つかりません (404 Not Found): {url}")
+                # 404以外はサーバーエラー等の可能性があるためリトライ対象
+                last_exception = f"HTTP Error {status}"
+                reason = f"サーバーエラー (HTTP {status})"
+
+            except (OSError, EOFError, http.client.HTTPException) as e:
+                last_exception = e
+                reason = "通信エラー"
+                self.metrics.increment('network_errors')
+            except (InvalidURLError, DeadlineExpiredError, asyncio.CancelledError):
+                raise
+            except Exception as e:
+                # その他の予期せぬエラー
+                last_exception = e
+                break
+
+            if attempt >= retries - 1:
+                break
+            delay = self.retry_policy.delay(attempt, status, retry_after)
+            if deadline is not None and not deadline.allows(delay):
+                last_exception = f"{last_exception}（処理期限内にリトライできません）"
+                break
+            self.metrics.increment('retries')
+            logger.warning("%s。%.1f秒後にリトライします (%d/%d)...", reason, delay, attempt + 1, retries,
+                           extra={'url': url, 'status': status, 'attempt': attempt + 1, 'delay': delay})
+            await asyncio.sleep(delay)
+
+        raise NetworkError(f"ページの取得に失敗しました。ネットワーク接続を確認してください: {last_exception}")
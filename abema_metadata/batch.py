@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+複数シリーズを一括で抽出するバッチ処理
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+from urllib.parse import urlsplit
+
+from .extractor import _SKIPPED, AbemaExtractorError, AbemaMetadataExtractor, extract_series_id
+from .jsonld import JsonLdDocument
+from .models import EpisodeMetadata, SeriesMetadata
+from .output import WRITERS, OutputWriter, open_writer, write_json, write_yaml
+from .pipeline import fetch_synopsis_task, parse_series_page, resolve_synopsis
+from .retry import Deadline
+from .scheduler import FairScheduler
+from .synopsis import SeriesPage, SynopsisLookup, missing_synopses
+
+
+@dataclass
+class SeriesResult:
+    """1シリーズ分の処理結果を保持するクラス"""
+    url: str                        # シリーズURL
+    title: Optional[str] = None     # シリーズタイトル
+    episodes: int = 0               # 話数
+    pages: int = 0                  # 取得したページ数
+    output: Optional[str] = None    # 出力ファイルのパス
+    error: Optional[str] = None     # 失敗時のエラーメッセージ
+
+
+@dataclass
+class BatchSummary:
+    """バッチ処理全体の集計結果を保持するクラス"""
+    results: List[SeriesResult] = field(default_factory=list)  # シリーズごとの結果（入力順）
+    elapsed: float = 0.0                                        # 経過時間（秒）
+
+    @property
+    def succeeded(self) -> int:
+        return sum(1 for result in self.results if result.error is None)
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for result in self.results if result.error is not None)
+
+    @property
+    def pages(self) -> int:
+        return sum(result.pages for result in self.results)
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        """サマリー出力用の辞書に変換します。"""
+        return {
+            'total_series': len(self.results),
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'total_pages': self.pages,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'pages_per_second': round(self.pages_per_second, 2),
+            'series': [
+                {
+                    'url': result.url,
+                    'title': result.title,
+                    'episodes': result.episodes,
+                    'pages': result.pages,
+                    'output': result.output,
+                    'error': result.error,
+                }
+                for result in self.results
+            ],
+        }
+
+
+def read_series_urls(stream: TextIO) -> List[str]:
+    """シリーズURLの一覧を読み込みます（空行と # で始まる行は無視、重複は除去）。
+
+    Args:
+        stream: 1行に1つのURLを記載したテキストストリーム
+
+    Returns:
+        URLのリスト（記載順）
+    """
+    urls = []
+    seen = set()
+    for line in stream:
+        url = line.strip()
+        if not url or url.startswith('#') or url in seen:
+            continue
+        seen.add(url)
+        urls.append(url)
+    return urls
+
+
+# 完了待ちの Future に対応する (シリーズ, 話のインデックス（シリーズページは None）, 解析段階かどうか)
+_Pending = Tuple['_SeriesState', Optional[int], bool]
+
+# シーズン単位のあらすじの文書を取得する Future の話のインデックス
+_DOCUMENT = -1
+
+
+class _SeriesState:
+    __slots__ = ('result', 'episodes', 'done', 'remaining', 'writer', 'deadline')
+
+    def __init__(self, url: str):
+        self.result = SeriesResult(url=url)
+        self.episodes: List[Optional[EpisodeMetadata]] = []
+        self.done: List[bool] = []
+        self.remaining = 0
+        self.writer: Optional[OutputWriter] = None
+        self.deadline: Optional[Deadline] = None
+
+
+class BatchRunner:
+    """共有スケジューラーを通じて複数シリーズのページ取得を行い、シリーズごとに出力するクラス
+
+    あらすじは取得できた順に受け取り、話数順に並べ直せた分から出力ファイルへ逐次書き出します。
+    書き出し済みのエピソードは保持しないため、大量のシリーズでもメモリ使用量が増え続けません。
+
+    エクストラクターの parse_workers が1以上の場合、ページの解析はプロセスプールで行います。
+    通信スレッドは解析タスクの上限に達すると空きを待つため、受信済みで未解析のページは一定数に保たれます。
+    """
+
+    def __init__(self, extractor: AbemaMetadataExtractor, scheduler: FairScheduler,
+                 output_dir: str, include_synopsis: bool = True, fmt: str = 'yaml'):
+        """初期化
+
+        Args:
+            extractor: ページ取得・解析に使用するエクストラクター（スレッド間で共有）
+            scheduler: すべてのページ取得を実行するスケジューラー
+            output_dir: シリーズごとの出力ファイルとサマリーを保存するディレクトリ
+            include_synopsis: 各話のあらすじを取得するかどうか
+            fmt: シリーズごとの出力形式（yaml / jsonl / json）
+        """
+        if fmt not in WRITERS:
+            raise ValueError(f"不明な出力形式です: {fmt}")
+        self.extractor = extractor
+        self.scheduler = scheduler
+        self.output_dir = output_dir
+        self.include_synopsis = include_synopsis
+        self.fmt = fmt
+        self._pool = extractor.parse_pool() if extractor.parse_workers else None
+
+    def run(self, urls: Iterable[str]) -> BatchSummary:
+        """すべてのシリーズを処理し、集計結果を返します。
+
+        シリーズページの取得が終わり次第、そのシリーズのエピソードページを登録するため、
+        異なるシリーズの取得が並行して進みます。
+
+        Args:
+            urls: シリーズURLのリスト
+
+        Returns:
+            BatchSummary
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        start = time.perf_counter()
+        states = [_SeriesState(url) for url in urls]
+        pending: Dict[Future, _Pending] = {}
+
+        for state in states:
+            # 処理期限はシリーズページの取得を登録した時点から数える
+            state.deadline = Deadline(self.extractor.series_deadline)
+            future = self._submit(state.result.url, self.extractor.fetch_page, state.result.url)
+            pending[future] = (state, None, False)
+
+        try:
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    state, index, parsing = pending.pop(future)
+                    if not parsing:
+                        state.result.pages += 1
+                    if index is None:
+                        if not self._on_series_page(state, future, parsing, pending):
+                            continue
+                    elif index == _DOCUMENT:
+                        self._on_synopsis_document(state, future, pending)
+                    elif not self._on_synopsis(state, index, future, parsing, pending):
+                        continue
+                    self._flush(state)
+        finally:
+            # 中断時は書き込み中のファイルを閉じる（途中までの結果は .part に残る）
+            for state in states:
+                if state.writer is not None:
+                    state.writer.abort()
+
+        summary = BatchSummary(results=[state.result for state in states],
+                               elapsed=time.perf_counter() - start)
+        if self.fmt == 'yaml':
+            write_yaml(summary.to_dict(), os.path.join(self.output_dir, 'summary.yaml'))
+        else:
+            write_json(summary.to_dict(), os.path.join(self.output_dir, 'summary.json'))
+        return summary
+
+    def _submit(self, group: str, func, url: str, *args) -> Future:
+        return self.scheduler.submit(group, urlsplit(url).hostname, func, url, *args)
+
+    def _fetch_synopsis_for_pool(self, episode_url: str, deadline: Optional[Deadline]) -> Any:
+        return fetch_synopsis_task(self.extractor, self._pool, episode_url, deadline)
+
+    def _on_synopsis(self, state: _SeriesState, index: int, future: Future, parsing: bool,
+                     pending: Dict[Future, _Pending]) -> bool:
+        if parsing:
+            synopsis = resolve_synopsis(self.extractor, future)
+        else:
+            synopsis = future.result()
+            if isinstance(synopsis, Future):
+                # 受信済みのページは解析の完了を待つ
+                pending[synopsis] = (state, index, True)
+                return False
+        state.episodes[index].synopsis = None if synopsis is _SKIPPED else synopsis
+        state.done[index] = True
+        state.remaining -= 1
+        return True
+
+    def _on_series_page(self, state: _SeriesState, future: Future, parsing: bool,
+                        pending: Dict[Future, _Pending]) -> bool:
+        result = state.result
+        metrics = self.extractor.metrics
+        sources = self.extractor.synopsis_sources if self.include_synopsis else ()
+        try:
+            if parsing:
+                title, episodes, lookups = future.result()
+            elif self._pool is not None:
+                parse_future = self._pool.submit(parse_series_page, future.result(),
+                                                 result.url, self.extractor.base_url, sources)
+                pending[parse_future] = (state, None, True)
+                return False
+            else:
+                content = future.result()
+                with metrics.time('jsonld_scan'):
+                    document = JsonLdDocument.parse(content)
+                with metrics.time('episode_parse'):
+                    title = self.extractor.extract_series_title(document)
+                    episodes = self.extractor.extract_episodes(document, result.url)
+                    lookups = self.extractor.scan_synopsis_sources(SeriesPage(result.url, content, document)) \
+                        if sources else []
+        except AbemaExtractorError as e:
+            result.error = str(e)
+            return False
+        except Exception as e:
+            # 1シリーズの予期せぬエラーでバッチ全体を止めない
+            result.error = f"予期せぬエラー: {e}"
+            return False
+
+        metadata = SeriesMetadata(
+            title=title,
+            source_url=result.url,
+            extraction_date=datetime.now().strftime('%Y-%m-%d'),
+            episodes=episodes
+        )
+        metrics.increment('episodes', len(metadata.episodes))
+        series_id = extract_series_id(result.url) or f'series-{id(state):x}'
+        result.title = metadata.title
+        result.episodes = len(metadata.episodes)
+        result.output = os.path.join(self.output_dir, f'{series_id}.{WRITERS[self.fmt].extension}')
+        try:
+            state.writer = open_writer(result.output, self.fmt)
+            state.writer.begin(metadata)
+        except OSError as e:
+            self._fail_output(state, e)
+            return False
+
+        state.episodes = list(metadata.episodes)
+        state.done = [True] * len(state.episodes)
+        if self.include_synopsis:
+            # シリーズページから取り出せたあらすじを設定し、残りの話はシーズン単位の文書 → 個別ページの順に取得する
+            self.extractor.fill_bulk_synopses(result.url, state.episodes,
+                                              [SynopsisLookup(synopses=lookup.synopses) for lookup in lookups])
+            documents = [SynopsisLookup(document_url=lookup.document_url) for lookup in lookups]
+            gaps = missing_synopses(state.episodes)
+            if gaps and any(lookup.document_url for lookup in documents):
+                # 文書の取得が終わるまで、あらすじが未設定の話は書き出さない
+                for index, episode in enumerate(state.episodes):
+                    if episode.url and not episode.synopsis:
+                        state.done[index] = False
+                document_future = self._submit(result.url, self.extractor.fill_bulk_synopses, result.url,
+                                               gaps, documents, state.deadline)
+                pending[document_future] = (state, _DOCUMENT, False)
+                state.remaining += 1
+            else:
+                self._fetch_missing_synopses(state, pending)
+        return True
+
+    def _on_synopsis_document(self, state: _SeriesState, future: Future,
+                              pending: Dict[Future, _Pending]) -> None:
+        try:
+            future.result()
+        except Exception:
+            # 文書から取り出せなかった話は個別ページから取得する
+            self.extractor.metrics.increment('synopsis_document_failures')
+        state.remaining -= 1
+        for index in range(len(state.episodes)):
+            state.done[index] = True
+        self._fetch_missing_synopses(state, pending)
+
+    def _fetch_missing_synopses(self, state: _SeriesState, pending: Dict[Future, _Pending]) -> None:
+        fetch = self.extractor.fetch_synopsis if self._pool is None else self._fetch_synopsis_for_pool
+        for index, episode in enumerate(state.episodes):
+            # 書き出し済みの話は None になっている
+            if episode is not None and episode.url and not episode.synopsis:
+                synopsis_future = self._submit(state.result.url, fetch, episode.url, state.deadline)
+                pending[synopsis_future] = (state, index, False)
+                state.done[index] = False
+                state.remaining += 1
+
+    def _flush(self, state: _SeriesState) -> None:
+        """話数順に揃ったエピソードを書き出し、すべて揃ったら出力を確定します。"""
+        writer = state.writer
+        if writer is None:
+            return
+        try:
+            while writer.written < len(state.episodes) and state.done[writer.written]:
+                index = writer.written
+                writer.write_episode(state.episodes[index])
+                state.episodes[index] = None
+            if state.remaining == 0:
+                writer.commit()
+                state.writer = None
+        except OSError as e:
+            self._fail_output(state, e)
+
+    def _fail_output(self, state: _SeriesState, error: OSError) -> None:
+        if state.writer is not None:
+            state.writer.abort()
+            state.writer = None
+        state.result.error = f"出力に失敗しました: {error}"
+        state.result.output = None
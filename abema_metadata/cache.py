@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+ETag/Last-Modified による条件付き再検証に対応したディスクキャッシュ
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional
+
+
+# URL種別ごとの既定TTL（秒）。シリーズページは新話追加があるため短く、エピソードページは長く保持する
+DEFAULT_TTLS: Dict[str, float] = {
+    'series': 60 * 60,
+    'episode': 30 * 24 * 60 * 60,
+    'default': 24 * 60 * 60,
+}
+
+# キャッシュ全体の既定の上限サイズ（バイト）
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 上限を超えた際に削除後の合計サイズの目標とする、上限に対する割合。
+# 上限ちょうどまでしか削除しないと、上限付近では保存のたびにディレクトリ全体の走査が発生する
+EVICTION_TARGET = 0.9
+
+
+def classify_url(url: str) -> str:
+    """URLをTTL判定用の種別に分類します。
+
+    Args:
+        url: 対象のURL
+
+    Returns:
+        'series'、'episode'、'default' のいずれか
+    """
+    if '/video/title/' in url:
+        return 'series'
+    if '/video/episode/' in url:
+        return 'episode'
+    return 'default'
+
+
+@dataclass
+class CacheEntry:
+    """キャッシュされた1件のレスポンスを保持するクラス"""
+    url: str                            # リクエストURL
+    body: bytes                         # レスポンスボディ（展開済み）
+    stored_at: float                    # 保存または最終再検証の時刻（UNIX時間）
+    etag: Optional[str] = None          # ETag ヘッダー
+    last_modified: Optional[str] = None  # Last-Modified ヘッダー
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """再検証リクエストに付与する条件付きヘッダーを返します。"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+@dataclass
+class CacheStats:
+    """キャッシュの利用統計を保持するクラス"""
+    hits: int = 0          # TTL内でそのまま返した件数
+    revalidated: int = 0   # 304 Not Modified で再利用した件数
+    misses: int = 0        # キャッシュに存在しなかった件数
+    stores: int = 0        # 新規に保存した件数
+    evictions: int = 0     # サイズ上限により削除した件数
+
+
+class ResponseCache:
+    """URLごとにレスポンスボディとキャッシュ検証用ヘッダーを保存するディスクキャッシュ
+
+    サイズ上限を超えた場合は、最終アクセスが古いものから上限の EVICTION_TARGET 倍まで削除します（LRU）。
+    """
+
+    def __init__(self, directory: str, ttls: Optional[Mapping[str, float]] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """初期化
+
+        Args:
+            directory: キャッシュを保存するディレクトリ（存在しない場合は作成）
+            ttls: URL種別（'series', 'episode', 'default'）ごとのTTL秒数。省略した種別は既定値を使用。
+            max_bytes: キャッシュ全体の上限サイズ（バイト）
+        """
+        self.directory = directory
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        # 削除処理は同時に1スレッドのみが行う（走査中も他のスレッドの読み書きは止めない）
+        self._evict_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    def ttl_for(self, url: str) -> float:
+        """URLに適用されるTTL秒数を返します。"""
+        return self.ttls.get(classify_url(url), self.ttls['default'])
+
+    def is_fresh(self, entry: CacheEntry, now: Optional[float] = None) -> bool:
+        """エントリがTTL内であれば True を返します。"""
+        now = time.time() if now is None else now
+        return now - entry.stored_at < self.ttl_for(entry.url)
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """キャッシュからエントリを読み出します。
+
+        Args:
+            url: 対象のURL
+
+        Returns:
+            CacheEntry。存在しない、または破損している場合は None。
+        """
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            # 最終アクセス時刻としてボディファイルの更新時刻を使用する（LRU判定用）
+            os.utime(body_path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.stats.misses += 1
+            return None
+
+        if meta.get('url') != url:
+            with self._lock:
+                self.stats.misses += 1
+            return None
+        return CacheEntry(
+            url=url,
+            body=body,
+            stored_at=meta.get('stored_at', 0.0),
+            etag=meta.get('etag'),
+            last_modified=meta.get('last_modified'),
+        )
+
+    def store(self, url: str, body: bytes, headers: Optional[Mapping[str, str]] = None) -> CacheEntry:
+        """レスポンスを保存し、必要であれば古いエントリを削除します。
+
+        Args:
+            url: リクエストURL
+            body: レスポンスボディ（展開済み）
+            headers: レスポンスヘッダー（ETag/Last-Modified を保存）
+
+        Returns:
+            保存された CacheEntry
+        """
+        headers = headers or {}
+        entry = CacheEntry(
+            url=url,
+            body=body,
+            stored_at=time.time(),
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+        )
+        body_path, _ = self._paths(url)
+        try:
+            previous_size = os.path.getsize(body_path)
+        except OSError:
+            previous_size = 0
+
+        self._write_atomic(body_path, body)
+        self._write_meta(entry)
+
+        with self._lock:
+            self.stats.stores += 1
+            self._total_bytes += len(body) - previous_size
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+        return entry
+
+    def refresh(self, entry: CacheEntry, headers: Optional[Mapping[str, str]] = None) -> CacheEntry:
+        """304 Not Modified を受けたエントリの保存時刻と検証用ヘッダーを更新します。
+
+        Args:
+            entry: 再検証したエントリ
+            headers: 304レスポンスのヘッダー
+
+        Returns:
+            更新後の CacheEntry
+        """
+        headers = headers or {}
+        entry.stored_at = time.time()
+        entry.etag = headers.get('ETag') or entry.etag
+        entry.last_modified = headers.get('Last-Modified') or entry.last_modified
+        self._write_meta(entry)
+        with self._lock:
+            self.stats.revalidated += 1
+        return entry
+
+    def record_hit(self) -> None:
+        """TTL内のエントリをそのまま返したことを記録します。"""
+        with self._lock:
+            self.stats.hits += 1
+
+    def clear(self) -> None:
+        """キャッシュをすべて削除します。"""
+        for body_path, _, _ in self._scan():
+            self._remove(body_path)
+        with self._lock:
+            self._total_bytes = 0
+
+    def _paths(self, url: str):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, digest)
+        return base + '.body', base + '.json'
+
+    def _write_meta(self, entry: CacheEntry) -> None:
+        _, meta_path = self._paths(entry.url)
+        meta = {
+            'url': entry.url,
+            'stored_at': entry.stored_at,
+            'etag': entry.etag,
+            'last_modified': entry.last_modified,
+        }
+        self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _scan(self):
+        """(ボディのパス, サイズ, 最終アクセス時刻) を列挙します。"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.body'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            yield path, st.st_size, st.st_mtime
+
+    def _evict(self) -> None:
+        """合計サイズが上限の EVICTION_TARGET 倍を下回るまで、最終アクセスの古いエントリから削除します。"""
+        # 別のスレッドが削除中であれば任せる
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            entries = sorted(self._scan(), key=lambda item: item[2])
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * EVICTION_TARGET
+            removed = evicted = 0
+            for body_path, size, _ in entries:
+                if total <= target:
+                    break
+                self._remove(body_path)
+                total -= size
+                removed += size
+                evicted += 1
+            with self._lock:
+                # 走査中に他のスレッドが保存した分を失わないよう、削除した分のみを差し引く
+                self._total_bytes -= removed
+                self.stats.evictions += evicted
+        finally:
+            self._evict_lock.release()
+
+    def _remove(self, body_path: str) -> None:
+        for path in (body_path, body_path[:-len('.body')] + '.json'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+抽出結果を SQLite に蓄積し、タイトル・あらすじを全文検索するローカルカタログ
+"""
+
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .extractor import extract_series_id
+from .models import EpisodeMetadata, SeriesMetadata
+from .output import WRITERS, load_metadata
+
+
+# 1トランザクションにまとめて書き込むエピソード数の目安
+DEFAULT_BATCH_SIZE = 5000
+
+# trigram トークナイザーで全文索引を使える最短の検索語の文字数（これより短い語は LIKE で検索）
+MIN_FTS_TERM_LENGTH = 3
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS series (
+    series_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    extraction_date TEXT NOT NULL,
+    total_episodes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    id INTEGER PRIMARY KEY,
+    series_id TEXT NOT NULL REFERENCES series(series_id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    synopsis TEXT,
+    url TEXT,
+    UNIQUE (series_id, number)
+);
+'''
+
+# 外部コンテンツ方式の FTS5 索引（本文は episodes テーブルのみに保持し、トリガーで同期する）
+_FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS episodes_fts USING fts5(
+    title, synopsis, content='episodes', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS episodes_ai AFTER INSERT ON episodes BEGIN
+    INSERT INTO episodes_fts(rowid, title, synopsis) VALUES (new.id, new.title, new.synopsis);
+END;
+CREATE TRIGGER IF NOT EXISTS episodes_ad AFTER DELETE ON episodes BEGIN
+    INSERT INTO episodes_fts(episodes_fts, rowid, title, synopsis)
+    VALUES ('delete', old.id, old.title, old.synopsis);
+END;
+CREATE TRIGGER IF NOT EXISTS episodes_au AFTER UPDATE ON episodes BEGIN
+    INSERT INTO episodes_fts(episodes_fts, rowid, title, synopsis)
+    VALUES ('delete', old.id, old.title, old.synopsis);
+    INSERT INTO episodes_fts(rowid, title, synopsis) VALUES (new.id, new.title, new.synopsis);
+END;
+'''
+
+_HIT_COLUMNS = 'e.series_id, s.title, e.number, e.title, e.synopsis, e.url'
+
+
+@dataclass
+class CatalogHit:
+    """検索結果の1件（エピソード単位）"""
+    series_id: str
+    series_title: str
+    number: int
+    title: str
+    synopsis: Optional[str]
+    url: Optional[str]
+
+
+def series_key(metadata: SeriesMetadata) -> str:
+    """カタログ上のシリーズの識別子を返します（URLにシリーズIDがない場合はURLそのもの）。"""
+    return extract_series_id(metadata.source_url) or metadata.source_url
+
+
+def guess_format(path: str) -> Optional[str]:
+    """ファイルの拡張子から出力形式（yaml / jsonl / json）を推定します（該当なしは None）。"""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension == 'yml':
+        return 'yaml'
+    for fmt, writer in WRITERS.items():
+        if writer.extension == extension:
+            return fmt
+    return None
+
+
+def find_metadata_files(paths: Iterable[str]) -> Iterator[str]:
+    """ファイルとディレクトリ（再帰的に探索）から抽出結果らしきファイルのパスを列挙します。"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if guess_format(name):
+                    yield os.path.join(root, name)
+
+
+class Catalog:
+    """抽出結果（SeriesMetadata）を蓄積する SQLite カタログ
+
+    シリーズID（/video/title/ 以降）と話数で索引し、エピソードのタイトルとあらすじに
+    FTS5（trigram トークナイザー）の全文索引を作成します。日本語のように単語区切りのない
+    文章でも部分一致で検索できます。FTS5 が使えない SQLite では LIKE による検索になります。
+
+    使用例:
+        with Catalog('catalog.sqlite3') as catalog:
+            catalog.add_series(metadata)
+            hits = catalog.search('魔法少女')
+    """
+
+    def __init__(self, path: str):
+        """初期化
+
+        Args:
+            path: データベースファイルのパス（':memory:' でメモリ上に作成）
+        """
+        self.path = path
+        # トランザクションは明示的に BEGIN / COMMIT する
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        if path != ':memory:':
+            self.connection.execute('PRAGMA journal_mode = WAL')
+            self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.executescript(_SCHEMA)
+        self.full_text = self._create_fts()
+
+    def _create_fts(self) -> bool:
+        try:
+            self.connection.executescript(_FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # FTS5 または trigram トークナイザーに未対応の SQLite
+            return False
+        return True
+
+    def close(self) -> None:
+        """データベース接続を閉じます。"""
+        self.connection.close()
+
+    def __enter__(self) -> 'Catalog':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add_series(self, metadata: SeriesMetadata) -> str:
+        """1シリーズを登録します（登録済みの場合は全エピソードを置き換え）。
+
+        Returns:
+            登録したシリーズの識別子
+        """
+        return self.add_many([metadata])[0]
+
+    def add_many(self, series: Iterable[SeriesMetadata], batch_size: int = DEFAULT_BATCH_SIZE) -> List[str]:
+        """複数のシリーズをまとめて登録します。
+
+        エピソード数の合計が batch_size に達するごとに1つのトランザクションで書き込みます。
+
+        Args:
+            series: 登録する SeriesMetadata の列
+            batch_size: 1トランザクションにまとめるエピソード数の目安
+
+        Returns:
+            登録したシリーズの識別子のリスト
+        """
+        keys = []
+        pending = 0
+        cursor = self.connection.cursor()
+        cursor.execute('BEGIN')
+        try:
+            for metadata in series:
+                keys.append(self._write_series(cursor, metadata))
+                pending += len(metadata.episodes) + 1
+                if pending >= batch_size:
+                    cursor.execute('COMMIT')
+                    cursor.execute('BEGIN')
+                    pending = 0
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        return keys
+
+    def _write_series(self, cursor: sqlite3.Cursor, metadata: SeriesMetadata) -> str:
+        key = series_key(metadata)
+        # 同じ話数が複数ある場合は後のものを残す。INSERT OR REPLACE による置き換えでは
+        # 削除トリガーが実行されず全文索引に古い行が残るため、重複を除いてから通常の INSERT で登録する
+        rows = {ep.number: (key, ep.number, ep.title, ep.synopsis, ep.url) for ep in metadata.episodes}
+        # 再登録時は旧エピソードを削除してから置き換える（全文索引はトリガーで同期）
+        cursor.execute('DELETE FROM episodes WHERE series_id = ?', (key,))
+        cursor.execute(
+            'INSERT OR REPLACE INTO series (series_id, title, source_url, extraction_date, total_episodes)'
+            ' VALUES (?, ?, ?, ?, ?)',
+            (key, metadata.title, metadata.source_url, metadata.extraction_date, len(rows))
+        )
+        cursor.executemany(
+            'INSERT INTO episodes (series_id, number, title, synopsis, url) VALUES (?, ?, ?, ?, ?)',
+            list(rows.values())
+        )
+        return key
+
+    def remove_series(self, series_id: str) -> bool:
+        """シリーズとそのエピソードを削除します。
+
+        Returns:
+            削除した場合は True、登録されていなかった場合は False
+        """
+        cursor = self.connection.cursor()
+        cursor.execute('BEGIN')
+        cursor.execute('DELETE FROM episodes WHERE series_id = ?', (series_id,))
+        cursor.execute('DELETE FROM series WHERE series_id = ?', (series_id,))
+        removed = cursor.rowcount > 0
+        cursor.execute('COMMIT')
+        return removed
+
+    def ingest_files(self, paths: Iterable[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                     on_error=None) -> Tuple[int, int]:
+        """保存済みの抽出結果ファイル（ディレクトリは再帰的に探索）をカタログに取り込みます。
+
+        Args:
+            paths: ファイルまたはディレクトリのパス
+            batch_size: 1トランザクションにまとめるエピソード数の目安
+            on_error: 読み込めないファイルがあった場合に (パス, 例外) で呼ばれる関数。
+                省略時は例外をそのまま送出します。
+
+        Returns:
+            (取り込んだシリーズ数, 取り込んだエピソード数)
+        """
+        counts = [0, 0]
+
+        def load_all() -> Iterator[SeriesMetadata]:
+            for path in find_metadata_files(paths):
+                try:
+                    fmt = guess_format(path)
+                    if fmt is None:
+                        raise ValueError(f"出力形式を判別できない拡張子です: {path}")
+                    metadata = load_metadata(path, fmt)
+                except (OSError, ValueError) as e:
+                    if on_error is None:
+                        raise
+                    on_error(path, e)
+                    continue
+                counts[0] += 1
+                # 同じ話数が重複する場合は1件にまとめて登録されるため、登録される件数で数える
+                counts[1] += len({episode.number for episode in metadata.episodes})
+                yield metadata
+
+        self.add_many(load_all(), batch_size)
+        return counts[0], counts[1]
+
+    def get_series(self, series_id: str) -> Optional[SeriesMetadata]:
+        """登録済みのシリーズをエピソード付きで返します（未登録の場合は None）。"""
+        row = self.connection.execute(
+            'SELECT title, source_url, extraction_date FROM series WHERE series_id = ?', (series_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        episodes = [
+            EpisodeMetadata(number=number, title=title, synopsis=synopsis, url=url)
+            for number, title, synopsis, url in self.connection.execute(
+                'SELECT number, title, synopsis, url FROM episodes WHERE series_id = ? ORDER BY number',
+                (series_id,)
+            )
+        ]
+        return SeriesMetadata(title=row[0], source_url=row[1], extraction_date=row[2], episodes=episodes)
+
+    def get_episode(self, series_id: str, number: int) -> Optional[CatalogHit]:
+        """シリーズIDと話数でエピソードを1件返します（未登録の場合は None）。"""
+        row = self.connection.execute(
+            f'SELECT {_HIT_COLUMNS} FROM episodes e JOIN series s USING (series_id)'
+            ' WHERE e.series_id = ? AND e.number = ?',
+            (series_id, number)
+        ).fetchone()
+        return CatalogHit(*row) if row else None
+
+    def search(self, query: str, limit: int = 20, series_id: Optional[str] = None) -> List[CatalogHit]:
+        """エピソードのタイトル・あらすじを検索します。
+
+        空白で区切った語はすべてを含むもの（AND）を返します。全文索引が使える場合は
+        関連度順、それ以外はシリーズID・話数順に並べます。
+
+        Args:
+            query: 検索語
+            limit: 返す最大件数
+            series_id: 指定した場合はそのシリーズ内のみを検索
+
+        Returns:
+            CatalogHit のリスト
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        if self.full_text and all(len(term) >= MIN_FTS_TERM_LENGTH for term in terms):
+            # 各語をフレーズとして引用し、FTS5 の演算子として解釈されないようにする
+            match = ' AND '.join('"' + term.replace('"', '""') + '"' for term in terms)
+            sql = (f'SELECT {_HIT_COLUMNS} FROM episodes_fts f'
+                   ' JOIN episodes e ON e.id = f.rowid JOIN series s USING (series_id)'
+                   ' WHERE episodes_fts MATCH ?')
+            params: list = [match]
+            order = ' ORDER BY f.rank'
+        else:
+            # 3文字未満の語は trigram 索引で検索できないため全件を走査する
+            conditions = []
+            params = []
+            for term in terms:
+                pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                conditions.append("(e.title LIKE ? ESCAPE '\\' OR e.synopsis LIKE ? ESCAPE '\\')")
+                params += [pattern, pattern]
+            sql = (f'SELECT {_HIT_COLUMNS} FROM episodes e JOIN series s USING (series_id)'
+                   ' WHERE ' + ' AND '.join(conditions))
+            order = ' ORDER BY e.series_id, e.number'
+        if series_id is not None:
+            sql += ' AND e.series_id = ?'
+            params.append(series_id)
+        sql += order + ' LIMIT ?'
+        params.append(limit)
+        return [CatalogHit(*row) for row in self.connection.execute(sql, params)]
+
+    def counts(self) -> Tuple[int, int]:
+        """(登録シリーズ数, 登録エピソード数) を返します。"""
+        series = self.connection.execute('SELECT COUNT(*) FROM series').fetchone()[0]
+        episodes = self.connection.execute('SELECT COUNT(*) FROM episodes').fetchone()[0]
+        return series, episodes
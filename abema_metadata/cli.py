@@ -4,15 +4,239 @@ AbemaTV メタ情報抽出ツールのコマンドラインインターフェー
 """
 
 import argparse
-import yaml
+import json
+import os
 import sys
-from .extractor import AbemaMetadataExtractor, AbemaExtractorError
+# 起動時間を短くするため、HTTP通信・キャッシュ・YAML 等の重いモジュールは
+# 引数の解析後に必要になった時点で読み込む（--help やエラー終了では読み込まない）
+from .output import PART_SUFFIX, WRITERS, load_metadata, open_writer, write_metadata
+from .retry import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
 
 
-def main():
+def parse_cache_ttls(values):
+    """--cache-ttl の指定値を URL種別ごとのTTL辞書に変換します。
+
+    Args:
+        values: 'SECONDS' または 'KIND=SECONDS'（KIND は series/episode/default）形式の文字列リスト
+
+    Returns:
+        URL種別をキー、TTL秒数を値とする辞書
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    ttls = {}
+    for value in values or []:
+        kind, sep, seconds = value.partition('=')
+        if not sep:
+            kind, seconds = None, value
+        elif kind not in ('series', 'episode', 'default'):
+            raise ValueError(f"不明なURL種別です: {kind}")
+        ttl = float(seconds)
+        if ttl < 0:
+            raise ValueError(f"TTLには0以上の値を指定してください: {value}")
+        if kind is None:
+            ttls.update(series=ttl, episode=ttl, default=ttl)
+        else:
+            ttls[kind] = ttl
+    return ttls
+
+
+def add_cache_arguments(parser):
+    """キャッシュ関連のオプションをパーサーに追加します。"""
+    parser.add_argument(
+        '--cache-dir',
+        help='ページをキャッシュするディレクトリ（指定時はETag/Last-Modifiedで再検証）'
+    )
+
+    parser.add_argument(
+        '--cache-ttl',
+        action='append',
+        metavar='[KIND=]SECONDS',
+        help='キャッシュのTTL秒数。KIND に series/episode/default を指定すると種別ごとに設定（複数指定可）'
+    )
+
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='通信せずキャッシュ済みのページのみを使用（--cache-dir が必要）'
+    )
+
+
+def add_parse_workers_argument(parser):
+    """ページ解析のプロセス数のオプションをパーサーに追加します。"""
+    parser.add_argument(
+        '--parse-workers',
+        type=int,
+        default=0,
+        metavar='N',
+        help='ページの解析を N 個のプロセスで並列に行う。解析の負荷が高い大規模な取得向け (デフォルト: 0 = 無効)'
+    )
+
+
+def add_synopsis_source_argument(parser):
+    """あらすじの取得元のオプションをパーサーに追加します。"""
+    parser.add_argument(
+        '--synopsis-source',
+        choices=['auto', 'page'],
+        default='auto',
+        help='あらすじの取得元。auto: シリーズページの構造化データやシーズン単位の JSON-LD からまとめて取り出し、'
+             '見つからなかった話のみ個別ページを取得 / page: すべての話を個別ページから取得 (デフォルト: auto)'
+    )
+
+
+def add_network_arguments(parser):
+    """タイムアウトと処理期限のオプションをパーサーに追加します。"""
+    parser.add_argument(
+        '--connect-timeout',
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        metavar='SECONDS',
+        help=f'接続確立のタイムアウト秒数 (デフォルト: {DEFAULT_CONNECT_TIMEOUT:g})'
+    )
+
+    parser.add_argument(
+        '--read-timeout',
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+        metavar='SECONDS',
+        help=f'受信待ちのタイムアウト秒数。応答が途絶えた接続はこの時間で打ち切ります (デフォルト: {DEFAULT_READ_TIMEOUT:g})'
+    )
+
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        metavar='SECONDS',
+        help='1シリーズの抽出に許容する秒数。超過後は残りのあらすじ取得をスキップ (デフォルト: 無期限)'
+    )
+
+    parser.add_argument(
+        '--adaptive',
+        action='store_true',
+        help='応答時間とエラー(429/5xx)に応じて同時リクエスト数を -j を上限に自動調整し、'
+             '失敗が続いた場合は一時的に送信を停止'
+    )
+
+
+def validate_network_arguments(parser, args):
+    """タイムアウトと処理期限のオプションを検証します。"""
+    for name in ('connect_timeout', 'read_timeout', 'deadline'):
+        value = getattr(args, name)
+        if value is not None and value <= 0:
+            parser.error(f"--{name.replace('_', '-')} には0より大きい値を指定してください")
+
+
+def create_flow_control(args):
+    """--adaptive が指定された場合に、-j を上限とする FlowControl を生成します（未指定時は None）。"""
+    if not args.adaptive:
+        return None
+    from .limiter import FlowControl
+    return FlowControl(initial_limit=min(2, args.jobs), max_limit=args.jobs)
+
+
+def create_cache(parser, args):
+    """キャッシュ関連のオプションを検証し、ResponseCache を生成します（未指定時は None）。"""
+    if args.offline and not args.cache_dir:
+        parser.error('--offline には --cache-dir の指定が必要です')
+    try:
+        cache_ttls = parse_cache_ttls(args.cache_ttl)
+    except ValueError as e:
+        parser.error(f'--cache-ttl の指定が不正です: {e}')
+    if not args.cache_dir:
+        return None
+    from .cache import ResponseCache
+    return ResponseCache(args.cache_dir, ttls=cache_ttls)
+
+
+def add_metrics_arguments(parser):
+    """ログと計測結果の出力に関するオプションをパーサーに追加します。"""
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='各リクエストの結果など詳細なログを標準エラー出力に表示'
+    )
+
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='終了時に処理段階ごとの所要時間と各種カウンターを表示'
+    )
+
+    parser.add_argument(
+        '--metrics-json',
+        metavar='PATH',
+        help='計測結果をJSON形式で出力するファイル（- で標準出力）'
+    )
+
+
+def configure_logging(args):
+    """ログの出力先（標準エラー出力）と詳細度を設定します。"""
+    import logging
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(message)s',
+        stream=sys.stderr
+    )
+
+
+def report_metrics(extractor, args, stream=None):
+    """--stats / --metrics-json の指定に応じて計測結果を出力します。
+
+    Args:
+        extractor: 計測結果を持つエクストラクター
+        args: 解析済みのコマンドライン引数
+        stream: --stats と --metrics-json - の出力先（省略時は標準出力）
+    """
+    if not args.stats and not args.metrics_json:
+        return
+    stream = stream or sys.stdout
+    snapshot = extractor.collect_metrics()
+    if args.stats:
+        print(file=stream)
+        print(extractor.metrics.format_summary(), file=stream)
+    if args.metrics_json == '-':
+        json.dump(snapshot, stream, ensure_ascii=False, indent=2)
+        stream.write('\n')
+    elif args.metrics_json:
+        try:
+            with open(args.metrics_json, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"計測結果を書き出せません: {e}", file=stream)
+
+
+def add_catalog_argument(parser):
+    """抽出結果をカタログに登録するオプションをパーサーに追加します。"""
+    parser.add_argument(
+        '--catalog',
+        metavar='DB',
+        help='抽出結果を登録する SQLite カタログのパス（catalog query で検索可能）'
+    )
+
+
+def add_format_argument(parser):
+    """出力形式のオプションをパーサーに追加します。"""
+    parser.add_argument(
+        '--format',
+        choices=list(WRITERS),
+        default='yaml',
+        help='出力形式。jsonl は1行目にシリーズ情報、以降の各行に1話分を出力 (デフォルト: yaml)'
+    )
+
+
+def main(argv=None):
     """メインのエントリーポイント"""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+
     parser = argparse.ArgumentParser(
-        description='AbemaTVからシリーズ情報を抽出し、YAML形式で出力します。',
+        description='AbemaTVからシリーズ情報を抽出し、YAML（または JSON Lines / JSON）形式で出力します。',
+        epilog='複数シリーズの一括処理: %(prog)s batch URL_LIST [-d OUTPUT_DIR]\n'
+               'カタログの取り込み・検索: %(prog)s catalog {ingest,query} ...\n'
+               '常駐して問い合わせAPIを提供: %(prog)s serve [--port PORT | --socket PATH]\n'
+               '保存済みのHTMLから一括抽出: %(prog)s snapshot PATH... [-d OUTPUT_DIR]\n'
+               '新しい話の監視: %(prog)s watch URL_LIST [--state PATH] [--once]',
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
 
@@ -23,57 +247,101 @@ def main():
 
     parser.add_argument(
         '-o', '--output',
-        default='episodes_output.yaml',
-        help='出力先YAMLファイル名 (デフォルト: episodes_output.yaml)'
+        help='出力先ファイル名 (デフォルト: episodes_output.<形式の拡張子>)'
     )
 
+    add_format_argument(parser)
+
     parser.add_argument(
         '--no-synopsis',
         action='store_true',
         help='あらすじの取得をスキップ（高速に取得したい場合）'
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=4,
+        help='あらすじを並列取得する際の同時接続数 (デフォルト: 4)'
+    )
+
+    add_parse_workers_argument(parser)
+    add_synopsis_source_argument(parser)
 
+    parser.add_argument(
+        '--update',
+        action='store_true',
+        help='既存の出力ファイルを読み込み、新しい話とあらすじが欠けている話のみを取得して更新'
+    )
+
+    add_network_arguments(parser)
+    add_cache_arguments(parser)
+    add_catalog_argument(parser)
+    add_metrics_arguments(parser)
+
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error('--jobs には1以上の値を指定してください')
+    if args.parse_workers < 0:
+        parser.error('--parse-workers には0以上の値を指定してください')
+    validate_network_arguments(parser, args)
+    cache = create_cache(parser, args)
+    configure_logging(args)
+    if args.output is None:
+        args.output = f'episodes_output.{WRITERS[args.format].extension}'
+
+    from .extractor import AbemaMetadataExtractor, AbemaExtractorError
+    from .update import update_metadata
+    extractor = None
     try:
+        extractor = AbemaMetadataExtractor(max_workers=args.jobs, cache=cache, offline=args.offline,
+                                           connect_timeout=args.connect_timeout,
+                                           read_timeout=args.read_timeout,
+                                           series_deadline=args.deadline,
+                                           parse_workers=args.parse_workers,
+                                           synopsis_sources=[] if args.synopsis_source == 'page' else None,
+                                           flow_control=create_flow_control(args))
+        existing = None
+        if args.update:
+            if os.path.exists(args.output):
+                try:
+                    existing = load_metadata(args.output, args.format)
+                except (OSError, ValueError) as e:
+                    parser.error(f'既存の出力ファイルを読み込めません: {e}')
+            else:
+                print(f"既存の出力ファイルがないため、すべての話を取得します: {args.output}")
+
         # メタ情報抽出の実行
-        print(f"抽出を開始します: {args.url}")
-        extractor = AbemaMetadataExtractor()
-        metadata = extractor.extract_all_metadata(args.url, not args.no_synopsis)
-
-        # 出力用データの構築
-        output_data = {
-            'series_title': metadata.title,
-            'source_url': metadata.source_url,
-            'extraction_date': metadata.extraction_date,
-            'total_episodes': len(metadata.episodes),
-            'episodes': [
-                {
-                    'episode_number': ep.number,
-                    'title': ep.title,
-                    'synopsis': ep.synopsis or 'あらすじなし',
-                    'url': ep.url
-                }
-                for ep in metadata.episodes
-            ]
-        }
-
-        # YAMLファイルとして保存
-        with open(args.output, 'w', encoding='utf-8') as f:
-            yaml.dump(
-                output_data,
-                f,
-                allow_unicode=True,
-                default_flow_style=False,
-                sort_keys=False,
-                indent=2,
-                width=120
-            )
+        if existing is not None:
+            print(f"差分更新を開始します: {args.url}")
+            metadata, report = update_metadata(extractor, existing, args.url, not args.no_synopsis)
+            write_metadata(metadata, args.output, args.format)
+        else:
+            print(f"抽出を開始します: {args.url}")
+            # あらすじを取得できた話から順に書き出す（完了時に出力ファイルを置き換え）
+            with open_writer(args.output, args.format) as writer:
+                metadata = extractor.extract_all_metadata(
+                    args.url, not args.no_synopsis,
+                    on_series=writer.begin, on_episode=writer.write_episode
+                )
 
         print(f"\nメタ情報の抽出が正常に完了しました: {args.output}")
         print(f"シリーズ名: {metadata.title}")
         print(f"総話数    : {len(metadata.episodes)}")
         print(f"あらすじ  : {'取得済み' if not args.no_synopsis else 'なし'}")
+        if existing is not None:
+            print(f"差分      : 追加 {report.added} / 更新 {report.changed} / 変更なし {report.unchanged}"
+                  f" (リクエスト {report.requests} 件)")
+        stats = extractor.session.stats
+        print(f"HTTP接続  : 新規 {stats.connections_opened} / 再利用 {stats.connections_reused}")
+        if cache:
+            print(f"キャッシュ: ヒット {cache.stats.hits} / 再検証 {cache.stats.revalidated} / 保存 {cache.stats.stores}")
+        if args.catalog:
+            from .catalog import Catalog
+            with Catalog(args.catalog) as catalog:
+                series_id = catalog.add_series(metadata)
+            print(f"カタログ  : {args.catalog} に登録しました ({series_id})")
+        report_metrics(extractor, args)
 
     except AbemaExtractorError as e:
         # 既知のエラー（URL無効、ネットワークエラー等）
@@ -82,6 +350,8 @@ def main():
 
     except KeyboardInterrupt:
         print("\nユーザーによって中断されました。")
+        if os.path.exists(args.output + PART_SUFFIX):
+            print(f"途中までの結果: {args.output + PART_SUFFIX}")
         sys.exit(1)
         
     except Exception as e:
@@ -91,6 +361,536 @@ def main():
         traceback.print_exc()
         sys.exit(1)
 
+    finally:
+        # 接続と解析用のワーカープロセスを閉じる
+        if extractor is not None:
+            extractor.close()
+
+
+def batch_main(argv):
+    """batch サブコマンド: 複数シリーズを共有スケジューラーで一括処理します。"""
+    from .batch import BatchRunner, read_series_urls
+    from .extractor import AbemaMetadataExtractor
+    from .scheduler import FairScheduler
+
+    parser = argparse.ArgumentParser(
+        prog='abema_extractor.py batch',
+        description='ファイルまたは標準入力から読み込んだ複数のシリーズURLを一括で抽出します。'
+    )
+
+    parser.add_argument(
+        'input',
+        nargs='?',
+        default='-',
+        help='1行に1つのシリーズURLを記載したファイル（省略時または - で標準入力）'
+    )
+
+    parser.add_argument(
+        '-d', '--output-dir',
+        default='output',
+        help='シリーズごとの出力ファイルとサマリーの出力先ディレクトリ (デフォルト: output)'
+    )
+
+    add_format_argument(parser)
+
+    parser.add_argument(
+        '--no-synopsis',
+        action='store_true',
+        help='あらすじの取得をスキップ'
+    )
+
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=8,
+        help='全シリーズ合計の同時接続数の上限 (デフォルト: 8)'
+    )
+
+    add_parse_workers_argument(parser)
+    add_synopsis_source_argument(parser)
+
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=5.0,
+        help='ホストごとの1秒あたりの最大リクエスト数。0で無制限 (デフォルト: 5)'
+    )
+
+    parser.add_argument(
+        '--burst',
+        type=float,
+        help='ホストごとのバースト数 (デフォルト: --rate と同じ)'
+    )
+
+    add_network_arguments(parser)
+    add_cache_arguments(parser)
+    add_catalog_argument(parser)
+    add_metrics_arguments(parser)
+
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error('--jobs には1以上の値を指定してください')
+    if args.parse_workers < 0:
+        parser.error('--parse-workers には0以上の値を指定してください')
+    validate_network_arguments(parser, args)
+    cache = create_cache(parser, args)
+    configure_logging(args)
+
+    try:
+        if args.input == '-':
+            urls = read_series_urls(sys.stdin)
+        else:
+            with open(args.input, 'r', encoding='utf-8') as f:
+                urls = read_series_urls(f)
+    except OSError as e:
+        parser.error(f'URL一覧を読み込めません: {e}')
+    if not urls:
+        parser.error('処理対象のシリーズURLがありません')
+
+    print(f"一括抽出を開始します: {len(urls)} シリーズ")
+    extractor = AbemaMetadataExtractor(max_workers=args.jobs, cache=cache, offline=args.offline,
+                                       connect_timeout=args.connect_timeout,
+                                       read_timeout=args.read_timeout,
+                                       series_deadline=args.deadline,
+                                       parse_workers=args.parse_workers,
+                                       synopsis_sources=[] if args.synopsis_source == 'page' else None,
+                                       flow_control=create_flow_control(args))
+    try:
+        with FairScheduler(args.jobs, rate_per_host=args.rate, burst=args.burst) as scheduler:
+            runner = BatchRunner(extractor, scheduler, args.output_dir,
+                                 include_synopsis=not args.no_synopsis, fmt=args.format)
+            summary = runner.run(urls)
+    except KeyboardInterrupt:
+        print("\nユーザーによって中断されました。")
+        sys.exit(1)
+    finally:
+        # 接続と解析用のワーカープロセスを閉じる（計測結果は閉じた後も参照できる）
+        extractor.close()
+
+    for result in summary.results:
+        if result.error:
+            print(f"  失敗: {result.url} ({result.error})")
+        else:
+            print(f"  完了: {result.title} ({result.episodes}話) -> {result.output}")
+    print(f"\n一括抽出が完了しました: 成功 {summary.succeeded} / 失敗 {summary.failed}")
+    print(f"取得ページ数: {summary.pages} ({summary.elapsed:.1f} 秒, {summary.pages_per_second:.2f} pages/s)")
+    outputs = [result.output for result in summary.results if not result.error and result.output]
+    if args.catalog and outputs:
+        from .catalog import Catalog
+        with Catalog(args.catalog) as catalog:
+            series_count, episode_count = catalog.ingest_files(outputs)
+        print(f"カタログ: {args.catalog} に {series_count} シリーズ ({episode_count} 話) を登録しました")
+    report_metrics(extractor, args)
+    if summary.failed:
+        sys.exit(1)
+
+
+def catalog_main(argv):
+    """catalog サブコマンド: 保存済みの抽出結果を SQLite カタログに取り込み、検索します。"""
+    import dataclasses
+    from .catalog import DEFAULT_BATCH_SIZE, Catalog
+
+    parser = argparse.ArgumentParser(
+        prog='abema_extractor.py catalog',
+        description='抽出結果のファイルを SQLite カタログに取り込み、タイトル・あらすじを全文検索します。'
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        '--db',
+        default='catalog.sqlite3',
+        help='カタログのデータベースファイル (デフォルト: catalog.sqlite3)'
+    )
+    subparsers = parser.add_subparsers(dest='action', metavar='{ingest,query}')
+    subparsers.required = True
+
+    ingest_parser = subparsers.add_parser('ingest', parents=[common], help='抽出結果のファイルを取り込む')
+    ingest_parser.add_argument(
+        'paths',
+        nargs='+',
+        help='YAML / JSON Lines / JSON の抽出結果ファイル、またはそれらを含むディレクトリ'
+    )
+    ingest_parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'1トランザクションにまとめるエピソード数 (デフォルト: {DEFAULT_BATCH_SIZE})'
+    )
+
+    query_parser = subparsers.add_parser('query', parents=[common],
+                                         help='エピソードのタイトル・あらすじを検索する')
+    query_parser.add_argument(
+        'terms',
+        nargs='*',
+        help='検索語（複数指定時はすべてを含むもの）'
+    )
+    query_parser.add_argument(
+        '--series',
+        help='検索対象のシリーズID (例: 189-85)'
+    )
+    query_parser.add_argument(
+        '--episode',
+        type=int,
+        help='--series と組み合わせて指定した話数のエピソードを表示'
+    )
+    query_parser.add_argument(
+        '-n', '--limit',
+        type=int,
+        default=20,
+        help='表示する最大件数 (デフォルト: 20)'
+    )
+    query_parser.add_argument(
+        '--json',
+        action='store_true',
+        help='1行に1件のJSON形式で出力'
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.action == 'ingest':
+        if args.batch_size < 1:
+            parser.error('--batch-size には1以上の値を指定してください')
+        errors = []
+
+        def on_error(path, error):
+            errors.append(path)
+            print(f"  スキップ: {path} ({error})")
+
+        with Catalog(args.db) as catalog:
+            series_count, episode_count = catalog.ingest_files(args.paths, args.batch_size, on_error)
+            total_series, total_episodes = catalog.counts()
+        print(f"取り込みが完了しました: {series_count} シリーズ ({episode_count} 話)"
+              f" / スキップ {len(errors)} ファイル")
+        print(f"カタログ全体: {total_series} シリーズ ({total_episodes} 話)")
+        return
+
+    if args.episode is not None:
+        if not args.series:
+            parser.error('--episode には --series の指定が必要です')
+    elif not args.terms:
+        parser.error('検索語または --series と --episode を指定してください')
+    if not os.path.exists(args.db):
+        parser.error(f'カタログが見つかりません: {args.db}')
+
+    with Catalog(args.db) as catalog:
+        if args.episode is not None:
+            hit = catalog.get_episode(args.series, args.episode)
+            hits = [hit] if hit else []
+        else:
+            hits = catalog.search(' '.join(args.terms), args.limit, args.series)
+
+    for hit in hits:
+        if args.json:
+            print(json.dumps(dataclasses.asdict(hit), ensure_ascii=False))
+        else:
+            print(f"{hit.series_id} 第{hit.number}話 {hit.title}  [{hit.series_title}]")
+            if hit.synopsis:
+                synopsis = ' '.join(hit.synopsis.split())
+                print(f"    {synopsis[:80]}{'…' if len(synopsis) > 80 else ''}")
+    if not hits:
+        print("該当するエピソードはありません。", file=sys.stderr)
+        sys.exit(1)
+
+
+def snapshot_main(argv):
+    """snapshot サブコマンド: 保存済みのHTMLから通信せずにメタ情報を一括抽出します。"""
+    import tarfile
+    from .catalog import Catalog, series_key
+    from .snapshot import extract_snapshots
+
+    parser = argparse.ArgumentParser(
+        prog='abema_extractor.py snapshot',
+        description='保存済みのシリーズ・エピソードページ（ディレクトリまたは tar アーカイブ）から、'
+                    '通信せずにメタ情報を一括抽出します。'
+    )
+    parser.add_argument(
+        'paths',
+        nargs='+',
+        help='HTMLファイル、それらを含むディレクトリ、または tar アーカイブ（gzip / bz2 / xz 圧縮も可）'
+    )
+    parser.add_argument(
+        '-d', '--output-dir',
+        default='output',
+        help='シリーズごとの出力先ディレクトリ (デフォルト: output)'
+    )
+    add_format_argument(parser)
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=None,
+        help='ページの走査に使用するプロセス数 (デフォルト: CPUコア数、0 で並列化しない)'
+    )
+    add_catalog_argument(parser)
+
+    args = parser.parse_args(argv)
+    if args.jobs is not None and args.jobs < 0:
+        parser.error('--jobs には0以上の値を指定してください')
+
+    def on_error(name, error):
+        print(f"  スキップ: {name} ({error})")
+
+    try:
+        results, report = extract_snapshots(args.paths, args.jobs, on_error)
+    except (OSError, tarfile.TarError) as e:
+        parser.error(f'保存済みのページを読み込めません: {e}')
+    except KeyboardInterrupt:
+        print("\nユーザーによって中断されました。")
+        sys.exit(1)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for metadata in results:
+        output = os.path.join(args.output_dir, f'{series_key(metadata)}.{WRITERS[args.format].extension}')
+        write_metadata(metadata, output, args.format)
+        print(f"  完了: {metadata.title} ({len(metadata.episodes)}話) -> {output}")
+    print(f"\n一括抽出が完了しました: {report.series} シリーズ ({report.episodes} 話、あらすじ {report.synopses} 話)")
+    print(f"走査したページ: {report.files} ({report.bytes / 1e6:.1f} MB, {report.elapsed:.1f} 秒,"
+          f" {report.megabytes_per_second:.1f} MB/s)")
+    if report.unknown or report.orphans or report.errors:
+        print(f"種別不明 {report.unknown} / シリーズページのないエピソード {report.orphans}"
+              f" / 読み込み失敗 {report.errors}")
+    if args.catalog and results:
+        with Catalog(args.catalog) as catalog:
+            catalog.add_many(results)
+        print(f"カタログ: {args.catalog} に {len(results)} シリーズ ({report.episodes} 話) を登録しました")
+    if not results:
+        sys.exit(1)
+
+
+def serve_main(argv):
+    """serve サブコマンド: 抽出処理を常駐させ、ローカルの問い合わせAPIを提供します。"""
+    from .extractor import AbemaMetadataExtractor
+    from .server import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, MetadataService, create_server
+
+    parser = argparse.ArgumentParser(
+        prog='abema_extractor.py serve',
+        description='接続・キャッシュを保持したまま常駐し、シリーズ・エピソードのメタ情報をJSONで返します。',
+        epilog='API: GET /series/{ID}, /series/{ID}/episodes/{N}, /lookup?url=URL, /health\n'
+               '    (synopsis=0 であらすじを省略、refresh=1 で取得し直し)',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='待ち受けるアドレス (デフォルト: 127.0.0.1)'
+    )
+
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8765,
+        help='待ち受けるポート番号 (デフォルト: 8765)'
+    )
+
+    parser.add_argument(
+        '--socket',
+        metavar='PATH',
+        help='TCPの代わりに待ち受ける Unix ドメインソケットのパス'
+    )
+
+    parser.add_argument(
+        '--ttl',
+        type=float,
+        default=DEFAULT_TTL,
+        metavar='SECONDS',
+        help=f'取得結果をメモリに保持する秒数。0で保持しない (デフォルト: {DEFAULT_TTL:g})'
+    )
+
+    parser.add_argument(
+        '--max-series',
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help=f'メモリに保持するシリーズ数の上限 (デフォルト: {DEFAULT_MAX_ENTRIES})'
+    )
+
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=4,
+        help='1シリーズのあらすじを並列取得する際の同時接続数 (デフォルト: 4)'
+    )
+
+    add_synopsis_source_argument(parser)
+    add_network_arguments(parser)
+    add_cache_arguments(parser)
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='各リクエストの結果など詳細なログを標準エラー出力に表示'
+    )
+
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error('--jobs には1以上の値を指定してください')
+    if args.ttl < 0:
+        parser.error('--ttl には0以上の値を指定してください')
+    if args.max_series < 1:
+        parser.error('--max-series には1以上の値を指定してください')
+    validate_network_arguments(parser, args)
+    cache = create_cache(parser, args)
+    configure_logging(args)
+
+    extractor = AbemaMetadataExtractor(max_workers=args.jobs, cache=cache, offline=args.offline,
+                                       connect_timeout=args.connect_timeout,
+                                       read_timeout=args.read_timeout,
+                                       series_deadline=args.deadline,
+                                       synopsis_sources=[] if args.synopsis_source == 'page' else None,
+                                       flow_control=create_flow_control(args))
+    service = MetadataService(extractor, ttl=args.ttl, max_entries=args.max_series)
+    try:
+        server = create_server(service, args.host, args.port, args.socket)
+    except OSError as e:
+        parser.error(f'待ち受けを開始できません: {e}')
+
+    if args.socket:
+        print(f"問い合わせサーバーを開始しました: unix:{args.socket}")
+    else:
+        host, port = server.server_address[:2]
+        print(f"問い合わせサーバーを開始しました: http://{host}:{port}/")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n問い合わせサーバーを終了します。")
+    finally:
+        server.server_close()
+        extractor.close()
+
+
+def watch_main(argv):
+    """watch サブコマンド: 多数のシリーズを条件付きリクエストで監視し、新しい話をイベントとして出力します。"""
+    from .batch import read_series_urls
+    from .extractor import AbemaMetadataExtractor
+    from .watch import WatchPolicy, Watcher
+
+    parser = argparse.ArgumentParser(
+        prog='abema_extractor.py watch',
+        description='シリーズページのみを条件付きリクエストで定期的に確認し、新しい話・変更を JSON Lines で出力します。'
+    )
+
+    parser.add_argument(
+        'input',
+        nargs='?',
+        default='-',
+        help='1行に1つのシリーズURLを記載したファイル（省略時または - で標準入力）'
+    )
+
+    parser.add_argument(
+        '--state',
+        default='watch_state.json',
+        help='既知の話・ETag・配信周期などを保存する状態ファイル (デフォルト: watch_state.json)'
+    )
+
+    parser.add_argument(
+        '--events',
+        default='-',
+        metavar='PATH',
+        help='変更イベントを追記する JSON Lines ファイル (デフォルト: - で標準出力)'
+    )
+
+    parser.add_argument(
+        '--once',
+        action='store_true',
+        help='確認時刻を過ぎたシリーズを1回だけ確認して終了（cron 等からの定期実行向け）'
+    )
+
+    parser.add_argument(
+        '--min-interval',
+        type=float,
+        default=WatchPolicy.min_interval,
+        metavar='SECONDS',
+        help=f'1シリーズの確認間隔の下限 (デフォルト: {WatchPolicy.min_interval:g})'
+    )
+
+    parser.add_argument(
+        '--max-interval',
+        type=float,
+        default=WatchPolicy.max_interval,
+        metavar='SECONDS',
+        help=f'更新のないシリーズの確認間隔の上限 (デフォルト: {WatchPolicy.max_interval:g})'
+    )
+
+    parser.add_argument(
+        '--no-synopsis',
+        action='store_true',
+        help='新しい話のあらすじの取得をスキップ'
+    )
+
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=4,
+        help='同時に確認するシリーズ数とあらすじの並列取得数 (デフォルト: 4)'
+    )
+
+    add_synopsis_source_argument(parser)
+    add_network_arguments(parser)
+    add_metrics_arguments(parser)
+
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error('--jobs には1以上の値を指定してください')
+    if not 0 < args.min_interval <= args.max_interval:
+        parser.error('0 < --min-interval <= --max-interval となるように指定してください')
+    validate_network_arguments(parser, args)
+    configure_logging(args)
+
+    try:
+        if args.input == '-':
+            urls = read_series_urls(sys.stdin)
+        else:
+            with open(args.input, 'r', encoding='utf-8') as f:
+                urls = read_series_urls(f)
+    except OSError as e:
+        parser.error(f'URL一覧を読み込めません: {e}')
+    if not urls:
+        parser.error('監視対象のシリーズURLがありません')
+
+    events = sys.stdout if args.events == '-' else open(args.events, 'a', encoding='utf-8')
+
+    def emit(record):
+        events.write(json.dumps(record, ensure_ascii=False) + '\n')
+        events.flush()
+
+    extractor = AbemaMetadataExtractor(max_workers=args.jobs,
+                                       connect_timeout=args.connect_timeout,
+                                       read_timeout=args.read_timeout,
+                                       series_deadline=args.deadline,
+                                       synopsis_sources=[] if args.synopsis_source == 'page' else None,
+                                       flow_control=create_flow_control(args))
+    try:
+        watcher = Watcher(extractor, urls, args.state, emit,
+                          policy=WatchPolicy(min_interval=args.min_interval, max_interval=args.max_interval),
+                          include_synopsis=not args.no_synopsis)
+    except (OSError, ValueError) as e:
+        parser.error(f'状態ファイルを読み込めません: {e}')
+
+    # イベントを標準出力に出すため、進行状況は標準エラー出力に表示する
+    print(f"監視を開始します: {len(urls)} シリーズ（状態ファイル: {args.state}）", file=sys.stderr)
+    try:
+        if args.once:
+            polled = watcher.poll_due()
+            print(f"{polled} シリーズを確認しました", file=sys.stderr)
+        else:
+            watcher.run()
+    except KeyboardInterrupt:
+        print("\n監視を終了します。", file=sys.stderr)
+    finally:
+        extractor.close()
+        if events is not sys.stdout:
+            events.close()
+    # 標準出力のイベント（JSON Lines）に混ざらないよう、計測結果も標準エラー出力に表示する
+    report_metrics(extractor, args, stream=sys.stderr)
+
+
+# 先頭の引数で選択するサブコマンド（それ以外は単一シリーズの抽出として扱う）
+COMMANDS = {
+    'batch': batch_main,
+    'catalog': catalog_main,
+    'serve': serve_main,
+    'snapshot': snapshot_main,
+    'watch': watch_main,
+}
+
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -3,13 +3,60 @@
 Core extraction functionality for AbemaTV metadata
 """
 
-import urllib.request
-import urllib.error
+import codecs
+import http.client
+import logging
 import re
+import threading
 import time
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional, List, Sequence, Tuple, Union
 from datetime import datetime
-from .models import SeriesMetadata, EpisodeMetadata
+from .cache import ResponseCache
+from .jsonld import JsonLdDocument, JsonLdScanner, decode_block, has_description, iter_strings
+from .limiter import STATE_CODES, FlowControl, Permit
+from .metrics import Metrics
+from .models import SeriesMetadata, EpisodeMetadata, episode_id
+from .retry import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, Deadline, RetryPolicy
+from .session import HTTPResponse, HTTPSession
+from .synopsis import (DEFAULT_SYNOPSIS_SOURCES, SeriesPage, SynopsisLookup, SynopsisSource, fill_synopses,
+                       missing_synopses, scan_sources)
+
+
+logger = logging.getLogger(__name__)
+
+# 既定のユーザーエージェント
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# 抽出対象サイトのベースURL
+DEFAULT_BASE_URL = 'https://abema.tv/'
+
+# シリーズタイトルとみなさないパンくずリストのナビゲーション項目
+NAVIGATION_NAMES = frozenset(['ホーム', 'アニメ', 'ドラマ', '詳細'])
+
+# キャプションから話数とサブタイトルを取り出すパターン（末尾の「のサムネイル」は除去）
+CAPTION_PATTERN = re.compile(r'(?:.*?)第(\d+)話\s*(.+?)(?:\s*のサムネイル)?$')
+
+
+# シリーズURLからシリーズIDを取り出すパターン
+SERIES_ID_PATTERN = re.compile(r'/title/([^/?#]+)')
+
+
+# 期限切れのため取得しなかったことを表す値
+_SKIPPED = object()
+
+
+def extract_series_id(series_url: str) -> Optional[str]:
+    """シリーズURLからシリーズID（例: 189-85）を取り出します。
+
+    Args:
+        series_url: シリーズのURL
+
+    Returns:
+        シリーズID。URLに含まれない場合は None。
+    """
+    match = SERIES_ID_PATTERN.search(series_url)
+    return match.group(1) if match else None
 
 
 class AbemaExtractorError(Exception):
@@ -22,194 +69,640 @@ class NetworkError(AbemaExtractorError):
     pass
 
 
+class DeadlineExpiredError(NetworkError):
+    """処理期限を過ぎたため通信を行わなかった場合のエラー"""
+    pass
+
+
 class InvalidURLError(AbemaExtractorError):
     """無効なURLまたは見つからないページのエラー"""
     pass
 
 
-class AbemaMetadataExtractor:
+class CircuitOpenError(NetworkError):
+    """失敗が続いたためにホストへの送信を一時的に止めている場合のエラー"""
+    pass
+
+
+class MetadataParser:
+    """ページのHTML（JSON-LD）からメタ情報を取り出す処理をまとめた基底クラス
+
+    通信は行わないため、同期版・非同期版の抽出クラスで共有します。
+    """
+
+    base_url = DEFAULT_BASE_URL
+
+    def _validate_url(self, url: str) -> None:
+        if not url.startswith(self.base_url):
+            raise InvalidURLError(f"無効なURL形式です。'{self.base_url}' で始まるURLを指定してください: {url}")
+
+    def extract_series_title(self, content: Union[str, JsonLdDocument]) -> str:
+        """HTMLコンテンツからシリーズタイトルを抽出します。
+
+        Args:
+            content: ページのHTMLソースコード、または解析済みの JsonLdDocument
+
+        Returns:
+            抽出されたシリーズタイトル。見つからない場合は「不明なシリーズ」。
+        """
+        document = JsonLdDocument.coerce(content)
+        for breadcrumb in document.of_type('BreadcrumbList'):
+            for name in iter_strings(breadcrumb, 'name'):
+                # 一般的なナビゲーション項目を除外し、ある程度の長さがあるものをタイトルとみなす
+                if name not in NAVIGATION_NAMES and len(name) > 2:
+                    return name
+        return "不明なシリーズ"
+
+    def extract_episodes(self, content: Union[str, JsonLdDocument], series_url: str) -> List[EpisodeMetadata]:
+        """HTMLコンテンツから各エピソードの情報を抽出します。
+
+        Args:
+            content: ページのHTMLソースコード、または解析済みの JsonLdDocument
+            series_url: シリーズのベースURL（ID抽出用）
+
+        Returns:
+            EpisodeMetadataのリスト（話数順にソート済み）
+        """
+        document = JsonLdDocument.coerce(content)
+        episodes = []
+
+        for node in document.nodes:
+            caption = node.get('caption')
+            # 話数とタイトルを抽出（例: "第1話 タイトル" または "第1話 タイトルのサムネイル"）
+            if not isinstance(caption, str) or '第' not in caption or '話' not in caption:
+                continue
+            title_match = CAPTION_PATTERN.search(caption)
+            if not title_match:
+                continue
+
+            episode_num = int(title_match.group(1))
+            title = title_match.group(2).strip()
+
+            # URL（サムネイルURL）を取得
+            thumbnail_url = node.get('url')
+            if not isinstance(thumbnail_url, str):
+                thumbnail_url = ''
+
+            # エピソードIDと個別ページのURLを生成
+            episode_id = self._generate_episode_id(thumbnail_url, series_url, episode_num)
+
+            episodes.append(EpisodeMetadata(
+                number=episode_num,
+                title=title,
+                url=f'{self.base_url}video/episode/{episode_id}' if episode_id else None
+            ))
+
+        return sorted(episodes, key=lambda x: x.number)
+
+    def _generate_episode_id(self, thumbnail_url: str, series_url: str, episode_num: int) -> Optional[str]:
+        """シリーズURLと話数からエピソードIDを推測生成します。
+
+        Args:
+            thumbnail_url: サムネイル画像のURL
+            series_url: シリーズのURL
+            episode_num: 話数
+
+        Returns:
+            生成されたエピソードID（例: 189-85_s1_p1）。生成できない場合は None。
+        """
+        # URLからシリーズID（例: 189-85）を抽出
+        series_id = extract_series_id(series_url)
+
+        if not series_id:
+            return None
+
+        # 標準的なパターン（シリーズID + _s1_p + 話数）で生成
+        return episode_id(series_id, episode_num)
+
+    def extract_synopsis(self, content: Union[str, JsonLdDocument]) -> Optional[str]:
+        """エピソードページのHTMLコンテンツからあらすじを抽出します。
+
+        Args:
+            content: ページのHTMLソースコード、または解析済みの JsonLdDocument
+
+        Returns:
+            あらすじ文字列。見つからない場合は None。
+        """
+        document = JsonLdDocument.coerce(content)
+        for description in document.iter_values('description'):
+            if isinstance(description, str) and description:
+                return description
+        return None
+
+
+class AbemaMetadataExtractor(MetadataParser):
     """AbemaTVからメタ情報を抽出するコアクラス"""
 
-    def __init__(self, user_agent: Optional[str] = None):
+    def __init__(self, user_agent: Optional[str] = None, max_workers: int = 4,
+                 session: Optional[HTTPSession] = None, cache: Optional[ResponseCache] = None,
+                 offline: bool = False, stream_synopsis: bool = True,
+                 base_url: str = DEFAULT_BASE_URL,
+                 connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 series_deadline: Optional[float] = None,
+                 metrics: Optional[Metrics] = None,
+                 parse_workers: int = 0,
+                 synopsis_sources: Optional[Sequence[SynopsisSource]] = None,
+                 flow_control: Optional[FlowControl] = None):
         """初期化
 
         Args:
             user_agent: 使用するユーザーエージェント文字列。省略時はデフォルトを使用。
+            max_workers: あらすじを並列取得する際の最大ワーカー数（1で逐次取得）
+            session: 共有するHTTPセッション。省略時は持続的接続を再利用するセッションを新規作成。
+            cache: レスポンスを保存・再検証するディスクキャッシュ。省略時はキャッシュしない。
+            offline: True の場合は通信せず、キャッシュ済みのページのみを使用する
+            stream_synopsis: True の場合、あらすじ取得時にページを逐次受信し、必要な JSON-LD を
+                受信した時点で打ち切る（キャッシュ使用時はページ全体を取得して保存する）
+            base_url: 取得対象とするサイトのベースURL（テスト用のローカルサーバー等を指定可能）
+            connect_timeout: 接続確立のタイムアウト秒数（session を省略した場合に使用）
+            read_timeout: 受信待ちのタイムアウト秒数（session を省略した場合に使用）
+            retry_policy: リトライ間隔を決めるポリシー。省略時はジッター付き指数バックオフ。
+            series_deadline: 1シリーズの抽出に許容する秒数。超過した時点で残りのあらすじ取得を
+                スキップします（None で無期限）。
+            metrics: 処理段階ごとの所要時間やカウンターを記録する Metrics。省略時は新規作成。
+            parse_workers: 1以上の場合、ページの解析をこの数のプロセスで並列に行い、
+                extract_all_metadata を 取得→解析→書き出し のパイプラインで処理します（0 で無効）。
+            synopsis_sources: 個別ページを取得する前に、あらすじをまとめて取り出す取得元のリスト。
+                省略時はシリーズページに埋め込まれた JSON-LD とシーズン単位の JSON-LD 文書を使用し、
+                空のリストを指定するとすべての話を個別ページから取得します。
+            flow_control: 応答時間とエラーに応じてホストごとの同時リクエスト数を調整し、
+                失敗が続いたホストへの送信を一時的に止める流量制御（None で無効）
         """
-        self.user_agent = user_agent or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        if max_workers < 1:
+            raise ValueError(f"max_workers は1以上を指定してください: {max_workers}")
+        if parse_workers < 0:
+            raise ValueError(f"parse_workers は0以上を指定してください: {parse_workers}")
+        if offline and cache is None:
+            raise ValueError("オフラインモードにはキャッシュの指定が必要です")
+        self.user_agent = user_agent or DEFAULT_USER_AGENT
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.max_workers = max_workers
+        self.session = session or HTTPSession(user_agent=self.user_agent, pool_size=max_workers,
+                                              connect_timeout=connect_timeout, read_timeout=read_timeout)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.series_deadline = series_deadline
+        self.cache = cache
+        self.offline = offline
+        self.stream_synopsis = stream_synopsis
+        self.metrics = metrics or Metrics()
+        self.parse_workers = parse_workers
+        self.synopsis_sources = list(DEFAULT_SYNOPSIS_SOURCES if synopsis_sources is None else synopsis_sources)
+        self.flow_control = flow_control
+        self._parse_pool = None
+        self._parse_pool_lock = threading.Lock()
+
+    def parse_pool(self):
+        """ページの解析に使用する ParsePool を返します（初回の呼び出し時に作成）。"""
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                from .pipeline import ParsePool
+                self._parse_pool = ParsePool(self.parse_workers)
+            return self._parse_pool
+
+    def collect_metrics(self) -> Dict[str, Any]:
+        """セッションとキャッシュの統計をゲージとして反映し、すべての計測値を返します。
 
-    def fetch_page(self, url: str, retries: int = 3) -> str:
+        Returns:
+            Metrics.snapshot() の辞書
+        """
+        stats = self.session.stats
+        self.metrics.set_gauge('session.requests', stats.requests)
+        self.metrics.set_gauge('session.connections_opened', stats.connections_opened)
+        self.metrics.set_gauge('session.connections_reused', stats.connections_reused)
+        self.metrics.set_gauge('session.bytes_received', stats.bytes_received)
+        if self.cache:
+            for name in ('hits', 'revalidated', 'misses', 'stores', 'evictions'):
+                self.metrics.set_gauge(f'cache.{name}', getattr(self.cache.stats, name))
+        if self.flow_control:
+            for host, state in self.flow_control.snapshot().items():
+                self.metrics.set_gauge(f'flow.{host}.limit', state['limit'])
+                self.metrics.set_gauge(f'flow.{host}.in_flight', state['in_flight'])
+                self.metrics.set_gauge(f'flow.{host}.circuit', STATE_CODES[state['state']])
+        return self.metrics.snapshot()
+
+    def close(self) -> None:
+        """セッションが保持している接続と、解析用のワーカープロセスをすべて閉じます。"""
+        self.session.close()
+        with self._parse_pool_lock:
+            pool, self._parse_pool = self._parse_pool, None
+        if pool is not None:
+            pool.close()
+
+    def __enter__(self) -> 'AbemaMetadataExtractor':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def fetch_page(self, url: str, retries: int = 3, deadline: Optional[Deadline] = None) -> str:
         """指定されたURLのウェブページを取得します（リトライ機能付き）。
 
         Args:
             url: 取得対象のURL
             retries: 通信失敗時の最大リトライ回数
+            deadline: 処理期限。期限内に再試行できない場合はリトライせずに失敗します。
 
         Returns:
             HTMLコンテンツ文字列
 
+        Raises:
+            InvalidURLError: URLが無効、またはページが存在しない(404)場合
+            NetworkError: 通信エラーが解決しない場合、またはオフラインでキャッシュが存在しない場合
+        """
+        self._validate_url(url)
+
+        # キャッシュがTTL内であれば通信せずに返す
+        entry = self.cache.get(url) if self.cache else None
+        if entry and (self.offline or self.cache.is_fresh(entry)):
+            self.cache.record_hit()
+            return self._decode(entry.body)
+        if self.offline:
+            raise NetworkError(f"オフラインモードですが、キャッシュにページが存在しません: {url}")
+
+        headers = entry.conditional_headers() if entry else {}
+        with self.metrics.time('fetch'):
+            response, body = self._request(url, retries, lambda r: r.read(), headers, deadline)
+
+        # 304 Not Modified の場合はキャッシュ済みのボディを再利用する
+        if response.status == 304:
+            self.cache.refresh(entry, response.headers)
+            return self._decode(entry.body)
+
+        self.metrics.observe('page_bytes', len(body))
+        if self.cache:
+            self.cache.store(url, body, response.headers)
+        return self._decode(body)
+
+    def fetch_page_conditional(self, url: str, etag: Optional[str] = None,
+                               last_modified: Optional[str] = None, retries: int = 3,
+                               deadline: Optional[Deadline] = None) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """前回の ETag / Last-Modified を付けた条件付きリクエストでページを取得します。
+
+        キャッシュは使用せず、検証子は呼び出し側が保持します（監視モードで使用）。
+
+        Args:
+            url: 取得対象のURL
+            etag: 前回の応答の ETag
+            last_modified: 前回の応答の Last-Modified
+            retries: 通信失敗時の最大リトライ回数
+            deadline: 処理期限。期限内に再試行できない場合はリトライせずに失敗します。
+
+        Returns:
+            (HTMLコンテンツ, ETag, Last-Modified) のタプル。変更がない(304)場合、HTMLコンテンツは None。
+
+        Raises:
+            InvalidURLError: URLが無効、またはページが存在しない(404)場合
+            NetworkError: 通信エラーが解決しない場合
+        """
+        self._validate_url(url)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        with self.metrics.time('fetch'):
+            response, body = self._request(url, retries, lambda r: r.read(), headers, deadline)
+        etag = response.headers.get('ETag') or etag
+        last_modified = response.headers.get('Last-Modified') or last_modified
+        if response.status == 304:
+            return None, etag, last_modified
+        self.metrics.observe('page_bytes', len(body))
+        return self._decode(body), etag, last_modified
+
+    def fetch_page_until(self, url: str, until: Callable[[Any], bool], retries: int = 1,
+                         deadline: Optional[Deadline] = None) -> str:
+        """ページを逐次受信し、条件を満たす JSON-LD ブロックの終端まで受信した時点で打ち切ります。
+
+        解析は行わず、打ち切り時点までのHTMLを返します（解析を別プロセスで行う場合に使用）。
+        キャッシュ使用時、または stream_synopsis が False の場合はページ全体を取得します。
+
+        Args:
+            url: 取得対象のURL
+            until: デコード済みのブロックを受け取り、受信を終了してよければ True を返す関数
+                （例: has_description）
+            retries: 通信失敗時の最大リトライ回数
+            deadline: 処理期限。期限内に再試行できない場合はリトライせずに失敗します。
+
+        Returns:
+            HTMLコンテンツ文字列（条件を満たすブロックがない場合はページ全体）
+        """
+        if self.cache is not None or not self.stream_synopsis:
+            return self.fetch_page(url, retries, deadline)
+        self._validate_url(url)
+        received = {'bytes': 0}
+
+        def consume(response):
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            # <meta name="description"> 等に惑わされないよう、完結した JSON-LD ブロックのみを判定する
+            scanner = JsonLdScanner()
+            parts = []
+            for chunk in response.iter_chunks():
+                received['bytes'] += len(chunk)
+                text = decoder.decode(chunk)
+                parts.append(text)
+                for block_text in scanner.feed(text):
+                    block = decode_block(block_text)
+                    if block is not None and until(block):
+                        return ''.join(parts)
+            parts.append(decoder.decode(b'', final=True))
+            return ''.join(parts)
+
+        with self.metrics.time('fetch'):
+            _, content = self._request(url, retries, consume, deadline=deadline)
+        self.metrics.observe('page_bytes', received['bytes'])
+        return content
+
+    def _decode(self, body: bytes) -> str:
+        with self.metrics.time('decode'):
+            return body.decode('utf-8')
+
+    def stream_jsonld(self, url: str, until: Callable[[Any], bool], retries: int = 1,
+                      deadline: Optional[Deadline] = None) -> JsonLdDocument:
+        """ページを逐次受信しながら JSON-LD ブロックを解析し、条件を満たした時点で受信を打ち切ります。
+
+        Args:
+            url: 取得対象のURL
+            until: デコード済みのブロックを受け取り、受信を終了してよければ True を返す関数
+            retries: 通信失敗時の最大リトライ回数
+            deadline: 処理期限。期限内に再試行できない場合はリトライせずに失敗します。
+
+        Returns:
+            打ち切り時点までに受信したブロックからなる JsonLdDocument
+
         Raises:
             InvalidURLError: URLが無効、またはページが存在しない(404)場合
             NetworkError: 通信エラーが解決しない場合
         """
-        if not url.startswith('https://abema.tv/'):
-            raise InvalidURLError(f"無効なURL形式です。'https://abema.tv/' で始まるURLを指定してください: {url}")
+        self._validate_url(url)
+
+        # 受信・デコード・走査が交互に行われるため、デコードと走査の時間を差し引いた残りを通信時間とする
+        clock = time.perf_counter
+        spent = {'decode': 0.0, 'jsonld_scan': 0.0, 'bytes': 0}
+
+        def consume(response):
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            scanner = JsonLdScanner()
+            blocks = []
+            for chunk in response.iter_chunks():
+                spent['bytes'] += len(chunk)
+                started = clock()
+                text = decoder.decode(chunk)
+                decoded = clock()
+                spent['decode'] += decoded - started
+                try:
+                    for block_text in scanner.feed(text):
+                        block = decode_block(block_text)
+                        blocks.append(block)
+                        # 必要なブロックが揃った時点で残りを読まずに接続を閉じる
+                        if block is not None and until(block):
+                            return blocks
+                finally:
+                    spent['jsonld_scan'] += clock() - decoded
+            return blocks
+
+        start = clock()
+        try:
+            _, blocks = self._request(url, retries, consume, deadline=deadline)
+        finally:
+            self.metrics.record_time('fetch', clock() - start - spent['decode'] - spent['jsonld_scan'])
+            self.metrics.record_time('decode', spent['decode'])
+            self.metrics.record_time('jsonld_scan', spent['jsonld_scan'])
+        self.metrics.observe('page_bytes', spent['bytes'])
+        return JsonLdDocument(blocks)
+
+    def _request(self, url: str, retries: int, consume: Callable[[HTTPResponse], Any],
+                 headers: Optional[Dict[str, str]] = None,
+                 deadline: Optional[Deadline] = None) -> Tuple[HTTPResponse, Any]:
+        """リトライ付きでリクエストを送信し、成功したレスポンスを consume で処理します。
+
+        リトライまでの待ち時間は retry_policy に従います（Retry-After が指定されていればその値）。
+        flow_control が指定されている場合は、試行ごとに送信許可を取得し、応答の結果を反映します。
+
+        Args:
+            url: 取得対象のURL
+            retries: 通信失敗時の最大リトライ回数
+            consume: 成功したレスポンス（2xx）のボディを処理する関数
+            headers: 追加のリクエストヘッダー（条件付きリクエストの場合は 304 も成功とみなす）
+            deadline: 処理期限。待ち時間の後に期限を過ぎる場合はリトライしません。
+
+        Returns:
+            (レスポンス, consume の戻り値) のタプル。304 の場合、戻り値は None。
+
+        Raises:
+            InvalidURLError: ページが存在しない(404)場合
+            CircuitOpenError: 失敗が続いたためにホストへの送信を止めている場合
+            NetworkError: 通信エラーが解決しない場合
+        """
+        request_headers = {'User-Agent': self.user_agent}
+        if headers:
+            request_headers.update(headers)
+        conditional = 'If-None-Match' in request_headers or 'If-Modified-Since' in request_headers
 
         last_exception = None
 
         for attempt in range(retries):
+            status = None
+            retry_after = None
+            permit = self._acquire_permit(url)
+            started = time.monotonic()
+            latency = None
+            self.metrics.increment('requests')
             try:
-                req = urllib.request.Request(url, headers={'User-Agent': self.user_agent})
-                with urllib.request.urlopen(req) as response:
-                    return response.read().decode('utf-8')
-
-            except urllib.error.HTTPError as e:
-                if e.code == 404:
+                with self.session.request(url, headers=request_headers) as response:
+                    status = response.status
+                    latency = time.monotonic() - started
+                    self.metrics.increment(f'http_status.{status}')
+                    logger.debug("GET %s -> %d", url, status, extra={'url': url, 'status': status})
+                    if 200 <= status < 300:
+                        return response, consume(response)
+                    if status == 304 and conditional:
+                        return response, None
+                    retry_after = response.headers.get('Retry-After')
+                    response.read()
+
+                if status == 404:
                     raise InvalidURLError(f"指定されたページが見つかりません (404 Not Found): {url}")
                 # 404以外はサーバーエラー等の可能性があるためリトライ対象
-                last_exception = e
-                if attempt < retries - 1:
-                    print(f"サーバーエラー (HTTP {e.code})。2秒後にリトライします ({attempt + 1}/{retries})...")
-                    time.sleep(2)
+                last_exception = f"HTTP Error {status}"
+                reason = f"サーバーエラー (HTTP {status})"
 
-            except urllib.error.URLError as e:
+            except (OSError, http.client.HTTPException) as e:
                 last_exception = e
-                if attempt < retries - 1:
-                    print(f"通信エラー。2秒後にリトライします ({attempt + 1}/{retries})...")
-                    time.sleep(2)
+                reason = "通信エラー"
+                self.metrics.increment('network_errors')
+                # 受信途中のタイムアウト等も過負荷として流量制御に伝える
+                status = None
+            except InvalidURLError:
+                raise
             except Exception as e:
                 # その他の予期せぬエラー
                 last_exception = e
                 break
+            finally:
+                if permit is not None:
+                    permit.release(status, latency)
 
-        raise NetworkError(f"ページの取得に失敗しました。ネットワーク接続を確認してください: {last_exception}")
+            if attempt >= retries - 1:
+                break
+            delay = self.retry_policy.delay(attempt, status, retry_after)
+            if deadline is not None and not deadline.allows(delay):
+                last_exception = f"{last_exception}（処理期限内にリトライできません）"
+                break
+            self.metrics.increment('retries')
+            logger.warning("%s。%.1f秒後にリトライします (%d/%d)...", reason, delay, attempt + 1, retries,
+                           extra={'url': url, 'status': status, 'attempt': attempt + 1, 'delay': delay})
+            time.sleep(delay)
 
-    def extract_series_title(self, content: str) -> str:
-        """HTMLコンテンツからシリーズタイトルを抽出します。
+        raise NetworkError(f"ページの取得に失敗しました。ネットワーク接続を確認してください: {last_exception}")
 
-        Args:
-            content: ページのHTMLソースコード
+    def _acquire_permit(self, url: str) -> Optional[Permit]:
+        """流量制御が有効な場合に送信許可を取得します（無効な場合は None）。
 
-        Returns:
-            抽出されたシリーズタイトル。見つからない場合は「不明なシリーズ」。
+        Raises:
+            CircuitOpenError: 失敗が続いたためにホストへの送信を止めている場合
         """
-        # application/ld+json スクリプトタグをすべて検索
-        for match in re.finditer(r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', content, re.DOTALL):
-            json_script = match.group(1)
-            
-            # BreadcrumbList タイプが含まれているか確認（スペースを許容する正規表現を使用）
-            if re.search(r'"@type"\s*:\s*"BreadcrumbList"', json_script):
-                # 日本語を含む名前を抽出
-                name_matches = re.findall(r'"name"\s*:\s*"([^"]+)"', json_script)
-                for name in name_matches:
-                    # 一般的なナビゲーション項目を除外し、ある程度の長さがあるものをタイトルとみなす
-                    if name not in ['ホーム', 'アニメ', 'ドラマ', '詳細'] and len(name) > 2:
-                        return name
-        return "不明なシリーズ"
-
-    def extract_episodes(self, content: str, series_url: str) -> List[EpisodeMetadata]:
-        """HTMLコンテンツから各エピソードの情報を抽出します。
+        if self.flow_control is None:
+            return None
+        permit = self.flow_control.acquire(url)
+        if permit is None:
+            self.metrics.increment('circuit_rejections')
+            retry_in = self.flow_control.breaker(url).retry_in()
+            raise CircuitOpenError(f"失敗が続いているため送信を停止しています（約{retry_in:.0f}秒後に再開）: {url}")
+        return permit
+
+    def fetch_synopsis(self, episode_url: str, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """個別エピソードページからあらすじを取得します。
 
         Args:
-            content: ページのHTMLソースコード
-            series_url: シリーズのベースURL（ID抽出用）
+            episode_url: エピソードのURL
+            deadline: 処理期限。既に期限を過ぎている場合は取得しません。
 
         Returns:
-            EpisodeMetadataのリスト（話数順にソート済み）
+            あらすじ文字列。取得失敗時は None。
         """
-        episodes = []
+        if deadline is not None and deadline.expired():
+            return None
+        try:
+            with self.metrics.time('synopsis'):
+                # あらすじ取得失敗は致命的ではないのでリトライ少なめ
+                if self.stream_synopsis and self.cache is None:
+                    # description を含むブロックを受信した時点で残りのページは読まない
+                    content = self.stream_jsonld(episode_url, has_description, retries=1, deadline=deadline)
+                else:
+                    content = self.fetch_page(episode_url, retries=1, deadline=deadline)
+                return self.extract_synopsis(content)
+        except Exception as e:
+            self.metrics.increment('synopsis_failures')
+            logger.debug("あらすじを取得できませんでした: %s (%s)", episode_url, e, extra={'url': episode_url})
+            return None
 
-        # application/ld+json スクリプトタグをすべて検索
-        for match in re.finditer(r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', content, re.DOTALL):
-            json_script = match.group(1)
-
-            # キャプション情報が含まれているか確認
-            if '"caption"' in json_script:
-                caption_match = re.search(r'"caption"\s*:\s*"([^"]+)"', json_script)
-                if caption_match:
-                    caption = caption_match.group(1)
-
-                    # 話数とタイトルを抽出（例: "第1話 タイトル" または "第1話 タイトルのサムネイル"）
-                    if '第' in caption and '話' in caption:
-                        # 非欲張りマッチングを使用して、サムネイルなどの余計な文言を除去
-                        title_match = re.search(r'(?:.*?)第(\d+)話\s*(.+?)(?:\s*のサムネイル)?$', caption)
-                        if title_match:
-                            episode_num = int(title_match.group(1))
-                            title = title_match.group(2).strip()
-
-                            # URL（サムネイルURL）を抽出
-                            url_match = re.search(r'"url"\s*:\s*"([^"]+)"', json_script)
-                            thumbnail_url = url_match.group(1) if url_match else ''
-
-                            # エピソードIDと個別ページのURLを生成
-                            episode_id = self._generate_episode_id(thumbnail_url, series_url, episode_num)
-
-                            episodes.append(EpisodeMetadata(
-                                number=episode_num,
-                                title=title,
-                                url=f'https://abema.tv/video/episode/{episode_id}' if episode_id else None
-                            ))
+    def scan_synopsis_sources(self, page: SeriesPage) -> List[SynopsisLookup]:
+        """synopsis_sources の各取得元でシリーズページを走査します（通信は行いません）。"""
+        return scan_sources(self.synopsis_sources, page)
 
-        return sorted(episodes, key=lambda x: x.number)
+    def fill_bulk_synopses(self, series_url: str, episodes: List[EpisodeMetadata],
+                           lookups: List[SynopsisLookup], deadline: Optional[Deadline] = None) -> int:
+        """取得元が見つけたあらすじを、あらすじが未設定のエピソードに設定します。
 
-    def _generate_episode_id(self, thumbnail_url: str, series_url: str, episode_num: int) -> Optional[str]:
-        """シリーズURLと話数からエピソードIDを推測生成します。
+        取得元が追加の文書（シーズン単位の JSON-LD）を示している場合は、未設定の話が残っているときに限り
+        その文書を1回だけ取得します。取得・解析に失敗しても例外は送出せず、残りの話は個別ページから取得されます。
 
         Args:
-            thumbnail_url: サムネイル画像のURL
             series_url: シリーズのURL
-            episode_num: 話数
+            episodes: あらすじを設定する EpisodeMetadata のリスト
+            lookups: scan_synopsis_sources() の結果（synopsis_sources と同じ順序）
+            deadline: 処理期限。既に期限を過ぎている場合は追加の文書を取得しません。
 
         Returns:
-            生成されたエピソードID（例: 189-85_s1_p1）。生成できない場合は None。
+            あらすじを設定したエピソード数
         """
-        # URLからシリーズID（例: 189-85）を抽出
-        series_id_match = re.search(r'/title/([^/?#]+)', series_url)
-        series_id = series_id_match.group(1) if series_id_match else None
+        total = 0
+        for source, lookup in zip(self.synopsis_sources, lookups):
+            filled = fill_synopses(episodes, lookup.synopses)
+            if lookup.document_url and missing_synopses(episodes) \
+                    and (deadline is None or not deadline.expired()):
+                filled += fill_synopses(episodes, self._fetch_synopsis_document(
+                    source, lookup.document_url, series_url, deadline))
+            if filled:
+                self.metrics.increment(f'synopsis_source.{source.name}', filled)
+            total += filled
+        return total
+
+    def _fetch_synopsis_document(self, source: SynopsisSource, url: str, series_url: str,
+                                 deadline: Optional[Deadline]) -> Dict[int, str]:
+        self.metrics.increment('synopsis_documents')
+        try:
+            content = self.fetch_page(url, retries=1, deadline=deadline)
+            return source.parse_document(content, series_url)
+        except Exception as e:
+            self.metrics.increment('synopsis_document_failures')
+            logger.debug("あらすじの文書を取得できませんでした: %s (%s)", url, e, extra={'url': url})
+            return {}
 
-        if not series_id:
-            return None
+    def fetch_synopses(self, episodes: List[EpisodeMetadata],
+                       on_episode: Optional[Callable[[EpisodeMetadata], None]] = None,
+                       deadline: Optional[Deadline] = None) -> int:
+        """各エピソードのあらすじをワーカープールで並列に取得し、その場で設定します。
 
-        # 標準的なパターン（シリーズID + _s1_p + 話数）で生成
-        return f'{series_id}_s1_p{episode_num}'
-
-    def fetch_synopsis(self, episode_url: str) -> Optional[str]:
-        """個別エピソードページからあらすじを取得します。
+        あらすじが設定済みのエピソードは取得しません。
 
         Args:
-            episode_url: エピソードのURL
+            episodes: あらすじを設定する EpisodeMetadata のリスト
+            on_episode: 各エピソードの処理が終わるたびに話数順で呼び出すコールバック
+            deadline: 処理期限。期限を過ぎた後のエピソードはあらすじを取得せずに処理します。
 
         Returns:
-            あらすじ文字列。取得失敗時は None。
+            期限切れのため取得をスキップしたエピソード数
         """
-        try:
-            content = self.fetch_page(episode_url, retries=1) # あらすじ取得失敗は致命的ではないのでリトライ少なめ
-            for match in re.finditer(r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', content, re.DOTALL):
-                json_script = match.group(1)
-                
-                # description フィールドを探す
-                if '"description"' in json_script:
-                    desc_match = re.search(r'"description"\s*:\s*"([^"]+)"', json_script)
-                    if desc_match:
-                        description = desc_match.group(1)
-                        # エスケープされた文字を処理
-                        description = description.replace('\\n', '\n')
-                        if '\\u' in description:
-                            try:
-                                return description.encode('utf-8').decode('unicode_escape')
-                            except Exception:
-                                pass
-                        return description
-        except Exception:
-            return None
-        return None
-
-    def extract_all_metadata(self, url: str, include_synopsis: bool = True) -> SeriesMetadata:
+        def fetch(url):
+            if deadline is not None and deadline.expired():
+                return _SKIPPED
+            return self.fetch_synopsis(url, deadline)
+
+        urls = [episode.url for episode in missing_synopses(episodes)]
+        workers = min(self.max_workers, len(urls))
+        if workers <= 1:
+            return self._assign_synopses(episodes, map(fetch, urls), on_episode)
+
+        # map は入力順に結果を返すため、話数順が保たれる
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return self._assign_synopses(episodes, executor.map(fetch, urls), on_episode)
+
+    @staticmethod
+    def _assign_synopses(episodes: List[EpisodeMetadata], synopses: Iterator[Any],
+                         on_episode: Optional[Callable[[EpisodeMetadata], None]]) -> int:
+        skipped = 0
+        for episode in episodes:
+            if episode.url and not episode.synopsis:
+                synopsis = next(synopses)
+                if synopsis is _SKIPPED:
+                    skipped += 1
+                    synopsis = None
+                episode.synopsis = synopsis
+            if on_episode is not None:
+                on_episode(episode)
+        return skipped
+
+    def extract_all_metadata(self, url: str, include_synopsis: bool = True,
+                             on_series: Optional[Callable[[SeriesMetadata], None]] = None,
+                             on_episode: Optional[Callable[[EpisodeMetadata], None]] = None) -> SeriesMetadata:
         """シリーズURLからすべてのメタデータを抽出します。
 
+        on_series / on_episode を指定すると、すべてのあらすじの取得を待たずに
+        結果を逐次書き出すことができます（OutputWriter.begin / write_episode を想定）。
+
         Args:
             url: シリーズのURL
             include_synopsis: 各話のあらすじを取得するかどうか
+            on_series: シリーズページの解析後に一度だけ呼び出すコールバック
+                （あらすじは未設定、話数は確定済み）
+            on_episode: 各エピソードの処理が終わるたびに話数順で呼び出すコールバック
+
+        あらすじは synopsis_sources の取得元でまとめて取り出し、見つからなかった話のみ個別ページから取得します。
+        series_deadline が設定されている場合、シリーズページの取得開始からその秒数を超えた時点で
+        残りのあらすじ取得をスキップします（スキップした話はあらすじなしとして出力されます）。
 
         Returns:
             抽出された全データを含む SeriesMetadata オブジェクト
@@ -218,19 +711,39 @@ class AbemaMetadataExtractor:
             InvalidURLError: URLが無効な場合
             NetworkError: 通信エラーの場合
         """
-        content = self.fetch_page(url)
-        series_title = self.extract_series_title(content)
-        episodes = self.extract_episodes(content, url)
-
-        # 必要に応じて各話のあらすじを取得
-        if include_synopsis:
-            for episode in episodes:
-                if episode.url:
-                    episode.synopsis = self.fetch_synopsis(episode.url)
-
-        return SeriesMetadata(
-            title=series_title,
-            source_url=url,
-            extraction_date=datetime.now().strftime('%Y-%m-%d'),
-            episodes=episodes
-        )
+        if self.parse_workers:
+            from .pipeline import run_series_pipeline
+            return run_series_pipeline(self, url, include_synopsis, on_series, on_episode)
+
+        # ページの走査と JSON-LD の解析は一度だけ行う
+        with self.metrics.time('series'):
+            deadline = Deadline(self.series_deadline)
+            content = self.fetch_page(url, deadline=deadline)
+            with self.metrics.time('jsonld_scan'):
+                document = JsonLdDocument.parse(content)
+            with self.metrics.time('episode_parse'):
+                metadata = SeriesMetadata(
+                    title=self.extract_series_title(document),
+                    source_url=url,
+                    extraction_date=datetime.now().strftime('%Y-%m-%d'),
+                    episodes=self.extract_episodes(document, url)
+                )
+            self.metrics.increment('episodes', len(metadata.episodes))
+            if on_series is not None:
+                on_series(metadata)
+
+            # 必要に応じて各話のあらすじを取得（まとめて取り出せなかった話のみ個別ページから取得）
+            if include_synopsis:
+                with self.metrics.time('episode_parse'):
+                    lookups = self.scan_synopsis_sources(SeriesPage(url, content, document))
+                self.fill_bulk_synopses(url, metadata.episodes, lookups, deadline)
+                skipped = self.fetch_synopses(metadata.episodes, on_episode, deadline)
+                if skipped:
+                    self.metrics.increment('synopsis_skipped', skipped)
+                    logger.warning("処理期限（%g秒）を超えたため、%d 話のあらすじ取得をスキップしました",
+                                   self.series_deadline, skipped, extra={'url': url, 'skipped': skipped})
+            elif on_episode is not None:
+                for episode in metadata.episodes:
+                    on_episode(episode)
+
+        return metadata
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+HTML内の JSON-LD ブロックを一度だけ走査・解析するドキュメントモデル
+"""
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+
+# JSON-LD スクリプトタグを識別する属性
+JSONLD_TYPE_ATTR = 'type="application/ld+json"'
+JSONLD_TYPE_ATTR_BYTES = JSONLD_TYPE_ATTR.encode('ascii')
+
+_decoder = json.JSONDecoder(strict=False)
+
+
+def iter_block_texts(content: str) -> Iterator[str]:
+    """HTMLから application/ld+json スクリプトタグの本文を文書順に返します。
+
+    正規表現の非欲張りマッチよりも高速な str.find による一度きりの走査です。
+
+    Args:
+        content: ページのHTMLソースコード
+
+    Yields:
+        スクリプトタグ内のテキスト
+    """
+    find = content.find
+    pos = 0
+    while True:
+        start = find('<script', pos)
+        if start < 0:
+            return
+        tag_end = find('>', start)
+        if tag_end < 0:
+            return
+        end = find('</script>', tag_end)
+        if end < 0:
+            return
+        if JSONLD_TYPE_ATTR in content[start:tag_end]:
+            yield content[tag_end + 1:end]
+        pos = end + 9
+
+
+def iter_block_bytes(data, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """bytes / mmap から application/ld+json スクリプトタグの本文を、デコードせずに文書順で返します。
+
+    タグの検索はバイト列のまま行い、コピーされるのは一致したブロックの本文のみです。
+    UTF-8 では '<script' などのASCII文字が多バイト文字の一部として現れないため、バイト単位で安全に検索できます。
+
+    Args:
+        data: ページのHTMLを含む bytes または mmap
+        start: 走査を開始する位置
+        end: 走査を終了する位置（省略時は末尾まで）
+
+    Yields:
+        スクリプトタグ内のバイト列
+    """
+    end = len(data) if end is None else end
+    find = data.find
+    pos = start
+    while True:
+        tag_start = find(b'<script', pos, end)
+        if tag_start < 0:
+            return
+        tag_end = find(b'>', tag_start, end)
+        if tag_end < 0:
+            return
+        block_end = find(b'</script>', tag_end, end)
+        if block_end < 0:
+            return
+        if data[tag_start:tag_end].find(JSONLD_TYPE_ATTR_BYTES) >= 0:
+            yield data[tag_end + 1:block_end]
+        pos = block_end + 9
+
+
+class JsonLdScanner:
+    """逐次受信したHTML断片から、完結した JSON-LD ブロックの本文を取り出すスキャナー
+
+    未完結のタグ以降のみをバッファに保持するため、ページ全体をメモリに載せる必要がありません。
+    """
+
+    def __init__(self):
+        self._buffer = ''
+
+    def feed(self, text: str) -> List[str]:
+        """HTML断片を追加し、新たに完結したブロックの本文を返します。
+
+        Args:
+            text: 受信したHTML断片
+
+        Returns:
+            完結した JSON-LD ブロックの本文のリスト（文書順）
+        """
+        buffer = self._buffer + text
+        blocks = []
+        pos = 0
+        while True:
+            start = buffer.find('<script', pos)
+            if start < 0:
+                # '<script' が断片の境界で分割されている可能性があるため末尾だけ残す
+                pos = max(pos, len(buffer) - len('<script'))
+                break
+            tag_end = buffer.find('>', start)
+            end = buffer.find('</script>', tag_end) if tag_end >= 0 else -1
+            if end < 0:
+                pos = start
+                break
+            if JSONLD_TYPE_ATTR in buffer[start:tag_end]:
+                blocks.append(buffer[tag_end + 1:end])
+            pos = end + 9
+        self._buffer = buffer[pos:]
+        return blocks
+
+
+def decode_block(text: str) -> Any:
+    """JSON-LD ブロックの本文をデコードします。
+
+    Args:
+        text: スクリプトタグ内のテキスト
+
+    Returns:
+        デコードされた値。JSONとして不正な場合は None。
+    """
+    try:
+        return _decoder.decode(text.strip())
+    except ValueError:
+        return None
+
+
+class JsonLdDocument:
+    """ページ内の JSON-LD ブロックを解析し、@type ごとに索引付けしたもの
+
+    HTMLの走査は構築時の一度だけで、各抽出処理はこのオブジェクトに対して問い合わせます。
+    """
+
+    def __init__(self, blocks: Iterable[Any]):
+        """初期化
+
+        Args:
+            blocks: デコード済みの JSON-LD ブロックの値（None はデコード失敗として無視）
+        """
+        self.blocks: List[Any] = [block for block in blocks if block is not None]
+        self.nodes: List[Dict[str, Any]] = []
+        self._by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for block in self.blocks:
+            self._index(block)
+
+    @classmethod
+    def parse(cls, content: str) -> 'JsonLdDocument':
+        """HTMLを一度だけ走査して JsonLdDocument を構築します。
+
+        Args:
+            content: ページのHTMLソースコード
+
+        Returns:
+            構築された JsonLdDocument
+        """
+        return cls(decode_block(text) for text in iter_block_texts(content))
+
+    @classmethod
+    def parse_bytes(cls, data, start: int = 0, end: Optional[int] = None) -> 'JsonLdDocument':
+        """UTF-8 のHTML（bytes / mmap）を走査し、JSON-LD ブロックの部分のみをデコードして構築します。
+
+        Args:
+            data: ページのHTMLを含む bytes または mmap
+            start: 走査を開始する位置
+            end: 走査を終了する位置（省略時は末尾まで）
+
+        Returns:
+            構築された JsonLdDocument
+        """
+        return cls(decode_block(block.decode('utf-8', errors='replace'))
+                   for block in iter_block_bytes(data, start, end))
+
+    @classmethod
+    def coerce(cls, content: Union[str, 'JsonLdDocument']) -> 'JsonLdDocument':
+        """HTML文字列であれば解析し、既に JsonLdDocument であればそのまま返します。"""
+        if isinstance(content, cls):
+            return content
+        return cls.parse(content)
+
+    def of_type(self, type_name: str) -> List[Dict[str, Any]]:
+        """指定した @type を持つノードを文書順で返します。"""
+        return self._by_type.get(type_name, [])
+
+    @property
+    def types(self) -> List[str]:
+        """文書内に現れる @type の一覧を返します。"""
+        return list(self._by_type)
+
+    def iter_values(self, key: str) -> Iterator[Any]:
+        """文書内のすべてのノードから、指定キーの値を文書順に返します。"""
+        for node in self.nodes:
+            if key in node:
+                yield node[key]
+
+    def _index(self, value: Any) -> None:
+        # 前順走査で、すべてのオブジェクトを文書順に記録する
+        if isinstance(value, dict):
+            self.nodes.append(value)
+            types = value.get('@type')
+            if isinstance(types, str):
+                self._by_type.setdefault(types, []).append(value)
+            elif isinstance(types, list):
+                for type_name in types:
+                    if isinstance(type_name, str):
+                        self._by_type.setdefault(type_name, []).append(value)
+            children = value.values()
+        elif isinstance(value, list):
+            children = value
+        else:
+            return
+        for child in children:
+            if isinstance(child, (dict, list)):
+                self._index(child)
+
+
+def iter_strings(node: Any, key: str) -> Iterator[str]:
+    """ノード配下（自身を含む）から、指定キーの文字列値を文書順に返します。"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            value = current.get(key)
+            if isinstance(value, str):
+                yield value
+            stack.extend(reversed([v for v in current.values() if isinstance(v, (dict, list))]))
+        elif isinstance(current, list):
+            stack.extend(reversed([v for v in current if isinstance(v, (dict, list))]))
+
+
+def has_description(block: Any) -> bool:
+    """ブロック内に空でない description が含まれていれば True を返します。"""
+    return any(isinstance(value, str) and value for value in JsonLdDocument([block]).iter_values('description'))
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+観測した応答時間とエラーに応じて同時リクエスト数を調整する流量制御
+
+ホストごとに次の2つを組み合わせて使用します。
+
+- AdaptiveLimiter: AIMD（加算増・乗算減）方式の同時実行数の上限。上限を使い切っている状態で
+  応答が健全な間は上限を少しずつ引き上げ、429 / 5xx・通信エラー（タイムアウトを含む）・
+  応答時間の急増を観測すると上限を一定の割合で引き下げます。
+- CircuitBreaker: 失敗が連続した場合にそのホストへの送信を一定時間止め、
+  期間経過後に1件だけ試行（half-open）して回復を確かめます。
+
+FlowControl.snapshot() で現在の上限と状態を取得でき、AbemaMetadataExtractor.collect_metrics()
+がゲージとして反映します（serve モードの /health でも参照できます）。
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+
+logger = logging.getLogger(__name__)
+
+# 過負荷とみなすステータスコード（429 と 5xx）
+OVERLOAD_STATUS_MIN = 500
+TOO_MANY_REQUESTS = 429
+
+# サーキットブレーカーの状態
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# ゲージとして記録する際の状態の数値
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def is_overload(status: Optional[int]) -> bool:
+    """応答（通信エラーの場合は None）がサーバーの過負荷を示すかどうかを返します。"""
+    return status is None or status == TOO_MANY_REQUESTS or status >= OVERLOAD_STATUS_MIN
+
+
+class _Token:
+    """AdaptiveLimiter.acquire() が返す、1件のリクエストの枠"""
+
+    __slots__ = ('epoch',)
+
+    def __init__(self, epoch: int):
+        self.epoch = epoch    # 取得時点の引き下げ回数（同じ混雑で何度も引き下げないため）
+
+
+class AdaptiveLimiter:
+    """AIMD 方式で同時実行数の上限を調整するリミッター（スレッドセーフ）
+
+    上限の半分以上を使用している状態で成功した応答1件ごとに increase / 上限 だけ上限を引き上げるため、
+    健全な間は往復1回分ごとに約 increase ずつ増えます（上限を使い切っていない間は増やしません）。
+    過負荷を観測すると上限に backoff を掛けますが、引き下げ前に送信済みだったリクエストの失敗では
+    重ねて引き下げません。
+    応答時間は成功した応答の指数移動平均を基準とし、基準の latency_tolerance 倍かつ
+    基準 + min_spike 秒を超えた応答を急増とみなします。
+    """
+
+    def __init__(self, initial_limit: int = 2, min_limit: int = 1, max_limit: int = 32,
+                 increase: float = 1.0, backoff: float = 0.5, latency_tolerance: float = 2.0,
+                 min_spike: float = 0.1, smoothing: float = 0.2):
+        """初期化
+
+        Args:
+            initial_limit: 開始時の同時実行数の上限
+            min_limit: 上限の下限
+            max_limit: 上限の上限
+            increase: 往復1回分ごとの上限の増加幅
+            backoff: 過負荷を観測した際に上限に掛ける割合（0〜1）
+            latency_tolerance: 応答時間の急増とみなす基準値に対する倍率
+            min_spike: 応答時間の急増とみなす基準値からの最小の増加秒数
+            smoothing: 応答時間の基準値（指数移動平均）の平滑化係数（0〜1）
+        """
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError(f"1 <= min_limit <= max_limit となるように指定してください: {min_limit}, {max_limit}")
+        if not 0 < backoff < 1:
+            raise ValueError(f"backoff は0より大きく1より小さい値を指定してください: {backoff}")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.min_spike = min_spike
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self.latency_baseline: Optional[float] = None
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._epoch = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """現在の同時実行数の上限"""
+        return int(self._limit)
+
+    def acquire(self) -> _Token:
+        """同時実行数が上限未満になるまで待ち、1件分の枠を取得します。"""
+        with self._condition:
+            while self.in_flight >= int(self._limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return _Token(self._epoch)
+
+    def release(self, token: _Token, status: Optional[int], latency: Optional[float] = None) -> None:
+        """枠を返却し、応答の結果から上限を調整します。
+
+        Args:
+            token: acquire() が返した枠
+            status: HTTPステータスコード（通信エラーの場合は None）
+            latency: 送信から応答ヘッダーの受信までの秒数
+        """
+        with self._condition:
+            saturated = self.in_flight * 2 >= self._limit
+            self.in_flight -= 1
+            if is_overload(status) or self._is_spike(latency):
+                self._decrease(token)
+            else:
+                self._observe_latency(latency)
+                if saturated and self._limit < self.max_limit:
+                    self._limit = min(float(self.max_limit), self._limit + self.increase / self._limit)
+                    self.increases += 1
+            self._condition.notify_all()
+
+    def _is_spike(self, latency: Optional[float]) -> bool:
+        baseline = self.latency_baseline
+        if latency is None or baseline is None:
+            return False
+        return latency > baseline * self.latency_tolerance and latency > baseline + self.min_spike
+
+    def _observe_latency(self, latency: Optional[float]) -> None:
+        if latency is None:
+            return
+        if self.latency_baseline is None:
+            self.latency_baseline = latency
+        else:
+            self.latency_baseline += self.smoothing * (latency - self.latency_baseline)
+
+    def _decrease(self, token: _Token) -> None:
+        if token.epoch != self._epoch:
+            return
+        self._epoch += 1
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        self.decreases += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """現在の上限と計測値を辞書で返します。"""
+        with self._condition:
+            return {
+                'limit': int(self._limit),
+                'in_flight': self.in_flight,
+                'latency_baseline': self.latency_baseline,
+                'increases': self.increases,
+                'decreases': self.decreases,
+            }
+
+
+class CircuitBreaker:
+    """連続した失敗でホストへの送信を一時的に止めるサーキットブレーカー（スレッドセーフ）
+
+    closed の間に failure_threshold 回続けて失敗すると open になり、reset_timeout 秒の間は
+    すべての送信を拒否します。経過後は half_open となって1件だけ送信を許可し、
+    成功すれば closed に戻り、失敗すれば再び open になります。
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """初期化
+
+        Args:
+            failure_threshold: open にする連続失敗回数
+            reset_timeout: open にしてから試行を許可するまでの秒数
+            clock: 現在時刻を返す関数（テスト用）
+        """
+        if failure_threshold < 1:
+            raise ValueError(f"failure_threshold は1以上を指定してください: {failure_threshold}")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._clock = clock
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """送信してよいかどうかを返します（half_open の試行枠を取得した場合も True）。"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def retry_in(self) -> float:
+        """送信を再開するまでの残り秒数を返します（closed の場合は 0）。"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - self._clock())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.state = CLOSED
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """失敗を記録し、これにより open になった場合は True を返します。"""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == OPEN:
+                return False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self._opened_at = self._clock()
+                self.opened += 1
+                return True
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """現在の状態を辞書で返します。"""
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures, 'opened': self.opened}
+
+
+class Permit:
+    """FlowControl.acquire() が返す送信許可。応答の結果とともに release() で返却します。"""
+
+    __slots__ = ('host', '_limiter', '_breaker', '_token', '_released')
+
+    def __init__(self, host: str, limiter: AdaptiveLimiter, breaker: CircuitBreaker, token: _Token):
+        self.host = host
+        self._limiter = limiter
+        self._breaker = breaker
+        self._token = token
+        self._released = False
+
+    def release(self, status: Optional[int], latency: Optional[float] = None) -> None:
+        """枠を返却し、結果をリミッターとサーキットブレーカーに反映します（2回目以降は無視）。
+
+        Args:
+            status: HTTPステータスコード（通信エラーの場合は None）
+            latency: 送信から応答ヘッダーの受信までの秒数
+        """
+        if self._released:
+            return
+        self._released = True
+        self._limiter.release(self._token, status, latency)
+        if is_overload(status):
+            if self._breaker.record_failure():
+                logger.warning("%s への失敗が続いたため、%.0f秒間送信を停止します", self.host,
+                               self._breaker.reset_timeout, extra={'host': self.host})
+        else:
+            self._breaker.record_success()
+
+
+class FlowControl:
+    """ホストごとの AdaptiveLimiter と CircuitBreaker をまとめた流量制御（スレッドセーフ）"""
+
+    def __init__(self, initial_limit: int = 2, min_limit: int = 1, max_limit: int = 32,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic, **limiter_options: Any):
+        """初期化
+
+        Args:
+            initial_limit: ホストごとの開始時の同時実行数の上限
+            min_limit: 上限の下限
+            max_limit: 上限の上限（通常はワーカー数）
+            failure_threshold: サーキットブレーカーを open にする連続失敗回数
+            reset_timeout: open にしてから試行を許可するまでの秒数
+            clock: サーキットブレーカーが使用する時計（テスト用）
+            **limiter_options: AdaptiveLimiter に渡すその他の引数
+        """
+        self._limiter_options = dict(limiter_options, initial_limit=initial_limit,
+                                     min_limit=min_limit, max_limit=max_limit)
+        self._breaker_options = {'failure_threshold': failure_threshold,
+                                 'reset_timeout': reset_timeout, 'clock': clock}
+        # 引数の誤りを最初のリクエストではなく作成時に検出する
+        AdaptiveLimiter(**self._limiter_options)
+        CircuitBreaker(**self._breaker_options)
+        self._hosts: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host: str):
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is None:
+                entry = self._hosts[host] = (AdaptiveLimiter(**self._limiter_options),
+                                             CircuitBreaker(**self._breaker_options))
+            return entry
+
+    def limiter(self, url: str) -> AdaptiveLimiter:
+        """URLのホストの AdaptiveLimiter を返します。"""
+        return self._host(urlsplit(url).netloc)[0]
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """URLのホストの CircuitBreaker を返します。"""
+        return self._host(urlsplit(url).netloc)[1]
+
+    def acquire(self, url: str) -> Optional[Permit]:
+        """URLのホストへの送信許可を取得します（同時実行数が上限未満になるまで待機）。
+
+        Returns:
+            送信許可。サーキットブレーカーが送信を止めている場合は None。
+        """
+        host = urlsplit(url).netloc
+        limiter, breaker = self._host(host)
+        if not breaker.allow():
+            return None
+        return Permit(host, limiter, breaker, limiter.acquire())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """ホストごとの上限とサーキットブレーカーの状態を返します。"""
+        with self._lock:
+            hosts = dict(self._hosts)
+        result = {}
+        for host, (limiter, breaker) in hosts.items():
+            result[host] = dict(limiter.snapshot(), **breaker.snapshot())
+        return result
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+処理段階ごとの所要時間・カウンター・ヒストグラムの計測
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+# 計測値を受け取るフック関数の型: hook(種類, 名前, 値)。種類は 'counter' / 'timing' / 'histogram' / 'gauge'
+MetricHook = Callable[[str, str, float], None]
+
+# 処理段階の表示名（format_summary で使用。未登録の名前はそのまま表示）
+STAGE_LABELS = {
+    'fetch': '通信',
+    'decode': 'UTF-8デコード',
+    'jsonld_scan': 'JSON-LD走査',
+    'episode_parse': 'エピソード解析',
+    'synopsis': 'あらすじ取得',
+    'series': 'シリーズ全体',
+}
+
+
+class Histogram:
+    """値の分布を2のべき乗単位のバケットで近似的に保持するヒストグラム
+
+    値の大きさに依存しないため、秒数にもバイト数にも使用できます。
+    パーセンタイルはバケットの上限値で近似します（誤差は最大2倍）。
+    """
+
+    __slots__ = ('count', 'total', 'min', 'max', '_buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buckets: Dict[int, int] = {}
+
+    def observe(self, value: float) -> None:
+        """値を1つ記録します。"""
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        # value は [2^(e-1), 2^e) の範囲に入る（0以下はまとめて最小のバケットへ）
+        exponent = math.frexp(value)[1] if value > 0 else -1074
+        self._buckets[exponent] = self._buckets.get(exponent, 0) + 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """fraction（0〜1）の位置のおおよその値を返します。"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * fraction))
+        seen = 0
+        for exponent in sorted(self._buckets):
+            seen += self._buckets[exponent]
+            if seen >= rank:
+                return min(self.max, max(self.min, math.ldexp(1.0, exponent)))
+        return self.max
+
+    def to_dict(self) -> Dict[str, float]:
+        """集計値を辞書で返します。"""
+        if not self.count:
+            return {'count': 0, 'sum': 0.0}
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+
+class Metrics:
+    """カウンター・所要時間・ヒストグラム・ゲージを集計するクラス（スレッドセーフ）
+
+    add_hook() で登録した関数には、記録された値がその都度渡されます
+    （ダッシュボードへの送信やテストでの検証に使用できます）。
+
+    使用例:
+        metrics = Metrics()
+        with metrics.time('fetch'):
+            body = fetch()
+        metrics.increment('requests')
+        print(metrics.format_summary())
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, float] = {}
+        self._timings: Dict[str, Histogram] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, float] = {}
+        self._hooks: List[MetricHook] = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: MetricHook) -> None:
+        """計測値を受け取るフック関数を登録します。"""
+        with self._lock:
+            self._hooks = self._hooks + [hook]
+
+    def remove_hook(self, hook: MetricHook) -> None:
+        """登録済みのフック関数を解除します。"""
+        with self._lock:
+            self._hooks = [registered for registered in self._hooks if registered is not hook]
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """カウンターを加算します。"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+            hooks = self._hooks
+        self._notify(hooks, 'counter', name, value)
+
+    def record_time(self, name: str, seconds: float) -> None:
+        """処理段階の所要時間（秒）を記録します。"""
+        self._observe(self._timings, 'timing', name, seconds)
+
+    def observe(self, name: str, value: float) -> None:
+        """ヒストグラムに値を記録します（ページサイズ等）。"""
+        self._observe(self._histograms, 'histogram', name, value)
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """ゲージ（最新値のみを保持する値）を設定します。"""
+        with self._lock:
+            self._gauges[name] = value
+            hooks = self._hooks
+        self._notify(hooks, 'gauge', name, value)
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        """with ブロックの所要時間を処理段階 name の時間として記録します。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_time(name, time.perf_counter() - start)
+
+    def counter(self, name: str) -> float:
+        """カウンターの現在値を返します（未記録の場合は 0）。"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def timing(self, name: str) -> Optional[Histogram]:
+        """処理段階の所要時間のヒストグラムを返します（未記録の場合は None）。"""
+        with self._lock:
+            return self._timings.get(name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """すべての計測値をJSONに変換できる辞書で返します。"""
+        with self._lock:
+            return {
+                'counters': dict(sorted(self._counters.items())),
+                'timings': {name: hist.to_dict() for name, hist in sorted(self._timings.items())},
+                'histograms': {name: hist.to_dict() for name, hist in sorted(self._histograms.items())},
+                'gauges': dict(sorted(self._gauges.items())),
+            }
+
+    def reset(self) -> None:
+        """すべての計測値を破棄します（フックは維持）。"""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+            self._histograms.clear()
+            self._gauges.clear()
+
+    def format_summary(self) -> str:
+        """人が読むための集計結果を複数行の文字列で返します。"""
+        data = self.snapshot()
+        lines = ['処理段階ごとの所要時間:']
+        for name, stats in data['timings'].items():
+            if not stats['count']:
+                continue
+            label = STAGE_LABELS.get(name, name)
+            lines.append(
+                f"  {label:<12} 合計 {stats['sum']:8.3f} 秒 / {stats['count']:6d} 回"
+                f" / 平均 {stats['mean'] * 1000:8.2f} ms / p95 {stats['p95'] * 1000:8.2f} ms"
+            )
+        if data['counters']:
+            lines.append('カウンター:')
+            for name, value in data['counters'].items():
+                lines.append(f"  {name:<28} {value:g}")
+        if data['gauges']:
+            lines.append('セッション・キャッシュ:')
+            for name, value in data['gauges'].items():
+                lines.append(f"  {name:<28} {value:g}")
+        for name, stats in data['histograms'].items():
+            if stats['count']:
+                lines.append(f"{name}: 平均 {stats['mean']:.0f} / p95 {stats['p95']:.0f} / 最大 {stats['max']:.0f}")
+        return '\n'.join(lines)
+
+    def _observe(self, table: Dict[str, Histogram], kind: str, name: str, value: float) -> None:
+        with self._lock:
+            histogram = table.get(name)
+            if histogram is None:
+                histogram = table[name] = Histogram()
+            histogram.observe(value)
+            hooks = self._hooks
+        self._notify(hooks, kind, name, value)
+
+    @staticmethod
+    def _notify(hooks: List[MetricHook], kind: str, name: str, value: float) -> None:
+        for hook in hooks:
+            hook(kind, name, value)
@@ -3,11 +3,23 @@
 AbemaTVのメタ情報抽出に使用するデータモデル定義
 """
 
+import sys
+from array import array
+from collections.abc import Sequence
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
 
 
-@dataclass
+# Python 3.10 以降では __slots__ 付きのデータクラスとし、インスタンスごとの __dict__ を持たせない
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+def episode_id(series_id: str, number: int) -> str:
+    """シリーズIDと話数から、標準的なパターンのエピソードID（例: 189-85_s1_p1）を組み立てます。"""
+    return f'{series_id}_s1_p{number}'
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class EpisodeMetadata:
     """各エピソードのメタ情報を保持するクラス"""
     number: int                 # 話数
@@ -16,10 +28,175 @@ class EpisodeMetadata:
     url: Optional[str] = None       # エピソードの個別URL
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class SeriesMetadata:
     """シリーズ全体のメタ情報を保持するクラス"""
     title: str                          # シリーズタイトル
     source_url: str                     # 抽出元のシリーズURL
     extraction_date: str                # 抽出実施日 (YYYY-MM-DD)
-    episodes: List[EpisodeMetadata] = field(default_factory=list)  # 全エピソードのリスト
\ No newline at end of file
+    episodes: Union[List[EpisodeMetadata], 'EpisodeTable'] = field(default_factory=list)  # 全エピソードのリスト
+
+    def compact(self) -> 'SeriesMetadata':
+        """エピソードを EpisodeTable に詰め替え、繰り返し現れる文字列を intern した複製を返します。
+
+        大量のシリーズをメモリに保持する場合（常駐モードのキャッシュ等）に使用します。
+        """
+        episodes = self.episodes if isinstance(self.episodes, EpisodeTable) else EpisodeTable(self.episodes)
+        return SeriesMetadata(title=sys.intern(self.title), source_url=sys.intern(self.source_url),
+                              extraction_date=sys.intern(self.extraction_date), episodes=episodes)
+
+
+class EpisodeRow:
+    """EpisodeTable の1行を EpisodeMetadata と同じ属性で読み書きするビュー"""
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: 'EpisodeTable', index: int):
+        self._table = table
+        self._index = index
+
+    @property
+    def number(self) -> int:
+        return self._table._numbers[self._index]
+
+    @number.setter
+    def number(self, value: int) -> None:
+        # 話数から導出していたURLは変更前の話数のものを保持する
+        url = self.url
+        self._table._numbers[self._index] = value
+        self.url = url
+
+    @property
+    def title(self) -> str:
+        return self._table._titles[self._index]
+
+    @title.setter
+    def title(self, value: str) -> None:
+        self._table._titles[self._index] = value
+
+    @property
+    def synopsis(self) -> Optional[str]:
+        return self._table._synopses[self._index]
+
+    @synopsis.setter
+    def synopsis(self, value: Optional[str]) -> None:
+        self._table._synopses[self._index] = value
+
+    @property
+    def url(self) -> Optional[str]:
+        return self._table._url(self._index)
+
+    @url.setter
+    def url(self, value: Optional[str]) -> None:
+        self._table._set_url(self._index, value)
+
+    def to_metadata(self) -> EpisodeMetadata:
+        """同じ内容の EpisodeMetadata を返します。"""
+        return EpisodeMetadata(number=self.number, title=self.title, synopsis=self.synopsis, url=self.url)
+
+    def _values(self):
+        return (self.number, self.title, self.synopsis, self.url)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (EpisodeRow, EpisodeMetadata)):
+            return self._values() == (other.number, other.title, other.synopsis, other.url)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return 'EpisodeRow(number={!r}, title={!r}, synopsis={!r}, url={!r})'.format(*self._values())
+
+
+class EpisodeTable(Sequence):
+    """1シリーズ分のエピソードを列ごとに保持する省メモリのコンテナ
+
+    話数は整数配列に、サブタイトルとあらすじはリストに格納します。個別ページのURLは
+    「共通の接頭辞 + 話数」（https://abema.tv/video/episode/<シリーズID>_s1_p<話数>）で導出できる場合は保持せず、
+    参照時に組み立てます。要素は EpisodeMetadata と同じ属性を持つ EpisodeRow として返され、
+    属性への代入はテーブルに反映されます。
+    """
+
+    __slots__ = ('url_prefix', '_numbers', '_titles', '_synopses', '_urls')
+
+    def __init__(self, episodes: Iterable[Any] = (), url_prefix: Optional[str] = None):
+        """初期化
+
+        Args:
+            episodes: 格納するエピソード（EpisodeMetadata または同じ属性を持つオブジェクト）
+            url_prefix: 話数を付けると個別ページのURLになる接頭辞。省略時は最初のエピソードのURLから推定します。
+        """
+        self.url_prefix = url_prefix
+        self._numbers = array('l')
+        self._titles: List[str] = []
+        self._synopses: List[Optional[str]] = []
+        # 接頭辞 + 話数 と一致しないURL（None を含む）のみを保持する
+        self._urls: Dict[int, Optional[str]] = {}
+        self.extend(episodes)
+
+    @classmethod
+    def for_series(cls, base_url: str, series_id: str, episodes: Iterable[Any] = ()) -> 'EpisodeTable':
+        """サイトのベースURLとシリーズIDから接頭辞を決めてテーブルを作成します。"""
+        # episode_id() の話数の直前までを接頭辞とする
+        return cls(episodes, sys.intern(f'{base_url}video/episode/{series_id}_s1_p'))
+
+    def append(self, episode: Any) -> None:
+        """エピソードを末尾に追加します。"""
+        index = len(self._numbers)
+        if self.url_prefix is None and episode.url:
+            suffix = str(episode.number)
+            if episode.url.endswith('_s1_p' + suffix):
+                self.url_prefix = sys.intern(episode.url[:-len(suffix)])
+        self._numbers.append(episode.number)
+        self._titles.append(episode.title)
+        self._synopses.append(episode.synopsis)
+        self._set_url(index, episode.url)
+
+    def extend(self, episodes: Iterable[Any]) -> None:
+        for episode in episodes:
+            self.append(episode)
+
+    def _url(self, index: int) -> Optional[str]:
+        if index in self._urls:
+            return self._urls[index]
+        return self.url_prefix + str(self._numbers[index])
+
+    def _set_url(self, index: int, url: Optional[str]) -> None:
+        if self.url_prefix is not None and url is not None and url.startswith(self.url_prefix) \
+                and url[len(self.url_prefix):] == str(self._numbers[index]):
+            self._urls.pop(index, None)
+        else:
+            self._urls[index] = url
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [EpisodeRow(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('EpisodeTable index out of range')
+        return EpisodeRow(self, index)
+
+    def __iter__(self) -> Iterator[EpisodeRow]:
+        for index in range(len(self._numbers)):
+            yield EpisodeRow(self, index)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (EpisodeTable, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'EpisodeTable({len(self)} episodes, url_prefix={self.url_prefix!r})'
+
+    def __reduce__(self):
+        return (EpisodeTable, ([row.to_metadata() for row in self], self.url_prefix))
+
+    def to_list(self) -> List[EpisodeMetadata]:
+        """各行を EpisodeMetadata に変換したリストを返します。"""
+        return [row.to_metadata() for row in self]
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+抽出結果の出力（YAML / JSON Lines / JSON 形式）
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional, TextIO
+
+from .models import EpisodeMetadata, SeriesMetadata
+
+
+# あらすじが取得できなかったエピソードに出力する文字列
+NO_SYNOPSIS = 'あらすじなし'
+
+# 書き込み中のファイルに付ける拡張子（完了時に本来のファイル名へ置き換える）
+PART_SUFFIX = '.part'
+
+_YAML_OPTIONS = dict(
+    allow_unicode=True,
+    default_flow_style=False,
+    sort_keys=False,
+    indent=2,
+    width=120
+)
+
+# (yaml モジュール, ダンパー, ローダー)。起動時間を抑えるため、YAML を扱う時点で初めて import する
+_YAML = None
+
+
+def _yaml():
+    global _YAML
+    if _YAML is None:
+        import yaml
+        # libyaml が利用できる場合は C 実装のダンパー・ローダーを使用する
+        _YAML = (yaml, getattr(yaml, 'CDumper', yaml.Dumper), getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+    return _YAML
+
+
+def _has_non_bmp(data: Any) -> bool:
+    """出力する値（辞書・リストの入れ子）に BMP 外の文字（絵文字等）を含む文字列があれば True を返します。"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            if value and max(value) > '\uffff':
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return False
+
+
+def _dump_yaml(data: Any, stream: TextIO) -> None:
+    yaml, dumper, _ = _yaml()
+    # libyaml は allow_unicode を指定しても BMP 外の文字を "\U0001F600" のようにエスケープする。
+    # 読み込んだ値は同じだが出力のバイト列が従来と異なるため、該当する値は Python 実装で出力する
+    if dumper is not yaml.Dumper and _has_non_bmp(data):
+        dumper = yaml.Dumper
+    yaml.dump(data, stream, Dumper=dumper, **_YAML_OPTIONS)
+
+
+def build_header(metadata: SeriesMetadata) -> Dict[str, Any]:
+    """シリーズ単位の項目（エピソード一覧以外）を出力用の辞書に変換します。"""
+    return {
+        'series_title': metadata.title,
+        'source_url': metadata.source_url,
+        'extraction_date': metadata.extraction_date,
+        'total_episodes': len(metadata.episodes),
+    }
+
+
+def build_episode_record(episode: EpisodeMetadata) -> Dict[str, Any]:
+    """EpisodeMetadata を出力用の辞書に変換します。"""
+    return {
+        'episode_number': episode.number,
+        'title': episode.title,
+        'synopsis': episode.synopsis or NO_SYNOPSIS,
+        'url': episode.url
+    }
+
+
+def build_output_data(metadata: SeriesMetadata) -> Dict[str, Any]:
+    """SeriesMetadata を出力用の辞書に変換します。
+
+    Args:
+        metadata: 抽出したシリーズのメタ情報
+
+    Returns:
+        YAML出力用の辞書
+    """
+    data = build_header(metadata)
+    data['episodes'] = [build_episode_record(ep) for ep in metadata.episodes]
+    return data
+
+
+class OutputWriter:
+    """抽出結果をエピソード単位で逐次書き出すライターの基底クラス
+
+    書き込みは `<path>.part` に対して行い、各エピソードの書き込みごとにフラッシュします。
+    commit() で本来のパスへアトミックに置き換えるため、途中で中断した場合も
+    既存の出力ファイルは壊れず、それまでの結果は `.part` ファイルに残ります。
+
+    使用例:
+        with open_writer('episodes.jsonl', 'jsonl') as writer:
+            writer.begin(metadata)
+            for episode in metadata.episodes:
+                writer.write_episode(episode)
+    """
+
+    # 既定の拡張子
+    extension = ''
+
+    def __init__(self, path: str):
+        """初期化
+
+        Args:
+            path: 最終的な出力先のファイルパス
+        """
+        self.path = path
+        self.part_path = path + PART_SUFFIX
+        self.written = 0
+        self._started = False
+        self._file: Optional[TextIO] = None
+
+    def begin(self, metadata: SeriesMetadata) -> None:
+        """`.part` ファイルを作成し、シリーズ単位の項目を書き出します。
+        エピソードより先に一度だけ呼び出します。
+
+        Args:
+            metadata: シリーズのメタ情報（total_episodes には episodes の件数を使用）
+
+        Raises:
+            OSError: ファイルを作成できない場合
+        """
+        if self._started:
+            raise RuntimeError("begin() は既に呼び出されています")
+        self._file = open(self.part_path, 'w', encoding='utf-8')
+        self._started = True
+        self._write_header(build_header(metadata))
+        self._file.flush()
+
+    def write_episode(self, episode: EpisodeMetadata) -> None:
+        """1話分のレコードを書き出します。
+
+        Args:
+            episode: 書き出すエピソード
+        """
+        if not self._started:
+            raise RuntimeError("write_episode() の前に begin() を呼び出してください")
+        self._write_episode(build_episode_record(episode))
+        self.written += 1
+        self._file.flush()
+
+    def commit(self) -> None:
+        """書き込みを完了し、出力ファイルを本来のパスへ置き換えます。"""
+        if not self._started:
+            raise RuntimeError("begin() が呼び出されていません")
+        self._write_footer()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        os.replace(self.part_path, self.path)
+
+    def abort(self) -> None:
+        """書き込みを中断します。途中までの結果は `.part` ファイルに残ります。"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'OutputWriter':
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None and self._started:
+            self.commit()
+        else:
+            self.abort()
+
+    def _write_header(self, header: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def _write_episode(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def _write_footer(self) -> None:
+        pass
+
+
+class YamlWriter(OutputWriter):
+    """従来と同一内容のYAMLを、エピソードごとに追記しながら出力するライター"""
+
+    extension = 'yaml'
+
+    def _write_header(self, header: Dict[str, Any]) -> None:
+        _dump_yaml(header, self._file)
+
+    def _write_episode(self, record: Dict[str, Any]) -> None:
+        if self.written == 0:
+            self._file.write('episodes:\n')
+        # 1要素のリストとして出力すると、一覧全体を出力した場合と同じ内容になる
+        _dump_yaml([record], self._file)
+
+    def _write_footer(self) -> None:
+        if self.written == 0:
+            self._file.write('episodes: []\n')
+
+
+class JsonLinesWriter(OutputWriter):
+    """1行目にシリーズ情報、以降の各行に1話分のレコードを出力する JSON Lines ライター"""
+
+    extension = 'jsonl'
+
+    def _write_header(self, header: Dict[str, Any]) -> None:
+        self._write_line(dict(type='series', **header))
+
+    def _write_episode(self, record: Dict[str, Any]) -> None:
+        self._write_line(dict(type='episode', **record))
+
+    def _write_line(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self._file.write('\n')
+
+
+class JsonWriter(OutputWriter):
+    """YAML出力と同じ構造を空白なしのJSONとして出力するライター"""
+
+    extension = 'json'
+
+    def _write_header(self, header: Dict[str, Any]) -> None:
+        text = json.dumps(header, ensure_ascii=False, separators=(',', ':'))
+        # 閉じ括弧を外し、エピソード一覧を追記できる形にする
+        self._file.write(text[:-1] + ',"episodes":[')
+
+    def _write_episode(self, record: Dict[str, Any]) -> None:
+        if self.written:
+            self._file.write(',')
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+
+    def _write_footer(self) -> None:
+        self._file.write(']}\n')
+
+
+# --format で選択できる出力形式
+WRITERS = {
+    'yaml': YamlWriter,
+    'jsonl': JsonLinesWriter,
+    'json': JsonWriter,
+}
+
+
+def open_writer(path: str, fmt: str = 'yaml') -> OutputWriter:
+    """出力形式に対応するライターを生成します。
+
+    Args:
+        path: 出力先のファイルパス
+        fmt: 出力形式（yaml / jsonl / json）
+
+    Returns:
+        OutputWriter（ファイルは begin() の呼び出し時に作成されます）
+
+    Raises:
+        ValueError: 不明な出力形式の場合
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"不明な出力形式です: {fmt}")
+    return WRITERS[fmt](path)
+
+
+def write_metadata(metadata: SeriesMetadata, path: str, fmt: str = 'yaml') -> None:
+    """SeriesMetadata 全体を指定した形式で保存します。
+
+    Args:
+        metadata: 保存するシリーズのメタ情報
+        path: 出力先のファイルパス
+        fmt: 出力形式（yaml / jsonl / json）
+    """
+    with open_writer(path, fmt) as writer:
+        writer.begin(metadata)
+        for episode in metadata.episodes:
+            writer.write_episode(episode)
+
+
+def write_yaml(data: Dict[str, Any], path: str) -> None:
+    """辞書をYAMLファイルとして保存します（書き込み完了時にアトミックに置き換え）。
+
+    Args:
+        data: 出力するデータ
+        path: 出力先のファイルパス
+    """
+    part_path = path + PART_SUFFIX
+    with open(part_path, 'w', encoding='utf-8') as f:
+        _dump_yaml(data, f)
+    os.replace(part_path, path)
+
+
+def write_json(data: Dict[str, Any], path: str) -> None:
+    """辞書をJSONファイルとして保存します（書き込み完了時にアトミックに置き換え）。
+
+    Args:
+        data: 出力するデータ
+        path: 出力先のファイルパス
+    """
+    part_path = path + PART_SUFFIX
+    with open(part_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    os.replace(part_path, path)
+
+
+def load_yaml(path: str) -> SeriesMetadata:
+    """write_yaml で保存したYAMLファイルを SeriesMetadata として読み込みます。
+
+    Args:
+        path: 読み込むYAMLファイルのパス
+
+    Returns:
+        SeriesMetadata（「あらすじなし」のエピソードは synopsis が None）
+
+    Raises:
+        OSError: ファイルを読み込めない場合
+        ValueError: 想定した形式のYAMLではない場合
+    """
+    yaml, _, loader = _yaml()
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = yaml.load(f, Loader=loader)
+        except yaml.YAMLError as e:
+            raise ValueError(f"YAMLファイルを解析できません: {path}: {e}")
+    return _metadata_from_data(data, path)
+
+
+def load_metadata(path: str, fmt: str = 'yaml') -> SeriesMetadata:
+    """open_writer で保存した抽出結果を SeriesMetadata として読み込みます。
+
+    Args:
+        path: 読み込むファイルのパス
+        fmt: 出力形式（yaml / jsonl / json）
+
+    Returns:
+        SeriesMetadata（「あらすじなし」のエピソードは synopsis が None）
+
+    Raises:
+        OSError: ファイルを読み込めない場合
+        ValueError: 想定した形式のファイルではない場合
+    """
+    if fmt == 'yaml':
+        return load_yaml(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"不明な出力形式です: {fmt}")
+
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            if fmt == 'json':
+                data = json.load(f)
+            else:
+                data = None
+                episodes = []
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record.get('type') == 'series':
+                        data = record
+                    elif record.get('type') == 'episode':
+                        episodes.append(record)
+                if data is not None:
+                    data['episodes'] = episodes
+        except (ValueError, AttributeError) as e:
+            raise ValueError(f"JSONファイルを解析できません: {path}: {e}")
+    return _metadata_from_data(data, path)
+
+
+def _metadata_from_data(data: Any, path: str) -> SeriesMetadata:
+    if not isinstance(data, dict) or 'episodes' not in data:
+        raise ValueError(f"抽出結果のファイルではありません: {path}")
+
+    episodes = []
+    try:
+        for item in data.get('episodes') or []:
+            synopsis = item.get('synopsis')
+            episodes.append(EpisodeMetadata(
+                number=int(item['episode_number']),
+                title=item.get('title') or '',
+                synopsis=None if synopsis in (None, NO_SYNOPSIS) else synopsis,
+                url=item.get('url')
+            ))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        # 辞書でない要素、話数の欠落・不正な値など
+        raise ValueError(f"抽出結果のファイルではありません: {path}")
+    return SeriesMetadata(
+        title=data.get('series_title') or '',
+        source_url=data.get('source_url') or '',
+        extraction_date=str(data.get('extraction_date') or ''),
+        episodes=episodes
+    )
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+取得→解析→書き出しのパイプライン（解析はプロセスプールで並列実行）
+
+通信スレッドが受信したHTMLを、上限付きのプロセスプールで解析し、呼び出し元のスレッドが
+話数順に結果を書き出します。各段階の間で保持するページ数に上限を設けているため、
+解析が追いつかない場合は通信側が待たされ（背圧）、メモリ使用量は一定に保たれます。
+
+プロセスに渡す関数はモジュールの最上位に定義し、ピクル化できる値（HTML文字列と
+EpisodeMetadata）のみを受け渡します。
+"""
+
+import logging
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Deque, List, Optional, Sequence, Tuple
+
+from .extractor import _SKIPPED, MetadataParser
+from .jsonld import JsonLdDocument, has_description
+from .models import EpisodeMetadata, SeriesMetadata
+from .retry import Deadline
+from .synopsis import SeriesPage, SynopsisLookup, SynopsisSource, missing_synopses, scan_sources
+
+
+logger = logging.getLogger(__name__)
+
+def parse_series_page(content: str, series_url: str, base_url: str,
+                      sources: Sequence[SynopsisSource] = ()
+                      ) -> Tuple[str, List[EpisodeMetadata], List[SynopsisLookup]]:
+    """シリーズページのHTMLから (シリーズタイトル, エピソード一覧, あらすじの取得元の走査結果) を取り出します。
+
+    ワーカープロセスで実行します。sources を省略した場合、走査結果は空のリストです。
+    """
+    parser = MetadataParser()
+    parser.base_url = base_url
+    document = JsonLdDocument.parse(content)
+    lookups = scan_sources(sources, SeriesPage(series_url, content, document))
+    return parser.extract_series_title(document), parser.extract_episodes(document, series_url), lookups
+
+
+def parse_synopsis_page(content: str) -> Optional[str]:
+    """エピソードページのHTMLからあらすじを取り出します（ワーカープロセスで実行）。"""
+    return MetadataParser().extract_synopsis(content)
+
+
+class ParsePool:
+    """同時に受け付ける解析タスク数に上限を設けたプロセスプール
+
+    上限に達している間 submit() は空きができるまで待機するため、呼び出し元の通信スレッドに
+    背圧がかかります。workers が 0 の場合は呼び出し元のスレッドでそのまま実行します。
+    """
+
+    def __init__(self, workers: int, max_pending: Optional[int] = None):
+        """初期化
+
+        Args:
+            workers: 解析に使用するプロセス数（0 で呼び出し元のスレッドで実行）
+            max_pending: 実行中・待機中の解析タスク数の上限（省略時は workers の2倍）
+        """
+        if workers < 0:
+            raise ValueError(f"workers は0以上を指定してください: {workers}")
+        self.workers = workers
+        self.max_pending = max_pending or max(1, workers * 2)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 通信スレッドが動いている状態で fork しないよう、常に spawn でプロセスを起動する
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def submit(self, func: Callable[..., Any], *args) -> Future:
+        """解析タスクを登録し、結果の Future を返します（上限に達している場合は空くまで待機）。"""
+        if self.workers == 0:
+            future: Future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        executor = self._get_executor()
+        self._slots.acquire()
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def close(self) -> None:
+        """ワーカープロセスを終了します。"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def fetch_synopsis_task(extractor, pool: ParsePool, episode_url: str,
+                        deadline: Optional[Deadline] = None) -> Any:
+    """通信スレッドで1話分のページを受信し、解析タスクを登録します。
+
+    Returns:
+        あらすじを返す Future。期限切れの場合は _SKIPPED、取得に失敗した場合は None。
+    """
+    if deadline is not None and deadline.expired():
+        return _SKIPPED
+    try:
+        with extractor.metrics.time('synopsis'):
+            content = extractor.fetch_page_until(episode_url, has_description, retries=1, deadline=deadline)
+    except Exception as e:
+        extractor.metrics.increment('synopsis_failures')
+        logger.debug("あらすじを取得できませんでした: %s (%s)", episode_url, e, extra={'url': episode_url})
+        return None
+    return pool.submit(parse_synopsis_page, content)
+
+
+def resolve_synopsis(extractor, result: Any) -> Any:
+    """fetch_synopsis_task の戻り値から、あらすじ（または _SKIPPED / None）を取り出します。"""
+    if not isinstance(result, Future):
+        return result
+    try:
+        return result.result()
+    except Exception as e:
+        extractor.metrics.increment('synopsis_failures')
+        logger.debug("あらすじを解析できませんでした: %s", e)
+        return None
+
+
+def run_series_pipeline(extractor, url: str, include_synopsis: bool = True,
+                        on_series: Optional[Callable[[SeriesMetadata], None]] = None,
+                        on_episode: Optional[Callable[[EpisodeMetadata], None]] = None) -> SeriesMetadata:
+    """1シリーズ分の抽出を 取得（スレッド）→ 解析（プロセス）→ 書き出し（呼び出し元）の順に流します。
+
+    AbemaMetadataExtractor.extract_all_metadata と同じ結果を返します。書き出しを待っている
+    エピソードの取得は max_workers + 解析の上限 件先までに制限されます。
+
+    Args:
+        extractor: 通信に使用する AbemaMetadataExtractor（parse_pool() で解析プールを取得）
+        url: シリーズのURL
+        include_synopsis: 各話のあらすじを取得するかどうか
+        on_series: シリーズページの解析後に一度だけ呼び出すコールバック
+        on_episode: 各エピソードの処理が終わるたびに話数順で呼び出すコールバック
+
+    Returns:
+        抽出された全データを含む SeriesMetadata オブジェクト
+    """
+    metrics = extractor.metrics
+    pool = extractor.parse_pool()
+    with metrics.time('series'):
+        deadline = Deadline(extractor.series_deadline)
+        content = extractor.fetch_page(url, deadline=deadline)
+        sources = extractor.synopsis_sources if include_synopsis else ()
+        with metrics.time('episode_parse'):
+            title, episodes, lookups = pool.submit(parse_series_page, content, url, extractor.base_url,
+                                                   sources).result()
+        del content
+        metadata = SeriesMetadata(
+            title=title,
+            source_url=url,
+            extraction_date=datetime.now().strftime('%Y-%m-%d'),
+            episodes=episodes
+        )
+        metrics.increment('episodes', len(episodes))
+        if on_series is not None:
+            on_series(metadata)
+
+        skipped = 0
+        if include_synopsis:
+            extractor.fill_bulk_synopses(url, episodes, lookups, deadline)
+            skipped = _fetch_synopses(extractor, pool, episodes, on_episode, deadline)
+        elif on_episode is not None:
+            for episode in episodes:
+                on_episode(episode)
+        if skipped:
+            metrics.increment('synopsis_skipped', skipped)
+            logger.warning("処理期限（%g秒）を超えたため、%d 話のあらすじ取得をスキップしました",
+                           extractor.series_deadline, skipped, extra={'url': url, 'skipped': skipped})
+    return metadata
+
+
+def _fetch_synopses(extractor, pool: ParsePool, episodes: List[EpisodeMetadata],
+                    on_episode: Optional[Callable[[EpisodeMetadata], None]],
+                    deadline: Deadline) -> int:
+    targets = missing_synopses(episodes)
+    window = extractor.max_workers + pool.max_pending
+    skipped = 0
+    in_flight: Deque[Future] = deque()
+    upcoming = iter(targets)
+
+    def fill(executor):
+        # 書き出し待ちの件数が window に収まる範囲でのみ取得を登録する
+        while len(in_flight) < window:
+            episode = next(upcoming, None)
+            if episode is None:
+                return
+            in_flight.append(executor.submit(fetch_synopsis_task, extractor, pool, episode.url, deadline))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(extractor.max_workers, len(targets)))) as executor:
+        fill(executor)
+        for episode in episodes:
+            if episode.url and not episode.synopsis:
+                synopsis = resolve_synopsis(extractor, in_flight.popleft().result())
+                fill(executor)
+                if synopsis is _SKIPPED:
+                    skipped += 1
+                    synopsis = None
+                episode.synopsis = synopsis
+            if on_episode is not None:
+                on_episode(episode)
+    return skipped
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+リトライ間隔（ジッター付き指数バックオフ）と処理期限の管理
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+
+# 接続確立までのデフォルトのタイムアウト秒数
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+# 受信待ち（1回の読み出しごと）のデフォルトのタイムアウト秒数
+DEFAULT_READ_TIMEOUT = 30.0
+
+# Retry-After ヘッダーに従うステータスコード
+RETRY_AFTER_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Retry-After ヘッダーの値を待ち秒数に変換します。
+
+    Args:
+        value: ヘッダーの値（秒数または HTTP-date 形式）
+        now: 日時形式の場合の基準時刻（省略時は現在時刻）
+
+    Returns:
+        待ち秒数（0以上）。解釈できない場合は None。
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    # HTTP-date 形式の場合のみ使用するため、email パッケージの読み込みを遅らせる
+    from email.utils import parsedate_to_datetime
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+@dataclass
+class RetryPolicy:
+    """リトライまでの待ち時間を決めるポリシー
+
+    待ち時間は「フルジッター」方式（0 から base_delay * 2^attempt の間の一様乱数、上限 max_delay）で
+    決めるため、同時に失敗した複数のワーカーが一斉に再送することを避けられます。
+    429 / 503 で Retry-After が指定されている場合はその値（上限 max_retry_after）に従います。
+    """
+    base_delay: float = 1.0          # 1回目のリトライの待ち時間の上限（秒）
+    max_delay: float = 30.0          # バックオフによる待ち時間の上限（秒）
+    max_retry_after: float = 120.0   # Retry-After に従う待ち時間の上限（秒）
+    jitter: bool = True              # False の場合は上限値をそのまま待つ
+
+    def backoff(self, attempt: int) -> float:
+        """attempt 回目（0始まり）の失敗後の待ち時間を返します。"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+    def delay(self, attempt: int, status: Optional[int] = None,
+              retry_after: Optional[str] = None) -> float:
+        """失敗したレスポンスに応じた待ち時間を返します。
+
+        Args:
+            attempt: 失敗した試行の番号（0始まり）
+            status: HTTPステータスコード（通信エラーの場合は None）
+            retry_after: レスポンスの Retry-After ヘッダーの値
+
+        Returns:
+            次の試行までの待ち秒数
+        """
+        if status in RETRY_AFTER_STATUSES:
+            seconds = parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(seconds, self.max_retry_after)
+        return self.backoff(attempt)
+
+
+class Deadline:
+    """処理全体に許容する時間の期限（単調増加時計基準）"""
+
+    def __init__(self, seconds: Optional[float]):
+        """初期化
+
+        Args:
+            seconds: 現在からの許容秒数（None で無期限）
+        """
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self) -> Optional[float]:
+        """残り秒数を返します（無期限の場合は None、期限切れの場合は 0）。"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """期限を過ぎているかどうかを返します。"""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def allows(self, delay: float) -> bool:
+        """delay 秒待った後もまだ期限内かどうかを返します。"""
+        remaining = self.remaining()
+        return remaining is None or delay < remaining
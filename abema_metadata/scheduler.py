@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+複数シリーズのページ取得を公平に割り振る共有スケジューラー
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """一定レートでトークンを補充するトークンバケット（スレッドセーフ）"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """初期化
+
+        Args:
+            rate: 1秒あたりに補充するトークン数（0以下で無制限）
+            capacity: バケットの容量（バースト数）。省略時は rate と同じ（最低1）。
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """トークンを1つ予約し、使用可能になるまでの待ち時間（秒）を返します。"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """トークンが使用可能になるまで待機します。"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _Job:
+    __slots__ = ('host', 'func', 'args', 'future')
+
+    def __init__(self, host: Optional[str], func: Callable[..., Any], args: Tuple[Any, ...]):
+        self.host = host
+        self.func = func
+        self.args = args
+        self.future: Future = Future()
+
+
+class FairScheduler:
+    """グループ（シリーズ）間をラウンドロビンで巡回してジョブを実行するスケジューラー
+
+    全体の同時実行数はワーカースレッド数で、ホストごとの負荷はトークンバケットで制限します。
+    """
+
+    def __init__(self, max_concurrency: int = 8, rate_per_host: float = 5.0,
+                 burst: Optional[float] = None):
+        """初期化
+
+        Args:
+            max_concurrency: 全体で同時に実行するジョブの最大数
+            rate_per_host: ホストごとの1秒あたりの最大リクエスト数（0以下で無制限）
+            burst: ホストごとのバースト数。省略時は rate_per_host と同じ。
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency は1以上を指定してください: {max_concurrency}")
+        self.max_concurrency = max_concurrency
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.completed = 0
+        self._queues: 'OrderedDict[Any, Deque[_Job]]' = OrderedDict()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._workers = [
+            threading.Thread(target=self._worker, name=f'abema-scheduler-{i}', daemon=True)
+            for i in range(max_concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, group: Any, host: Optional[str], func: Callable[..., Any], *args: Any) -> Future:
+        """ジョブを登録します。
+
+        Args:
+            group: 公平性の単位となるグループ（シリーズURL等）
+            host: レート制限の対象ホスト（None で制限なし）
+            func: 実行する関数
+            *args: 関数に渡す引数
+
+        Returns:
+            実行結果を受け取る Future
+        """
+        job = _Job(host, func, args)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("スケジューラーは既に停止しています")
+            self._queues.setdefault(group, deque()).append(job)
+            self._condition.notify()
+        return job.future
+
+    def shutdown(self, wait: bool = True) -> None:
+        """未実行のジョブをすべて実行した後、ワーカーを停止します。"""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def __enter__(self) -> 'FairScheduler':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def _next_job(self) -> Optional[_Job]:
+        with self._condition:
+            while not self._queues:
+                if self._shutdown:
+                    return None
+                self._condition.wait()
+            # 先頭のグループから1件取り出し、そのグループを末尾へ回す（ラウンドロビン）
+            group, queue = next(iter(self._queues.items()))
+            job = queue.popleft()
+            if queue:
+                self._queues.move_to_end(group)
+            else:
+                del self._queues[group]
+            return job
+
+    def _bucket_for(self, host: str) -> TokenBucket:
+        with self._condition:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate_per_host, self.burst)
+            return bucket
+
+    def _worker(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                if job.host is not None:
+                    self._bucket_for(job.host).acquire()
+                result = job.func(*job.args)
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            with self._condition:
+                self.completed += 1
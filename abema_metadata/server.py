@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+抽出処理を常駐させ、ローカルの HTTP / Unix ソケットで JSON を返す問い合わせサーバー
+"""
+
+import errno
+import json
+import logging
+import os
+import re
+import socket
+import socketserver
+import stat
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .extractor import AbemaExtractorError, AbemaMetadataExtractor, InvalidURLError, extract_series_id
+from .models import SeriesMetadata
+from .output import build_episode_record, build_header, build_output_data
+
+
+logger = logging.getLogger(__name__)
+
+# 取得結果をメモリに保持するデフォルトの秒数
+DEFAULT_TTL = 600.0
+
+# メモリに保持するシリーズ数のデフォルトの上限
+DEFAULT_MAX_ENTRIES = 1024
+
+# シリーズIDとして受け付ける文字列（例: 189-85）
+SERIES_ID_RE = re.compile(r'[0-9A-Za-z_-]+')
+
+
+class SingleFlight:
+    """同じキーに対する同時の呼び出しを1回の実行にまとめるクラス（スレッドセーフ）
+
+    実行中のキーで呼び出された場合は新たに実行せず、先行する呼び出しの結果（例外を含む）を待って返します。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Any, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Any, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """key ごとに func を1回だけ実行し、(結果, 他の呼び出しの結果を共有したかどうか) を返します。"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result(), False
+
+
+class _Entry:
+    __slots__ = ('metadata', 'with_synopsis', 'expires_at')
+
+    def __init__(self, metadata: SeriesMetadata, with_synopsis: bool, expires_at: float):
+        self.metadata = metadata
+        self.with_synopsis = with_synopsis
+        self.expires_at = expires_at
+
+
+class MetadataService:
+    """常駐する抽出クラスと、取得結果のメモリキャッシュを保持するサービス
+
+    取得結果はシリーズIDごとに ttl 秒間保持し、同じシリーズへの同時の問い合わせは
+    1回の取得にまとめます。あらすじ付きで取得した結果は、あらすじ不要の問い合わせにも使用します。
+    """
+
+    def __init__(self, extractor: AbemaMetadataExtractor, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """初期化
+
+        Args:
+            extractor: 使用する抽出クラス（接続・キャッシュ・計測値はサーバーの終了まで保持されます）
+            ttl: 取得結果をメモリに保持する秒数（0で保持しない）
+            max_entries: メモリに保持するシリーズ数の上限（超過時は最も古く参照されたものから破棄）
+        """
+        self.extractor = extractor
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.metrics = extractor.metrics
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def series_url(self, series_id: str) -> str:
+        """シリーズIDからシリーズページのURLを組み立てます。"""
+        if not SERIES_ID_RE.fullmatch(series_id):
+            raise ValueError(f"無効なシリーズIDです: {series_id}")
+        return f'{self.extractor.base_url}video/title/{series_id}'
+
+    def get_series(self, series_id: str, synopsis: bool = True, refresh: bool = False) -> SeriesMetadata:
+        """シリーズのメタ情報を返します（有効期限内の取得結果があればそれを使用）。
+
+        Args:
+            series_id: シリーズID（例: 189-85）
+            synopsis: あらすじを含めるかどうか
+            refresh: True の場合は保持している結果を使わずに取得し直す
+
+        Returns:
+            SeriesMetadata（呼び出し元で変更しないでください）
+
+        Raises:
+            ValueError: シリーズIDが不正な場合
+            InvalidURLError: シリーズページが存在しない場合
+            NetworkError: 通信エラーの場合
+        """
+        url = self.series_url(series_id)
+        if not refresh:
+            metadata = self._lookup(series_id, synopsis)
+            if metadata is not None:
+                self.metrics.increment('service.hits')
+                return metadata
+
+        self.metrics.increment('service.misses')
+        metadata, shared = self._flight.do((series_id, synopsis),
+                                           lambda: self._fetch(series_id, url, synopsis))
+        if shared:
+            self.metrics.increment('service.coalesced')
+        return metadata
+
+    def invalidate(self, series_id: Optional[str] = None) -> None:
+        """保持している取得結果を破棄します（省略時はすべて）。"""
+        with self._lock:
+            if series_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(series_id, None)
+
+    def _lookup(self, series_id: str, synopsis: bool) -> Optional[SeriesMetadata]:
+        with self._lock:
+            entry = self._entries.get(series_id)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[series_id]
+                return None
+            if synopsis and not entry.with_synopsis:
+                return None
+            self._entries.move_to_end(series_id)
+            return entry.metadata
+
+    def _fetch(self, series_id: str, url: str, synopsis: bool) -> SeriesMetadata:
+        # 多数のシリーズを保持しても使用メモリが増えすぎないよう、列形式に詰め替えて保持する
+        metadata = self.extractor.extract_all_metadata(url, synopsis).compact()
+        if self.ttl > 0:
+            with self._lock:
+                current = self._entries.get(series_id)
+                # あらすじなしの取得結果で、あらすじ付きの有効な結果を上書きしない
+                if current is None or synopsis or not current.with_synopsis \
+                        or current.expires_at <= time.monotonic():
+                    self._entries[series_id] = _Entry(metadata, synopsis, time.monotonic() + self.ttl)
+                self._entries.move_to_end(series_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return metadata
+
+    def stats(self) -> Dict[str, Any]:
+        """サービスの状態と計測値を辞書で返します。"""
+        with self._lock:
+            entries = len(self._entries)
+        return {'cached_series': entries, 'metrics': self.extractor.collect_metrics()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """問い合わせAPIのリクエストハンドラー
+
+    GET /series/{ID}                  シリーズのメタ情報（出力ファイルと同じ構造）
+    GET /series/{ID}/episodes/{N}     1話分のメタ情報
+    GET /lookup?url={シリーズURL}      URLからシリーズIDを取り出して /series/{ID} と同じ結果を返す
+    GET /health                       サービスの状態と計測値
+
+    クエリ引数 synopsis=0 であらすじを省略、refresh=1 で保持している結果を使わずに取得し直します。
+    """
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'AbemaMetadataServer'
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        segments = [unquote(segment) for segment in parts.path.split('/') if segment]
+        try:
+            status, body = self._route(segments, query)
+        except ValueError as e:
+            status, body = 400, {'error': str(e)}
+        except InvalidURLError as e:
+            status, body = 404, {'error': str(e)}
+        except AbemaExtractorError as e:
+            status, body = 502, {'error': str(e)}
+        except Exception as e:
+            logger.exception("問い合わせの処理中に予期せぬエラーが発生しました: %s", self.path)
+            status, body = 500, {'error': f"予期せぬエラー: {e}"}
+        self._send_json(status, body)
+
+    def _route(self, segments, query) -> Tuple[int, Any]:
+        service: MetadataService = self.server.service
+        synopsis = query.get('synopsis', '1') not in ('0', 'false', 'no')
+        refresh = query.get('refresh', '0') in ('1', 'true', 'yes')
+
+        if segments == ['health']:
+            return 200, dict(status='ok', **service.stats())
+        if segments == ['lookup']:
+            series_id = extract_series_id(query.get('url', ''))
+            if series_id is None:
+                return 400, {'error': "url にシリーズページのURLを指定してください"}
+            segments = ['series', series_id]
+        if len(segments) == 2 and segments[0] == 'series':
+            metadata = service.get_series(segments[1], synopsis, refresh)
+            data = build_output_data(metadata)
+            if not synopsis:
+                for record in data['episodes']:
+                    del record['synopsis']
+            return 200, data
+        if len(segments) == 4 and segments[0] == 'series' and segments[2] == 'episodes':
+            try:
+                number = int(segments[3])
+            except ValueError:
+                return 400, {'error': f"話数には整数を指定してください: {segments[3]}"}
+            metadata = service.get_series(segments[1], synopsis, refresh)
+            for episode in metadata.episodes:
+                if episode.number == number:
+                    record = dict(build_header(metadata), **build_episode_record(episode))
+                    del record['total_episodes']
+                    if not synopsis:
+                        del record['synopsis']
+                    return 200, record
+            return 404, {'error': f"第{number}話は見つかりません: {segments[1]}"}
+        return 404, {'error': f"不明なパスです: {self.path}"}
+
+    def _send_json(self, status: int, body: Any) -> None:
+        payload = json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def address_string(self) -> str:
+        # Unix ソケットでは接続元アドレスがない
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class MetadataHTTPServer(ThreadingHTTPServer):
+    """TCP で待ち受ける問い合わせサーバー"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: MetadataService):
+        super().__init__(address, _Handler)
+        self.service = service
+
+
+def _remove_stale_socket(path: str) -> None:
+    """前回の異常終了で残った、待ち受けているサーバーのないソケットファイルを削除します。
+
+    Raises:
+        FileExistsError: ソケット以外のファイルがある場合（削除しない）
+        OSError: 別のサーバーがそのソケットで待ち受けている場合（errno は EADDRINUSE）
+    """
+    if not stat.S_ISSOCK(os.lstat(path).st_mode):
+        raise FileExistsError(errno.EEXIST, 'ソケット以外のファイルが既に存在します', path)
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError as e:
+        # 接続を拒否された（待ち受けていない）か、確認中に削除された場合のみ残骸とみなす
+        if e.errno not in (errno.ECONNREFUSED, errno.ENOENT):
+            raise
+    else:
+        raise OSError(errno.EADDRINUSE, '別のサーバーが待ち受けています', path)
+    finally:
+        probe.close()
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class MetadataUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix ドメインソケットで待ち受ける問い合わせサーバー（HTTP/1.1 で通信）"""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, service: MetadataService):
+        if os.path.lexists(path):
+            _remove_stale_socket(path)
+        super().__init__(path, _Handler)
+        self.service = service
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def create_server(service: MetadataService, host: str = '127.0.0.1', port: int = 8765,
+                  socket_path: Optional[str] = None):
+    """問い合わせサーバーを作成します（serve_forever() で待ち受けを開始）。
+
+    Args:
+        service: 問い合わせに使用する MetadataService
+        host: 待ち受けるアドレス（socket_path を省略した場合）
+        port: 待ち受けるポート番号（0 で空いているポートを使用）
+        socket_path: 指定した場合はこのパスの Unix ドメインソケットで待ち受ける
+
+    Returns:
+        MetadataHTTPServer または MetadataUnixServer
+    """
+    if socket_path:
+        return MetadataUnixServer(socket_path, service)
+    return MetadataHTTPServer((host, port), service)
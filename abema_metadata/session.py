@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+持続的（keep-alive）HTTP接続を再利用するセッション層
+"""
+
+import http.client
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+
+# リダイレクトとして追従するステータスコード
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# 途中で読み出しを打ち切ったレスポンスについて、接続を再利用するために読み捨てる残りバイト数の上限
+DRAIN_LIMIT = 64 * 1024
+
+# 再利用した接続がサーバー側で既に閉じられていた場合に発生する例外
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+@dataclass
+class SessionStats:
+    """セッションの接続統計情報を保持するクラス"""
+    requests: int = 0              # 送信したリクエスト数
+    connections_opened: int = 0    # 新規に確立した接続数（TCP/TLSハンドシェイク数）
+    connections_reused: int = 0    # プールから再利用した接続数
+    bytes_received: int = 0        # 受信したボディのバイト数（圧縮状態）
+
+
+class _ContentDecoder:
+    """Content-Encoding に応じてボディを逐次的に展開するクラス"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'gzip':
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            self._decompressor = zlib.decompressobj(zlib.MAX_WBITS)
+        else:
+            self._decompressor = None
+        self._started = False
+
+    def decode(self, data: bytes, max_length: int = 65536) -> Iterator[bytes]:
+        """受信データを展開し、max_length 以下の断片に分けて返します。
+
+        圧縮率の高いボディでも、展開後のデータを一度に確保しないようにします。
+        """
+        if self._decompressor is None:
+            if data:
+                yield data
+            return
+        if self.encoding == 'deflate' and not self._started:
+            self._started = True
+            probe = zlib.decompressobj(zlib.MAX_WBITS)
+            try:
+                probe.decompress(data[:2])
+            except zlib.error:
+                # zlibヘッダーなしの生deflateを送ってくるサーバーへの対応
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        while data:
+            decoded = self._decompressor.decompress(data, max_length)
+            if decoded:
+                yield decoded
+            data = self._decompressor.unconsumed_tail
+
+    def flush(self) -> bytes:
+        if self._decompressor is None:
+            return b''
+        return self._decompressor.flush()
+
+
+class HTTPResponse:
+    """セッションが返すレスポンス。ボディは展開済みのバイト列として読み出します。"""
+
+    def __init__(self, session: 'HTTPSession', key: Tuple[str, str, int],
+                 conn: http.client.HTTPConnection, response: http.client.HTTPResponse, url: str):
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self._session = session
+        self._key = key
+        self._conn = conn
+        self._response = response
+        self._decoder = _ContentDecoder(
+            (response.getheader('Content-Encoding') or '').strip().lower()
+        )
+        self._closed = False
+
+    def iter_chunks(self, chunk_size: int = 16384) -> Iterator[bytes]:
+        """展開済みのボディを少しずつ返します。
+
+        Args:
+            chunk_size: 一度に受信する最大バイト数
+
+        Yields:
+            展開済みのボディ断片
+        """
+        if self._closed:
+            return
+        try:
+            while True:
+                data = self._response.read1(chunk_size)
+                if not data:
+                    break
+                self._session._add_bytes(len(data))
+                yield from self._decoder.decode(data)
+            tail = self._decoder.flush()
+            if tail:
+                yield tail
+        except GeneratorExit:
+            # 呼び出し側が読み出しを打ち切った場合、接続の扱いは close() に委ねる
+            raise
+        except BaseException:
+            self.close(reusable=False)
+            raise
+        self.close()
+
+    def read(self) -> bytes:
+        """ボディ全体を読み出して返します。"""
+        return b''.join(self.iter_chunks())
+
+    def close(self, reusable: bool = True) -> None:
+        """レスポンスを閉じ、可能であれば接続をプールへ返却します。
+
+        Args:
+            reusable: 接続を再利用してよいか。ボディの残りが DRAIN_LIMIT を超える場合は無視されます。
+        """
+        if self._closed:
+            return
+        self._closed = True
+        complete = self._response.isclosed() or self._response.length == 0
+        remaining = self._response.length
+        if reusable and not complete and remaining is not None and remaining <= DRAIN_LIMIT:
+            # 残りがわずかであれば、接続を閉じずに読み捨てて再利用する
+            try:
+                while self._response.read1(DRAIN_LIMIT):
+                    pass
+                complete = True
+            except (OSError, http.client.HTTPException):
+                complete = False
+        if reusable and complete and not self._response.will_close:
+            self._response.close()
+            self._session._release(self._key, self._conn)
+        else:
+            self._response.close()
+            self._conn.close()
+
+    def __enter__(self) -> 'HTTPResponse':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close(reusable=exc_info[0] is None)
+
+
+class HTTPSession:
+    """ホストごとに持続的接続をプールし、gzip/deflate 圧縮を扱うHTTPセッション
+
+    スレッドセーフであり、複数のワーカーから同時に利用できます。
+    """
+
+    def __init__(self, user_agent: Optional[str] = None, pool_size: int = 4,
+                 timeout: Optional[float] = None, max_redirects: int = 5,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None):
+        """初期化
+
+        Args:
+            user_agent: 送信する User-Agent ヘッダー
+            pool_size: ホストごとに保持するアイドル接続の最大数
+            timeout: connect_timeout / read_timeout を省略した場合に使うタイムアウト秒数（None で無制限）
+            max_redirects: 追従するリダイレクトの最大回数
+            connect_timeout: 接続確立（TLSハンドシェイクを含む）のタイムアウト秒数
+            read_timeout: 送受信1回ごとのタイムアウト秒数。応答が途絶えた接続はこの時間で打ち切られます。
+        """
+        self.user_agent = user_agent
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout if connect_timeout is not None else timeout
+        self.read_timeout = read_timeout if read_timeout is not None else timeout
+        self.max_redirects = max_redirects
+        self.stats = SessionStats()
+        self._pool: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def request(self, url: str, headers: Optional[Dict[str, str]] = None,
+                method: str = 'GET') -> HTTPResponse:
+        """リクエストを送信し、レスポンスを返します（リダイレクトは自動で追従）。
+
+        Args:
+            url: リクエスト先のURL（http/https）
+            headers: 追加のリクエストヘッダー
+            method: HTTPメソッド
+
+        Returns:
+            HTTPResponse。呼び出し側でボディを読み切るか close() する必要があります。
+
+        Raises:
+            ValueError: 対応していないスキームの場合
+            OSError, http.client.HTTPException: 通信エラーの場合
+        """
+        for _ in range(self.max_redirects + 1):
+            response = self._send(url, headers, method)
+            location = response.headers.get('Location')
+            if response.status not in REDIRECT_STATUSES or not location:
+                return response
+            response.read()
+            url = urljoin(url, location)
+            if response.status == 303:
+                method = 'GET'
+        return response
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        """GETリクエストを送信し、ステータスコードと展開済みボディを返します。"""
+        with self.request(url, headers) as response:
+            return response.status, response.read()
+
+    def close(self) -> None:
+        """プール内のすべての接続を閉じます。"""
+        with self._lock:
+            pool, self._pool = self._pool, {}
+        for connections in pool.values():
+            for conn in connections:
+                conn.close()
+
+    def __enter__(self) -> 'HTTPSession':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _send(self, url: str, headers: Optional[Dict[str, str]], method: str) -> HTTPResponse:
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"対応していないURLです: {url}")
+        default_port = 443 if parts.scheme == 'https' else 80
+        key = (parts.scheme, parts.hostname, parts.port or default_port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        request_headers = {'Accept-Encoding': 'gzip, deflate'}
+        if self.user_agent:
+            request_headers['User-Agent'] = self.user_agent
+        if headers:
+            request_headers.update(headers)
+
+        conn, reused = self._acquire(key)
+        try:
+            conn.request(method, path, headers=request_headers)
+            response = conn.getresponse()
+        except _STALE_CONNECTION_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+            # サーバー側で閉じられたkeep-alive接続だったため、新しい接続で一度だけ再送する
+            conn, _ = self._acquire(key, fresh=True)
+            try:
+                conn.request(method, path, headers=request_headers)
+                response = conn.getresponse()
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+
+        with self._lock:
+            self.stats.requests += 1
+        return HTTPResponse(self, key, conn, response, url)
+
+    def _acquire(self, key: Tuple[str, str, int], fresh: bool = False) -> Tuple[http.client.HTTPConnection, bool]:
+        if not fresh:
+            with self._lock:
+                idle = self._pool.get(key)
+                if idle:
+                    self.stats.connections_reused += 1
+                    return idle.pop(), True
+
+        scheme, host, port = key
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port, timeout=self.connect_timeout)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.connect_timeout)
+        # 接続確立後は送受信用のタイムアウトに切り替える
+        try:
+            conn.connect()
+            conn.sock.settimeout(self.read_timeout)
+        except BaseException:
+            conn.close()
+            raise
+        with self._lock:
+            self.stats.connections_opened += 1
+        return conn, False
+
+    def _release(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._pool.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _add_bytes(self, count: int) -> None:
+        with self._lock:
+            self.stats.bytes_received += count
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+保存済みのHTML（ディレクトリ・tar アーカイブ）からの一括抽出
+
+通信は行わず、各ページをメモリマップしてバイト列のまま JSON-LD ブロックを探し、
+一致した部分のみをデコードします。ページ全体を str にデコードしないため、
+数GB規模のアーカイブでも処理時間はほぼ読み込み（I/O）で決まります。
+
+ページの種別（シリーズ / エピソード）は canonical URL（なければ og:url、JSON-LD、ファイル名）で判定し、
+エピソードページのあらすじは、同じアーカイブ内のシリーズページの話に対応付けます。
+"""
+
+import mmap
+import os
+import re
+import tarfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .extractor import DEFAULT_BASE_URL, MetadataParser, extract_series_id
+from .jsonld import JsonLdDocument, iter_strings
+from .models import EpisodeMetadata, SeriesMetadata
+from .synopsis import EPISODE_ID_PATTERN, episode_synopses, fill_synopses
+
+
+# 保存済みのページとみなすファイルの拡張子（拡張子のないファイルも対象）
+HTML_SUFFIXES = ('.html', '.htm')
+
+# ページのURLを探す <head> の範囲の上限（</head> が見つからない場合）
+HEAD_LIMIT = 256 * 1024
+
+_LINK_TAG_PATTERN = re.compile(rb'<link\b[^>]*>', re.IGNORECASE)
+_META_TAG_PATTERN = re.compile(rb'<meta\b[^>]*>', re.IGNORECASE)
+_ATTR_PATTERN = re.compile(rb'([a-zA-Z:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+# ファイル名（wget 等でミラーした際のパス）からページのURLを推測するパターン
+_NAME_URL_PATTERN = re.compile(r'video/(title|episode)/([0-9A-Za-z_-]+)')
+
+# 1回の解析タスクにまとめるページ数とバイト数の上限（プロセス間通信の回数を減らす）
+CHUNK_PAGES = 64
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# プロセスごとにメモリマップ済みのアーカイブ（同じ tar のメンバーごとに開き直さない）
+_archive_maps: Dict[str, Tuple[Any, mmap.mmap]] = {}
+
+
+@dataclass
+class SnapshotFile:
+    """走査対象の1ページ（ファイル、または tar アーカイブのメンバー）"""
+    name: str                       # 表示名（ファイルパス、または「アーカイブ:メンバー名」）
+    path: Optional[str] = None      # メモリマップするファイルのパス
+    offset: int = 0                 # ファイル内でのページの開始位置
+    size: Optional[int] = None      # ページのバイト数（省略時はファイル全体）
+    mtime: float = 0.0              # 保存日時（抽出日として使用）
+    data: Optional[bytes] = None    # 圧縮アーカイブのメンバーなど、読み込み済みの内容
+
+
+@dataclass
+class ScannedPage:
+    """1ページの走査結果（ワーカープロセスから返す値）"""
+    name: str                                                   # 表示名
+    kind: str = 'unknown'                                       # series / episode / unknown
+    url: Optional[str] = None                                   # ページのURL
+    mtime: float = 0.0                                          # 保存日時
+    size: int = 0                                               # ページのバイト数
+    title: Optional[str] = None                                 # シリーズタイトル（シリーズページ）
+    episodes: List[EpisodeMetadata] = field(default_factory=list)  # エピソード一覧（シリーズページ）
+    synopsis: Optional[str] = None                              # あらすじ（エピソードページ）
+    error: Optional[str] = None                                 # 読み込みに失敗した場合のエラーメッセージ
+
+
+@dataclass
+class SnapshotReport:
+    """一括抽出の集計結果を保持するクラス"""
+    files: int = 0          # 走査したページ数
+    bytes: int = 0          # 走査したバイト数
+    series: int = 0         # 抽出したシリーズ数
+    episodes: int = 0       # 抽出したエピソード数
+    synopses: int = 0       # あらすじを設定できたエピソード数
+    unknown: int = 0        # 種別を判定できなかったページ数
+    orphans: int = 0        # 対応するシリーズページがなかったエピソードページ数
+    errors: int = 0         # 読み込みに失敗したページ数
+    elapsed: float = 0.0    # 経過時間（秒）
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / 1e6 / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _is_page_name(name: str) -> bool:
+    base = os.path.basename(name)
+    return base.lower().endswith(HTML_SUFFIXES) or '.' not in base
+
+
+def _open_tar(path: str) -> Tuple[tarfile.TarFile, bool]:
+    # 非圧縮の tar はメンバーの位置を直接メモリマップし、圧縮されている場合は順に展開する
+    try:
+        return tarfile.open(path, 'r:'), False
+    except tarfile.ReadError:
+        return tarfile.open(path, 'r|*'), True
+
+
+def _iter_tar(path: str) -> Iterator[SnapshotFile]:
+    archive, compressed = _open_tar(path)
+    with archive:
+        for member in archive:
+            if not member.isfile() or not _is_page_name(member.name):
+                continue
+            name = f'{path}:{member.name}'
+            if compressed:
+                stream = archive.extractfile(member)
+                data = stream.read() if stream is not None else b''
+                yield SnapshotFile(name, size=len(data), mtime=member.mtime, data=data)
+            else:
+                yield SnapshotFile(name, path=path, offset=member.offset_data, size=member.size,
+                                   mtime=member.mtime)
+
+
+def _file(path: str) -> SnapshotFile:
+    return SnapshotFile(path, path=path, mtime=os.path.getmtime(path))
+
+
+def iter_snapshot_files(paths: Iterable[str]) -> Iterator[SnapshotFile]:
+    """指定したファイル・ディレクトリ（再帰的に探索）・tar アーカイブから、走査対象のページを列挙します。
+
+    ディレクトリ内では、HTMLの拡張子を持つファイル・拡張子のないファイル・tar アーカイブを対象とします。
+
+    Args:
+        paths: ファイル、ディレクトリ、または tar アーカイブ（gzip / bz2 / xz 圧縮も可）のパス
+
+    Yields:
+        SnapshotFile
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    file_path = os.path.join(root, filename)
+                    if _is_page_name(filename):
+                        yield _file(file_path)
+                    elif '.tar' in filename or filename.endswith(('.tgz', '.tbz2', '.txz')):
+                        yield from _iter_tar(file_path)
+        elif not _is_page_name(path) and tarfile.is_tarfile(path):
+            yield from _iter_tar(path)
+        else:
+            yield _file(path)
+
+
+def _head_url(head: bytes) -> Optional[str]:
+    # <link rel="canonical"> を優先し、なければ <meta property="og:url"> を使用する
+    for tag in _LINK_TAG_PATTERN.finditer(head):
+        attrs = {name.lower(): first or second for name, first, second in _ATTR_PATTERN.findall(tag.group(0))}
+        if b'canonical' in attrs.get(b'rel', b'').lower().split() and attrs.get(b'href'):
+            return attrs[b'href'].decode('utf-8', errors='replace')
+    for tag in _META_TAG_PATTERN.finditer(head):
+        attrs = {name.lower(): first or second for name, first, second in _ATTR_PATTERN.findall(tag.group(0))}
+        if attrs.get(b'property') == b'og:url' and attrs.get(b'content'):
+            return attrs[b'content'].decode('utf-8', errors='replace')
+    return None
+
+
+def _document_url(document: JsonLdDocument) -> Optional[str]:
+    # 最上位のブロックが TVEpisode であればエピソードページ（シリーズページの TVEpisode は TVSeries の配下）
+    for block in document.blocks:
+        if isinstance(block, dict) and block.get('@type') == 'TVEpisode':
+            url = block.get('url')
+            if isinstance(url, str) and '/video/episode/' in url:
+                return url
+    for breadcrumb in document.of_type('BreadcrumbList'):
+        for url in iter_strings(breadcrumb, 'item'):
+            if '/video/title/' in url:
+                return url
+    return None
+
+
+def _name_url(name: str) -> Optional[str]:
+    match = _NAME_URL_PATTERN.search(name.replace(os.sep, '/'))
+    if match:
+        return f'{DEFAULT_BASE_URL}video/{match.group(1)}/{match.group(2)}'
+    return None
+
+
+def _scan_range(item: SnapshotFile, data, start: int, end: int) -> ScannedPage:
+    head_limit = min(end, start + HEAD_LIMIT)
+    head_end = data.find(b'</head>', start, head_limit)
+    head_url = _head_url(data[start:head_end if head_end >= 0 else head_limit])
+    document = JsonLdDocument.parse_bytes(data, start, end)
+
+    url = head_url or _document_url(document) or _name_url(item.name)
+    page = ScannedPage(item.name, url=url, mtime=item.mtime, size=end - start)
+    parser = MetadataParser()
+    if url and '/video/episode/' in url:
+        page.kind = 'episode'
+        page.synopsis = parser.extract_synopsis(document)
+    elif url and '/video/title/' in url:
+        page.kind = 'series'
+        page.title = parser.extract_series_title(document)
+        page.episodes = parser.extract_episodes(document, url)
+        fill_synopses(page.episodes, episode_synopses(document, url))
+    return page
+
+
+def _archive_map(path: str) -> mmap.mmap:
+    entry = _archive_maps.get(path)
+    if entry is None:
+        f = open(path, 'rb')
+        try:
+            entry = _archive_maps[path] = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except BaseException:
+            f.close()
+            raise
+    return entry[1]
+
+
+def close_archive_maps() -> None:
+    """このプロセスでメモリマップしたアーカイブをすべて閉じます。"""
+    while _archive_maps:
+        _, (f, data) = _archive_maps.popitem()
+        data.close()
+        f.close()
+
+
+def scan_snapshot(item: SnapshotFile) -> ScannedPage:
+    """1ページをメモリマップして走査します（ワーカープロセスで実行）。
+
+    tar アーカイブのメンバーは、アーカイブ全体を一度だけメモリマップしてその範囲を走査します。
+
+    Args:
+        item: 走査するページ
+
+    Returns:
+        ScannedPage（読み込みに失敗した場合は error を設定）
+    """
+    try:
+        if item.data is not None:
+            return _scan_range(item, item.data, 0, len(item.data))
+        if item.size is not None:
+            if item.size <= 0:
+                return ScannedPage(item.name, mtime=item.mtime)
+            return _scan_range(item, _archive_map(item.path), item.offset, item.offset + item.size)
+        with open(item.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return ScannedPage(item.name, mtime=item.mtime)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _scan_range(item, data, 0, size)
+    except (OSError, ValueError) as e:
+        return ScannedPage(item.name, mtime=item.mtime, error=str(e))
+
+
+def scan_snapshots(items: List[SnapshotFile]) -> List[ScannedPage]:
+    """複数のページを順に走査します（ワーカープロセスでまとめて実行）。"""
+    return [scan_snapshot(item) for item in items]
+
+
+def _iter_chunks(items: Iterable[SnapshotFile]) -> Iterator[List[SnapshotFile]]:
+    chunk: List[SnapshotFile] = []
+    size = 0
+    for item in items:
+        chunk.append(item)
+        size += item.size or 0
+        if len(chunk) >= CHUNK_PAGES or size >= CHUNK_BYTES:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+
+def extract_snapshots(paths: Iterable[str], workers: Optional[int] = None,
+                      on_error: Optional[Callable[[str, str], None]] = None
+                      ) -> Tuple[List[SeriesMetadata], SnapshotReport]:
+    """保存済みのページからシリーズごとのメタ情報を抽出します。
+
+    各ページの走査はプロセスプールで並列に行い、同じシリーズ（エピソード）のページが複数ある場合は
+    保存日時の新しいものを使用します。あらすじはシリーズページに埋め込まれたものを優先し、
+    残りの話は対応するエピソードページから設定します。
+
+    Args:
+        paths: ファイル、ディレクトリ、または tar アーカイブのパス
+        workers: 走査に使用するプロセス数（省略時はCPUコア数、0 で呼び出し元のプロセスで実行）
+        on_error: 読み込めなかったページごとに (表示名, エラーメッセージ) を受け取るコールバック
+
+    Returns:
+        (シリーズIDの順に並べた SeriesMetadata のリスト, SnapshotReport) のタプル
+    """
+    from .pipeline import ParsePool
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    start = time.perf_counter()
+    pool = ParsePool(workers)
+    futures = []
+    try:
+        # 未処理のタスク数には上限があるため、圧縮アーカイブを展開しながらでもメモリ使用量は一定
+        for chunk in _iter_chunks(iter_snapshot_files(paths)):
+            futures.append(pool.submit(scan_snapshots, chunk))
+        pages = [page for future in futures for page in future.result()]
+    finally:
+        pool.close()
+        if workers == 0:
+            close_archive_maps()
+
+    report = SnapshotReport(files=len(pages))
+    series_pages: Dict[str, ScannedPage] = {}
+    synopses: Dict[str, ScannedPage] = {}
+    for page in pages:
+        report.bytes += page.size
+        if page.error is not None:
+            report.errors += 1
+            if on_error is not None:
+                on_error(page.name, page.error)
+            continue
+        if page.kind == 'series':
+            key = extract_series_id(page.url) or page.url
+            latest = series_pages.get(key)
+            if latest is None or page.mtime >= latest.mtime:
+                series_pages[key] = page
+        elif page.kind == 'episode' and page.synopsis:
+            match = EPISODE_ID_PATTERN.search(page.url)
+            key = match.group(1) if match else page.url
+            latest = synopses.get(key)
+            if latest is None or page.mtime >= latest.mtime:
+                synopses[key] = page
+        elif page.kind == 'unknown':
+            report.unknown += 1
+
+    results = []
+    for key in sorted(series_pages):
+        page = series_pages[key]
+        for episode in page.episodes:
+            match = EPISODE_ID_PATTERN.search(episode.url) if episode.url else None
+            episode_page = synopses.pop(match.group(1), None) if match else None
+            if not episode.synopsis and episode_page is not None:
+                episode.synopsis = episode_page.synopsis
+        report.series += 1
+        report.episodes += len(page.episodes)
+        report.synopses += sum(1 for episode in page.episodes if episode.synopsis)
+        results.append(SeriesMetadata(
+            title=page.title,
+            source_url=page.url,
+            extraction_date=datetime.fromtimestamp(page.mtime).strftime('%Y-%m-%d'),
+            episodes=page.episodes
+        ))
+    report.orphans = len(synopses)
+    report.elapsed = time.perf_counter() - start
+    return results, report
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+エピソードのあらすじをシリーズ単位でまとめて取り出す取得元
+
+各話のページを1件ずつ取得する代わりに、シリーズページに埋め込まれた構造化データ
+（TVSeries / TVSeason / TVEpisode の JSON-LD）や、シーズン単位の JSON-LD 文書から
+あらすじをまとめて取り出します。取得元で見つからなかった話だけが、従来どおり
+個別ページ（AbemaMetadataExtractor.fetch_synopsis）から取得されます。
+
+取得元の scan() は通信を行わない純粋な処理のため、解析用のワーカープロセスでも実行でき、
+同期版・非同期版の抽出クラスと一括処理で共有します。追加の文書の取得は各抽出クラスが行います。
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import urljoin
+
+from .jsonld import JsonLdDocument, decode_block
+from .models import EpisodeMetadata
+
+
+# シーズン単位の JSON-LD 文書を指す <link rel="alternate" type="application/ld+json" href="..."> タグ
+LINK_TAG_PATTERN = re.compile(r'<link\b[^>]*>', re.IGNORECASE)
+LINK_ATTR_PATTERN = re.compile(r'([a-zA-Z-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+# エピソードページのURLからエピソードID（例: 189-85_s1_p3）を取り出すパターン
+EPISODE_ID_PATTERN = re.compile(r'/video/episode/([^/?#]+)')
+
+# シリーズURLからシリーズIDを取り出すパターン（extractor.SERIES_ID_PATTERN と同じ。循環 import を避けるため再定義）
+_SERIES_ID_PATTERN = re.compile(r'/title/([^/?#]+)')
+
+
+class SeriesPage:
+    """取得元に渡すシリーズページ（HTMLと、必要になった時点で解析する JsonLdDocument）"""
+
+    def __init__(self, url: str, content: str, document: Optional[JsonLdDocument] = None):
+        """初期化
+
+        Args:
+            url: シリーズのURL
+            content: シリーズページのHTML
+            document: 解析済みの JsonLdDocument（省略時は初回参照時に解析）
+        """
+        self.url = url
+        self.content = content
+        self._document = document
+
+    @property
+    def document(self) -> JsonLdDocument:
+        if self._document is None:
+            self._document = JsonLdDocument.parse(self.content)
+        return self._document
+
+
+@dataclass
+class SynopsisLookup:
+    """取得元がシリーズページから見つけた結果"""
+    synopses: Dict[int, str] = field(default_factory=dict)  # 話数→あらすじ
+    document_url: Optional[str] = None                      # 追加で取得する JSON-LD 文書のURL
+
+
+class SynopsisSource:
+    """あらすじの取得元の基底クラス
+
+    サブクラスは scan() でシリーズページからあらすじを取り出し、追加の文書が必要な場合は
+    そのURLを返して parse_document() で文書を解析します。
+    """
+
+    name = 'base'
+
+    def scan(self, page: SeriesPage) -> SynopsisLookup:
+        """シリーズページから、話数→あらすじ と追加で取得する文書のURLを取り出します。"""
+        raise NotImplementedError
+
+    def parse_document(self, content: str, series_url: str) -> Dict[int, str]:
+        """scan() が返したURLの文書から、話数→あらすじ を取り出します。"""
+        return {}
+
+
+class EmbeddedJsonLdSource(SynopsisSource):
+    """シリーズページに埋め込まれた TVEpisode ノードの description を使用する取得元"""
+
+    name = 'embedded'
+
+    def scan(self, page: SeriesPage) -> SynopsisLookup:
+        return SynopsisLookup(synopses=episode_synopses(page.document, page.url))
+
+
+class SeasonDocumentSource(SynopsisSource):
+    """<link rel="alternate" type="application/ld+json"> が指すシーズン単位の文書を使用する取得元"""
+
+    name = 'season'
+
+    def scan(self, page: SeriesPage) -> SynopsisLookup:
+        return SynopsisLookup(document_url=find_alternate_jsonld(page.content, page.url))
+
+    def parse_document(self, content: str, series_url: str) -> Dict[int, str]:
+        value = decode_block(content)
+        # JSON ではなくHTMLが返された場合は、その中の JSON-LD ブロックを使用する
+        document = JsonLdDocument([value]) if value is not None else JsonLdDocument.parse(content)
+        return episode_synopses(document, series_url)
+
+
+# 既定の取得元（先頭から順に使用し、見つからなかった話のみ次の取得元で探す）
+DEFAULT_SYNOPSIS_SOURCES = (EmbeddedJsonLdSource(), SeasonDocumentSource())
+
+
+def _number(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+
+def episode_synopses(document: JsonLdDocument, series_url: str) -> Dict[int, str]:
+    """TVEpisode ノードから 話数→あらすじ の辞書を作ります。
+
+    第1シーズン以外のシーズンに属する話と、他のシリーズのエピソードページを指す話は除外します。
+    同じ話数に異なるあらすじが見つかった場合は、誤った対応付けを避けるためその話数を除外します。
+
+    Args:
+        document: シリーズページまたはシーズン単位の文書の JsonLdDocument
+        series_url: シリーズのURL（他のシリーズの話を除外するために使用）
+
+    Returns:
+        話数をキー、あらすじを値とする辞書
+    """
+    match = _SERIES_ID_PATTERN.search(series_url)
+    series_prefix = match.group(1) + '_' if match else None
+    excluded = set()
+    for season in document.of_type('TVSeason'):
+        number = _number(season.get('seasonNumber'))
+        if number is not None and number != 1:
+            excluded.update(id(node) for node in JsonLdDocument([season]).of_type('TVEpisode'))
+
+    found: Dict[int, str] = {}
+    conflicts = set()
+    for node in document.of_type('TVEpisode'):
+        if id(node) in excluded:
+            continue
+        number = _number(node.get('episodeNumber'))
+        description = node.get('description')
+        if number is None or not isinstance(description, str) or not description:
+            continue
+        season = node.get('partOfSeason')
+        if isinstance(season, dict) and _number(season.get('seasonNumber')) not in (None, 1):
+            continue
+        url = node.get('url')
+        match = EPISODE_ID_PATTERN.search(url) if isinstance(url, str) and series_prefix else None
+        if match and not match.group(1).startswith(series_prefix):
+            continue
+        if found.get(number, description) != description:
+            conflicts.add(number)
+        found[number] = description
+    for number in conflicts:
+        del found[number]
+    return found
+
+
+def find_alternate_jsonld(content: str, base_url: str) -> Optional[str]:
+    """HTMLから rel="alternate" かつ type="application/ld+json" の link タグを探し、絶対URLを返します。
+
+    Args:
+        content: シリーズページのHTML
+        base_url: 相対URLの基準とするシリーズのURL
+
+    Returns:
+        文書のURL。見つからない場合は None。
+    """
+    head_end = content.find('</head>')
+    for tag in LINK_TAG_PATTERN.finditer(content, 0, head_end if head_end >= 0 else len(content)):
+        attrs = {name.lower(): first or second
+                 for name, first, second in LINK_ATTR_PATTERN.findall(tag.group(0))}
+        if attrs.get('type', '').lower() != 'application/ld+json':
+            continue
+        if 'alternate' not in attrs.get('rel', '').lower().split():
+            continue
+        href = attrs.get('href')
+        if href:
+            return urljoin(base_url, href)
+    return None
+
+
+def scan_sources(sources: Sequence[SynopsisSource], page: SeriesPage) -> List[SynopsisLookup]:
+    """各取得元の scan() を順に実行した結果を返します（通信は行いません）。"""
+    return [source.scan(page) for source in sources]
+
+
+def missing_synopses(episodes: Iterable[EpisodeMetadata]) -> List[EpisodeMetadata]:
+    """あらすじが未設定で、個別ページから取得できるエピソードを返します。"""
+    return [episode for episode in episodes if episode.url and not episode.synopsis]
+
+
+def fill_synopses(episodes: Iterable[EpisodeMetadata], synopses: Dict[int, str]) -> int:
+    """あらすじが未設定のエピソードにのみ、話数が一致するあらすじを設定します。
+
+    Returns:
+        設定したエピソード数
+    """
+    filled = 0
+    if not synopses:
+        return filled
+    for episode in episodes:
+        if not episode.synopsis:
+            synopsis = synopses.get(episode.number)
+            if synopsis:
+                episode.synopsis = synopsis
+                filled += 1
+    return filled
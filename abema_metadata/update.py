@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+既存の抽出結果を再利用する差分更新
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from .extractor import AbemaMetadataExtractor
+from .jsonld import JsonLdDocument
+from .models import EpisodeMetadata, SeriesMetadata
+from .synopsis import SeriesPage, missing_synopses
+
+
+@dataclass
+class UpdateReport:
+    """差分更新の結果を保持するクラス"""
+    added: int = 0          # 新たに追加されたエピソード数
+    changed: int = 0        # タイトル・URL・あらすじが更新されたエピソード数
+    unchanged: int = 0      # 変更のなかったエピソード数
+    requests: int = 0       # 送信したページ取得リクエスト数（シリーズページを含む）
+
+
+def update_metadata(extractor: AbemaMetadataExtractor, existing: SeriesMetadata, url: str,
+                    include_synopsis: bool = True) -> Tuple[SeriesMetadata, UpdateReport]:
+    """シリーズページを再取得し、既存のメタ情報との差分のみを更新します。
+
+    あらすじは、新しいエピソードと既存の結果であらすじが欠けているエピソードについてのみ取得します
+    （シリーズ単位の取得元で見つからなかった話のみ個別ページを取得）。
+    シリーズページから消えたエピソードは既存の情報をそのまま残します。
+
+    Args:
+        extractor: ページ取得に使用するエクストラクター
+        existing: 前回の抽出結果
+        url: シリーズのURL
+        include_synopsis: あらすじを取得するかどうか
+
+    Returns:
+        (更新後の SeriesMetadata, UpdateReport) のタプル
+
+    Raises:
+        InvalidURLError: URLが無効な場合
+        NetworkError: 通信エラーの場合
+    """
+    content = extractor.fetch_page(url)
+    document = JsonLdDocument.parse(content)
+    report = UpdateReport(requests=1)
+    series_title = extractor.extract_series_title(document)
+    stored: Dict[int, EpisodeMetadata] = {episode.number: episode for episode in existing.episodes}
+    existing_numbers = set(stored)
+
+    merged: List[EpisodeMetadata] = []
+    needs_synopsis: List[EpisodeMetadata] = []
+    changed_numbers = set()
+
+    for episode in extractor.extract_episodes(document, url):
+        previous = stored.pop(episode.number, None)
+        if previous is None:
+            report.added += 1
+            needs_synopsis.append(episode)
+        else:
+            episode.synopsis = previous.synopsis
+            if episode.title != previous.title or episode.url != previous.url:
+                changed_numbers.add(episode.number)
+            if not episode.synopsis:
+                needs_synopsis.append(episode)
+        merged.append(episode)
+
+    if include_synopsis:
+        documents = extractor.metrics.counter('synopsis_documents')
+        lookups = extractor.scan_synopsis_sources(SeriesPage(url, content, document))
+        extractor.fill_bulk_synopses(url, needs_synopsis, lookups)
+        targets = missing_synopses(needs_synopsis)
+        extractor.fetch_synopses(targets)
+        report.requests += len(targets) + extractor.metrics.counter('synopsis_documents') - documents
+        # 既存のエピソードで、欠けていたあらすじを取得できたものは更新扱い
+        changed_numbers.update(
+            episode.number for episode in needs_synopsis
+            if episode.synopsis and episode.number in existing_numbers
+        )
+
+    report.changed = len(changed_numbers)
+    report.unchanged = sum(1 for episode in merged if episode.number in existing_numbers
+                           and episode.number not in changed_numbers)
+
+    # シリーズページに載らなくなったエピソードも保持する
+    report.unchanged += len(stored)
+    merged.extend(stored.values())
+
+    return SeriesMetadata(
+        title=series_title if series_title != "不明なシリーズ" else existing.title,
+        source_url=url,
+        extraction_date=datetime.now().strftime('%Y-%m-%d'),
+        episodes=sorted(merged, key=lambda x: x.number)
+    ), report
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+多数のシリーズの新しい話を少ない通信量で検出する監視モード
+
+シリーズごとに、既知の話（話数とサブタイトル）、シリーズページの ETag / Last-Modified、
+新しい話が追加された間隔（配信周期）を状態ファイル（JSON）に保存します。
+各シリーズの次の確認時刻は優先度付きキュー（ヒープ）で管理し、確認ではシリーズページのみを
+条件付きリクエストで取得します。変更がなければ 304 で終わり、新しい話が見つかった場合に限り
+その話のあらすじを取得します。
+
+更新のないシリーズは確認間隔を倍々に延ばし（上限 max_interval）、配信周期を学習したシリーズは
+次の配信予定時刻の前後だけ短い間隔で確認します。このため、1時間あたりのリクエスト数は
+監視するシリーズ数ではなく、新しい話の数に応じて増減します。
+"""
+
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from statistics import median
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .extractor import AbemaExtractorError, AbemaMetadataExtractor, extract_series_id
+from .jsonld import JsonLdDocument
+from .models import EpisodeMetadata
+from .output import write_json
+from .synopsis import SeriesPage, missing_synopses
+
+
+logger = logging.getLogger(__name__)
+
+# 状態ファイルの形式のバージョン
+STATE_VERSION = 1
+
+# 配信周期の学習に使用する直近の間隔の数
+CADENCE_HISTORY = 5
+
+# 変更イベントを受け取る関数の型: emit(イベントの辞書)
+EventHandler = Callable[[Dict[str, Any]], None]
+
+
+@dataclass
+class WatchPolicy:
+    """確認間隔を決めるポリシー"""
+    min_interval: float = 300.0       # 確認間隔の下限（秒）
+    max_interval: float = 86400.0     # 更新のないシリーズの確認間隔の上限（秒）
+    backoff: float = 2.0              # 更新のない確認ごとに間隔に掛ける倍率
+    release_window: float = 3600.0    # 配信予定時刻の前後で短い間隔で確認する幅（秒）
+
+    def next_delay(self, state: 'SeriesState', now: float) -> float:
+        """次の確認までの秒数を返します。
+
+        失敗が続いている場合と更新がない場合は間隔を倍々に延ばします。配信周期を学習済みの場合は、
+        次の配信予定時刻の release_window 秒前までに確認し、予定時刻の前後は min_interval ごとに確認します。
+
+        Args:
+            state: シリーズの状態
+            now: 現在時刻（UNIX時間）
+
+        Returns:
+            次の確認までの秒数
+        """
+        if state.failures:
+            return min(self.max_interval, self.min_interval * self.backoff ** state.failures)
+        delay = min(self.max_interval, self.min_interval * self.backoff ** state.idle_polls)
+        expected = state.expected_release(now, self.release_window)
+        if expected is not None:
+            if expected - self.release_window <= now:
+                return self.min_interval
+            delay = min(delay, expected - self.release_window - now)
+        return max(self.min_interval, delay)
+
+
+@dataclass
+class SeriesState:
+    """1シリーズ分の監視状態（状態ファイルに保存）"""
+    url: str                                                # シリーズURL
+    title: Optional[str] = None                             # シリーズタイトル
+    episodes: Dict[int, str] = field(default_factory=dict)  # 既知の話（話数→サブタイトル）
+    etag: Optional[str] = None                              # シリーズページの ETag
+    last_modified: Optional[str] = None                     # シリーズページの Last-Modified
+    last_checked: Optional[float] = None                    # 最後に確認した時刻（UNIX時間）
+    last_changed: Optional[float] = None                    # 最後に新しい話を検出した時刻（UNIX時間）
+    intervals: List[float] = field(default_factory=list)    # 直近の新しい話の検出間隔（秒）
+    idle_polls: int = 0                                     # 更新のなかった連続確認回数
+    failures: int = 0                                       # 連続失敗回数
+    next_check: float = 0.0                                 # 次に確認する時刻（UNIX時間）
+
+    @property
+    def initialized(self) -> bool:
+        """初回の確認が済んでいるかどうか"""
+        return self.last_checked is not None
+
+    def cadence(self) -> Optional[float]:
+        """学習した配信周期（直近の検出間隔の中央値）を返します。2回分の間隔がない場合は None。"""
+        if len(self.intervals) < 2:
+            return None
+        return median(self.intervals)
+
+    def expected_release(self, now: float, window: float) -> Optional[float]:
+        """次の配信予定時刻を返します（配信周期が未学習の場合は None）。
+
+        予定時刻を window 秒以上過ぎても検出できなかった場合は、配信が休止した回とみなして次の周期へ進めます。
+        """
+        cadence = self.cadence()
+        if cadence is None or self.last_changed is None:
+            return None
+        expected = self.last_changed + cadence
+        if now > expected + window:
+            expected += cadence * ((now - expected - window) // cadence + 1)
+        return expected
+
+    def record_release(self, now: float, min_interval: float) -> None:
+        """新しい話の検出を記録し、配信周期を更新します（min_interval 未満の間隔は同じ回とみなす）。"""
+        if self.last_changed is not None and now - self.last_changed >= min_interval:
+            self.intervals = (self.intervals + [now - self.last_changed])[-CADENCE_HISTORY:]
+        self.last_changed = now
+
+    def to_dict(self) -> Dict[str, Any]:
+        """状態ファイル用の辞書に変換します。"""
+        return {
+            'url': self.url,
+            'title': self.title,
+            'episodes': {str(number): title for number, title in sorted(self.episodes.items())},
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'last_checked': self.last_checked,
+            'last_changed': self.last_changed,
+            'intervals': self.intervals,
+            'idle_polls': self.idle_polls,
+            'failures': self.failures,
+            'next_check': self.next_check,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SeriesState':
+        """to_dict() の辞書から復元します。"""
+        return cls(
+            url=data['url'],
+            title=data.get('title'),
+            episodes={int(number): title for number, title in (data.get('episodes') or {}).items()},
+            etag=data.get('etag'),
+            last_modified=data.get('last_modified'),
+            last_checked=data.get('last_checked'),
+            last_changed=data.get('last_changed'),
+            intervals=list(data.get('intervals') or []),
+            idle_polls=data.get('idle_polls', 0),
+            failures=data.get('failures', 0),
+            next_check=data.get('next_check', 0.0),
+        )
+
+
+def load_states(path: str) -> Dict[str, SeriesState]:
+    """状態ファイルを読み込みます（存在しない場合は空の辞書）。
+
+    Raises:
+        ValueError: 状態ファイルの形式が不正な場合
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get('version') != STATE_VERSION:
+        raise ValueError(f"監視の状態ファイルの形式が不正です: {path}")
+    try:
+        return {item['url']: SeriesState.from_dict(item) for item in data.get('series', [])}
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"監視の状態ファイルの形式が不正です: {path}: {e}") from e
+
+
+def save_states(states: Iterable[SeriesState], path: str) -> None:
+    """状態ファイルを保存します（書き込み完了時にアトミックに置き換え）。"""
+    write_json({'version': STATE_VERSION, 'series': [state.to_dict() for state in states]}, path)
+
+
+def _timestamp(now: float) -> str:
+    return datetime.fromtimestamp(now, timezone.utc).isoformat(timespec='seconds')
+
+
+class Watcher:
+    """シリーズページを条件付きリクエストで定期的に確認し、話の追加・変更・削除をイベントとして通知するクラス
+
+    イベントは emit に辞書として渡されます（event: series_added / new_episode / episode_changed /
+    episode_removed / error）。初回の確認では既知の話を記録するのみで、new_episode は通知しません。
+    """
+
+    def __init__(self, extractor: AbemaMetadataExtractor, urls: Iterable[str], state_path: str,
+                 emit: EventHandler, policy: Optional[WatchPolicy] = None,
+                 include_synopsis: bool = True, clock: Callable[[], float] = time.time):
+        """初期化
+
+        Args:
+            extractor: ページ取得に使用するエクストラクター（キャッシュは使用しません）
+            urls: 監視するシリーズURL。状態ファイルにあってここにないシリーズは監視対象から外します。
+            state_path: 状態ファイルのパス
+            emit: 変更イベントを受け取る関数
+            policy: 確認間隔を決めるポリシー。省略時は既定値。
+            include_synopsis: 新しい話のあらすじを取得するかどうか
+            clock: 現在時刻（UNIX時間）を返す関数（テスト用）
+
+        Raises:
+            ValueError: 状態ファイルの形式が不正な場合
+        """
+        self.extractor = extractor
+        self.state_path = state_path
+        self.emit = emit
+        self.policy = policy or WatchPolicy()
+        self.include_synopsis = include_synopsis
+        self.clock = clock
+        stored = load_states(state_path)
+        self.states: Dict[str, SeriesState] = {}
+        for url in urls:
+            self.states[url] = stored.get(url) or SeriesState(url)
+        self._queue = [(state.next_check, url) for url, state in self.states.items()]
+        heapq.heapify(self._queue)
+        self._emit_lock = threading.Lock()
+
+    def next_due(self) -> Optional[float]:
+        """次に確認するシリーズの予定時刻を返します（監視対象がない場合は None）。"""
+        return self._queue[0][0] if self._queue else None
+
+    def poll_due(self, now: Optional[float] = None) -> int:
+        """確認時刻を過ぎたすべてのシリーズを並列に確認し、状態ファイルを保存します。
+
+        Args:
+            now: 基準とする現在時刻（省略時は clock()）
+
+        Returns:
+            確認したシリーズ数
+        """
+        now = self.clock() if now is None else now
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            due.append(heapq.heappop(self._queue)[1])
+        if not due:
+            return 0
+        workers = min(self.extractor.max_workers, len(due))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(self.poll, [self.states[url] for url in due]))
+        for url in due:
+            heapq.heappush(self._queue, (self.states[url].next_check, url))
+        save_states(self.states.values(), self.state_path)
+        return len(due)
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """stop が設定されるまで、予定時刻ごとにシリーズを確認し続けます。"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.poll_due()
+            due = self.next_due()
+            if due is None:
+                return
+            stop.wait(max(0.0, due - self.clock()))
+
+    def poll(self, state: SeriesState) -> None:
+        """1シリーズのシリーズページを条件付きリクエストで確認し、状態を更新します。"""
+        metrics = self.extractor.metrics
+        metrics.increment('watch.polls')
+        initialized = state.initialized
+        try:
+            content, etag, last_modified = self.extractor.fetch_page_conditional(
+                state.url, state.etag, state.last_modified)
+            changed = content is not None and self._apply(state, content)
+        except Exception as e:
+            # 解析処理の不具合やキャッシュの入出力エラー等でも、再スケジュールして監視を続ける
+            now = self.clock()
+            state.failures += 1
+            state.next_check = now + self.policy.next_delay(state, now)
+            metrics.increment('watch.failures')
+            if isinstance(e, AbemaExtractorError):
+                logger.warning("シリーズの確認に失敗しました: %s (%s)", state.url, e, extra={'url': state.url})
+            else:
+                logger.exception("シリーズの確認中に予期せぬエラーが発生しました: %s", state.url,
+                                 extra={'url': state.url})
+            self._emit('error', state, now, message=str(e))
+            return
+
+        now = self.clock()
+        if content is None:
+            metrics.increment('watch.not_modified')
+        state.etag, state.last_modified = etag, last_modified
+        state.failures = 0
+        # 初回の確認は更新のない確認に数えない
+        state.idle_polls = 0 if changed or not initialized else state.idle_polls + 1
+        state.last_checked = now
+        state.next_check = now + self.policy.next_delay(state, now)
+
+    def _apply(self, state: SeriesState, content: str) -> bool:
+        """取得したシリーズページを既知の話と比較し、イベントを通知します。新しい話があれば True を返します。"""
+        document = JsonLdDocument.parse(content)
+        title = self.extractor.extract_series_title(document)
+        episodes = self.extractor.extract_episodes(document, state.url)
+        if state.initialized and state.episodes and not episodes:
+            # 中間ページやエラーページと考えられるため、既知の話を消さずに失敗として扱う
+            raise AbemaExtractorError("シリーズページからエピソードを取得できませんでした")
+        if title != "不明なシリーズ":
+            state.title = title
+        now = self.clock()
+
+        if not state.initialized:
+            state.episodes = {episode.number: episode.title for episode in episodes}
+            self._emit('series_added', state, now, episodes=len(state.episodes))
+            return False
+
+        added = [episode for episode in episodes if episode.number not in state.episodes]
+        current = {episode.number for episode in episodes}
+        for episode in episodes:
+            previous = state.episodes.get(episode.number)
+            if previous is not None and previous != episode.title:
+                self._emit('episode_changed', state, now, number=episode.number,
+                           episode_title=episode.title, previous_title=previous)
+        for number in sorted(set(state.episodes) - current):
+            self._emit('episode_removed', state, now, number=number, episode_title=state.episodes[number])
+
+        if added and self.include_synopsis:
+            self._fetch_synopses(state.url, content, document, added)
+        for episode in added:
+            self._emit('new_episode', state, now, number=episode.number, episode_title=episode.title,
+                       episode_url=episode.url, synopsis=episode.synopsis)
+        self.extractor.metrics.increment('watch.new_episodes', len(added))
+
+        state.episodes = {episode.number: episode.title for episode in episodes}
+        if added:
+            state.record_release(now, self.policy.min_interval)
+        return bool(added)
+
+    def _fetch_synopses(self, url: str, content: str, document: JsonLdDocument,
+                        episodes: List[EpisodeMetadata]) -> None:
+        """新しい話のあらすじのみを、シリーズ単位の取得元 → 個別ページの順に取得します。"""
+        lookups = self.extractor.scan_synopsis_sources(SeriesPage(url, content, document))
+        self.extractor.fill_bulk_synopses(url, episodes, lookups)
+        self.extractor.fetch_synopses(missing_synopses(episodes))
+
+    def _emit(self, event: str, state: SeriesState, now: float, **fields: Any) -> None:
+        record = {'event': event, 'time': _timestamp(now), 'series_id': extract_series_id(state.url),
+                  'series_url': state.url, 'title': state.title}
+        record.update(fields)
+        with self._emit_lock:
+            self.emit(record)
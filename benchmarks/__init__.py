@@ -0,0 +1,2 @@
+# AbemaTV Metadata Extractor benchmarks
+# Offline performance measurements using synthetic fixtures
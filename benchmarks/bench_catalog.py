@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite カタログの取り込み時間と検索時間のベンチマーク
+
+使い方:
+    python -m benchmarks.bench_catalog --series 1000 --episodes 100
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from abema_metadata.catalog import Catalog
+from abema_metadata.models import EpisodeMetadata, SeriesMetadata
+from .fixtures import episode_synopsis
+
+
+def generate_library(series: int, episodes: int):
+    """合成シリーズを series 件（各 episodes 話）生成します。"""
+    for index in range(series):
+        series_id = f'{index}-1'
+        yield SeriesMetadata(
+            title=f'ベンチマークシリーズ{index}',
+            source_url=f'https://abema.tv/video/title/{series_id}',
+            extraction_date='2024-01-01',
+            episodes=[EpisodeMetadata(number=number,
+                                      title=f'サブタイトル{index}-{number}',
+                                      synopsis=episode_synopsis(series_id, number),
+                                      url=f'https://abema.tv/video/episode/{series_id}_s1_p{number}')
+                      for number in range(1, episodes + 1)]
+        )
+
+
+def measure(func, repeat: int) -> float:
+    """最短処理時間（秒）を返します。"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite カタログのベンチマーク')
+    parser.add_argument('--series', type=int, default=1000, help='シリーズ数 (デフォルト: 1000)')
+    parser.add_argument('--episodes', type=int, default=100, help='シリーズあたりの話数 (デフォルト: 100)')
+    parser.add_argument('--repeat', type=int, default=20, help='検索の計測回数 (デフォルト: 20)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        with Catalog(os.path.join(directory, 'catalog.sqlite3')) as catalog:
+            start = time.perf_counter()
+            catalog.add_many(generate_library(args.series, args.episodes))
+            ingest = time.perf_counter() - start
+            total = args.series * args.episodes
+            middle = f'{args.series // 2}-1'
+
+            queries = [
+                ('話数指定', lambda: catalog.get_episode(middle, args.episodes // 2)),
+                ('全文検索 (1語)', lambda: catalog.search(f'サブタイトル{args.series // 2}-')),
+                ('全文検索 (2語)', lambda: catalog.search(f'{middle} 第{args.episodes // 2}話のあらすじ')),
+                ('全文検索 (該当なし)', lambda: catalog.search('存在しない語句')),
+                ('短い語 (LIKE)', lambda: catalog.search('引用')),
+            ]
+
+            print(f"カタログ: {args.series} シリーズ / {total} 話")
+            print(f"取り込み          : {ingest:8.2f} 秒 ({total / ingest:,.0f} 話/秒)")
+            for label, query in queries:
+                print(f"{label:<18}: {measure(query, args.repeat) * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
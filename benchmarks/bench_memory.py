@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+大量のエピソードをメモリに保持する場合の使用量のベンチマーク
+
+__dict__ を持つ従来のデータクラス、__slots__ 付きの EpisodeMetadata のリスト、
+列形式の EpisodeTable（SeriesMetadata.compact()）で、同じカタログを保持した際の
+使用メモリ（tracemalloc で計測）を比較します。
+
+使い方:
+    python -m benchmarks.bench_memory --series 1000 --episodes 100
+"""
+
+import argparse
+import gc
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from abema_metadata.models import EpisodeMetadata, SeriesMetadata
+from .fixtures import episode_synopsis
+
+
+@dataclass
+class LegacyEpisode:
+    """従来の（__slots__ を持たない）エピソードのデータクラス"""
+    number: int
+    title: str
+    synopsis: Optional[str] = None
+    url: Optional[str] = None
+
+
+@dataclass
+class LegacySeries:
+    """従来の（__slots__ を持たない）シリーズのデータクラス"""
+    title: str
+    source_url: str
+    extraction_date: str
+    episodes: List[LegacyEpisode] = field(default_factory=list)
+
+
+def _episode_fields(series_id: str, number: int, synopsis: bool):
+    # 取得結果と同様に、話ごとに別の文字列オブジェクトを作る
+    return (number, f'第{number}話のサブタイトル',
+            episode_synopsis(series_id, number) if synopsis else None,
+            f'https://abema.tv/video/episode/{series_id}_s1_p{number}')
+
+
+def build_catalog(series: int, episodes: int, synopsis: bool, layout: str) -> list:
+    """指定した形式でカタログ全体を作成します（layout: legacy / slots / table）。"""
+    catalog = []
+    for index in range(series):
+        series_id = f'{index}-{index % 97}'
+        fields = [_episode_fields(series_id, number, synopsis) for number in range(1, episodes + 1)]
+        header = (f'シリーズ{index}', f'https://abema.tv/video/title/{series_id}', '2026-10-18')
+        if layout == 'legacy':
+            catalog.append(LegacySeries(*header, episodes=[LegacyEpisode(*values) for values in fields]))
+        else:
+            metadata = SeriesMetadata(*header, episodes=[EpisodeMetadata(*values) for values in fields])
+            catalog.append(metadata.compact() if layout == 'table' else metadata)
+    return catalog
+
+
+def measure(build: Callable[[], object]) -> int:
+    """build() が返したオブジェクトを保持している間の使用メモリ（バイト）を返します。"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return used
+
+
+LAYOUTS = (
+    ('legacy', '従来のデータクラス'),
+    ('slots', '__slots__ のリスト'),
+    ('table', 'EpisodeTable'),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='大量のエピソードを保持する場合の使用メモリのベンチマーク')
+    parser.add_argument('--series', type=int, default=1000, help='シリーズ数 (デフォルト: 1000)')
+    parser.add_argument('--episodes', type=int, default=100, help='シリーズあたりの話数 (デフォルト: 100)')
+    args = parser.parse_args()
+
+    total = args.series * args.episodes
+    print(f"カタログ: {args.series} シリーズ × {args.episodes} 話 = {total} 話")
+    for synopsis in (False, True):
+        print(f"\nあらすじ{'あり' if synopsis else 'なし'}:")
+        baseline = None
+        for layout, label in LAYOUTS:
+            used = measure(lambda: build_catalog(args.series, args.episodes, synopsis, layout))
+            baseline = baseline or used
+            print(f"  {label:<20}: {used / 1e6:8.1f} MB ({used / total:6.0f} バイト/話, 従来比 {used / baseline:.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+シリーズページ解析時間のベンチマーク（従来の正規表現走査と JsonLdDocument の比較）
+
+使い方:
+    python -m benchmarks.bench_parse --episodes 500
+"""
+
+import argparse
+import re
+import time
+
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.jsonld import JsonLdDocument
+from abema_metadata.models import EpisodeMetadata
+from .fixtures import make_series_page
+
+
+SERIES_URL = 'https://abema.tv/video/title/189-85'
+
+
+def legacy_parse(content: str):
+    """JsonLdDocument 導入前の実装（ブロックごとに正規表現で再走査）"""
+    extractor = AbemaMetadataExtractor()
+    title = "不明なシリーズ"
+    for match in re.finditer(r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', content, re.DOTALL):
+        json_script = match.group(1)
+        if re.search(r'"@type"\s*:\s*"BreadcrumbList"', json_script):
+            names = [name for name in re.findall(r'"name"\s*:\s*"([^"]+)"', json_script)
+                     if name not in ['ホーム', 'アニメ', 'ドラマ', '詳細'] and len(name) > 2]
+            if names:
+                title = names[0]
+                break
+
+    episodes = []
+    for match in re.finditer(r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', content, re.DOTALL):
+        json_script = match.group(1)
+        if '"caption"' in json_script:
+            caption_match = re.search(r'"caption"\s*:\s*"([^"]+)"', json_script)
+            if caption_match:
+                caption = caption_match.group(1)
+                if '第' in caption and '話' in caption:
+                    title_match = re.search(r'(?:.*?)第(\d+)話\s*(.+?)(?:\s*のサムネイル)?$', caption)
+                    if title_match:
+                        episode_num = int(title_match.group(1))
+                        url_match = re.search(r'"url"\s*:\s*"([^"]+)"', json_script)
+                        thumbnail_url = url_match.group(1) if url_match else ''
+                        episode_id = extractor._generate_episode_id(thumbnail_url, SERIES_URL, episode_num)
+                        episodes.append(EpisodeMetadata(
+                            number=episode_num,
+                            title=title_match.group(2).strip(),
+                            url=f'https://abema.tv/video/episode/{episode_id}' if episode_id else None
+                        ))
+    return title, sorted(episodes, key=lambda x: x.number)
+
+
+def current_parse(content: str):
+    """JsonLdDocument による一度だけの走査"""
+    extractor = AbemaMetadataExtractor()
+    document = JsonLdDocument.parse(content)
+    return extractor.extract_series_title(document), extractor.extract_episodes(document, SERIES_URL)
+
+
+def measure(func, content: str, repeat: int) -> float:
+    """1ページあたりの最短処理時間（秒）を返します。"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='シリーズページ解析時間のベンチマーク')
+    parser.add_argument('--episodes', type=int, default=500, help='フィクスチャのエピソード数 (デフォルト: 500)')
+    parser.add_argument('--jsonld-size', type=int, default=0,
+                        help='各 ImageObject に付加する説明文の文字数 (デフォルト: 0)')
+    parser.add_argument('--repeat', type=int, default=20, help='計測回数 (デフォルト: 20)')
+    args = parser.parse_args()
+
+    content = make_series_page(episodes=args.episodes, caption_extra=args.jsonld_size)
+    size_mb = len(content.encode('utf-8')) / 1e6
+
+    legacy = measure(legacy_parse, content, args.repeat)
+    current = measure(current_parse, content, args.repeat)
+
+    print(f"フィクスチャ: {args.episodes}話 / {size_mb:.2f} MB")
+    print(f"従来 (正規表現)   : {legacy * 1000:8.2f} ms/page")
+    print(f"JsonLdDocument    : {current * 1000:8.2f} ms/page")
+    print(f"速度比            : {legacy / current:8.2f} x")
+
+
+if __name__ == '__main__':
+    main()
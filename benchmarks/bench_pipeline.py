@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+解析プロセス数（parse_workers）ごとの一括処理スループットのベンチマーク
+
+JSON-LD の大きいシリーズページと、ページ全体を解析するエピソードページ（stream_synopsis=False）で
+解析の負荷が高い状況を作り、ローカルサーバーから一括処理した場合の pages/s を比較します。
+解析をプロセスに分けることで、CPUコア数に応じてスループットが伸びることを確認できます。
+
+使い方:
+    python -m benchmarks.bench_pipeline --series 8 --episodes 200 --workers 0 1 2 4
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from abema_metadata.batch import BatchRunner
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.scheduler import FairScheduler
+from .fixtures import make_site
+from .server import FixtureServer
+
+
+def run_batch(base_url: str, urls, parse_workers: int, jobs: int) -> float:
+    """一括処理を1回実行し、所要時間（秒）を返します。"""
+    with tempfile.TemporaryDirectory() as directory, \
+            AbemaMetadataExtractor(base_url=base_url, max_workers=jobs, stream_synopsis=False,
+                                   parse_workers=parse_workers) as extractor:
+        if parse_workers:
+            # ワーカープロセスの起動時間は計測に含めない
+            extractor.parse_pool().submit(abs, 0).result()
+        with FairScheduler(jobs, rate_per_host=0) as scheduler:
+            runner = BatchRunner(extractor, scheduler, directory, fmt='jsonl')
+            start = time.perf_counter()
+            summary = runner.run(urls)
+            elapsed = time.perf_counter() - start
+    if summary.failed:
+        raise RuntimeError(f"{summary.failed} シリーズの処理に失敗しました")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析プロセス数ごとの一括処理スループットのベンチマーク')
+    parser.add_argument('--series', type=int, default=8, help='シリーズ数 (デフォルト: 8)')
+    parser.add_argument('--episodes', type=int, default=200, help='シリーズあたりの話数 (デフォルト: 200)')
+    parser.add_argument('--jsonld-size', type=int, default=2000,
+                        help='シリーズページの各 ImageObject に付加する説明文の文字数 (デフォルト: 2000)')
+    parser.add_argument('--padding', type=int, default=50000,
+                        help='エピソードページの JSON-LD 以降のHTMLの文字数 (デフォルト: 50000)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4],
+                        help='比較する parse_workers の値 (デフォルト: 0 1 2 4)')
+    parser.add_argument('-j', '--jobs', type=int, default=16, help='同時接続数 (デフォルト: 16)')
+    args = parser.parse_args()
+
+    pages = {}
+    for index in range(args.series):
+        pages.update(make_site(f'{index}-1', args.episodes, jsonld_size=args.jsonld_size,
+                               episode_padding=args.padding))
+    urls = [f'{{base}}video/title/{index}-1' for index in range(args.series)]
+    total_pages = len(pages)
+
+    print(f"フィクスチャ: {args.series} シリーズ × {args.episodes} 話 ({total_pages} ページ)"
+          f" / CPU {os.cpu_count()} コア")
+    with FixtureServer(pages, compress=False) as server:
+        series_urls = [url.format(base=server.base_url) for url in urls]
+        baseline = None
+        for workers in args.workers:
+            elapsed = run_batch(server.base_url, series_urls, workers, args.jobs)
+            baseline = baseline or elapsed
+            print(f"parse_workers={workers:<3}: {elapsed:7.2f} 秒 / {total_pages / elapsed:8.1f} pages/s"
+                  f" / 速度比 {baseline / elapsed:5.2f} x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+保存済みのHTMLアーカイブからの一括抽出のベンチマーク
+
+合成したシリーズ・エピソードページを tar アーカイブに保存し、ページ全体を str にデコードしてから
+走査する従来の方法と、メモリマップしてバイト列のまま走査する方法の MB/s を比較します。
+
+使い方:
+    python -m benchmarks.bench_snapshot --series 20 --episodes 100 --workers 0 2
+"""
+
+import argparse
+import os
+import tarfile
+import tempfile
+import time
+
+from abema_metadata.jsonld import JsonLdDocument
+from abema_metadata.snapshot import extract_snapshots, iter_snapshot_files
+from .fixtures import make_site
+
+
+def build_archive(path: str, series: int, episodes: int, padding: int) -> int:
+    """合成したページを非圧縮の tar アーカイブに保存し、ページの合計バイト数を返します。"""
+    total = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for index in range(series):
+            for page_path, html in make_site(f'{index}-1', episodes, episode_padding=padding).items():
+                file_path = os.path.join(directory, 'abema.tv' + page_path + '.html')
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    f.write(html)
+                total += os.path.getsize(file_path)
+        with tarfile.open(path, 'w') as archive:
+            archive.add(os.path.join(directory, 'abema.tv'), arcname='abema.tv')
+    return total
+
+
+def read_all(path: str) -> float:
+    """ページを読み込むだけ（I/Oの下限）の所要時間を返します。"""
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        for item in iter_snapshot_files([path]):
+            f.seek(item.offset)
+            f.read(item.size)
+    return time.perf_counter() - start
+
+
+def decode_all(path: str) -> float:
+    """従来の方法（メンバーを読み込み、str にデコードしてから走査）の所要時間を返します。"""
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        for item in iter_snapshot_files([path]):
+            f.seek(item.offset)
+            JsonLdDocument.parse(f.read(item.size).decode('utf-8'))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='保存済みのHTMLアーカイブからの一括抽出のベンチマーク')
+    parser.add_argument('--series', type=int, default=20, help='シリーズ数 (デフォルト: 20)')
+    parser.add_argument('--episodes', type=int, default=100, help='シリーズあたりの話数 (デフォルト: 100)')
+    parser.add_argument('--padding', type=int, default=20000,
+                        help='エピソードページの JSON-LD 以降のHTMLの文字数 (デフォルト: 20000)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, os.cpu_count() or 1],
+                        help='比較する走査プロセス数 (デフォルト: 0 とCPUコア数)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        archive = os.path.join(directory, 'snapshots.tar')
+        size = build_archive(archive, args.series, args.episodes, args.padding)
+        pages = args.series * (args.episodes + 1)
+        print(f"アーカイブ: {pages} ページ / {size / 1e6:.1f} MB / CPU {os.cpu_count()} コア")
+
+        elapsed = read_all(archive)
+        print(f"読み込みのみ     : {elapsed:7.2f} 秒 / {size / 1e6 / elapsed:8.1f} MB/s")
+        elapsed = decode_all(archive)
+        print(f"全体をデコード   : {elapsed:7.2f} 秒 / {size / 1e6 / elapsed:8.1f} MB/s（解析のみ）")
+        for workers in args.workers:
+            results, report = extract_snapshots([archive], workers=workers)
+            print(f"mmap workers={workers:<3}: {report.elapsed:7.2f} 秒 / {report.megabytes_per_second:8.1f} MB/s"
+                  f" ({report.series} シリーズ, {report.synopses} 話のあらすじ)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+エピソードページ取得時の受信バイト数とピークメモリのベンチマーク（全体取得と逐次受信の比較）
+
+使い方:
+    python -m benchmarks.bench_stream --episodes 50
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from abema_metadata.extractor import AbemaMetadataExtractor
+from .fixtures import make_episode_page
+from .server import FixtureServer, RedirectingSession
+
+
+SERIES_ID = '189-85'
+
+
+def run(base_url: str, episodes: int, stream: bool):
+    """全話のあらすじを取得し、(経過秒, 受信バイト数, ピークメモリ) を返します。"""
+    extractor = AbemaMetadataExtractor(session=RedirectingSession(base_url), stream_synopsis=stream)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for number in range(1, episodes + 1):
+        synopsis = extractor.fetch_synopsis(f'https://abema.tv/video/episode/{SERIES_ID}_s1_p{number}')
+        assert synopsis, f'第{number}話のあらすじを取得できませんでした'
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    received = extractor.session.stats.bytes_received
+    extractor.close()
+    return elapsed, received, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='エピソードページの逐次受信ベンチマーク')
+    parser.add_argument('--episodes', type=int, default=50, help='取得する話数 (デフォルト: 50)')
+    parser.add_argument('--padding', type=int, default=300000,
+                        help='JSON-LD 以降に続くHTMLの文字数 (デフォルト: 300000)')
+    parser.add_argument('--no-compress', action='store_true', help='gzip 圧縮せずに配信する')
+    args = parser.parse_args()
+
+    pages = {
+        f'/video/episode/{SERIES_ID}_s1_p{n}': make_episode_page(SERIES_ID, n, padding=args.padding)
+        for n in range(1, args.episodes + 1)
+    }
+    with FixtureServer(pages, compress=not args.no_compress) as server:
+        for label, stream in (('全体取得', False), ('逐次受信', True)):
+            elapsed, received, peak = run(server.base_url, args.episodes, stream)
+            print(f"{label}: {elapsed:6.2f} s / 受信 {received / args.episodes / 1024:8.1f} KiB/page"
+                  f" / ピークメモリ {peak / 1024:8.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
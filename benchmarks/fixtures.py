@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク用の AbemaTV 風シリーズページ・エピソードページを生成するフィクスチャ
+"""
+
+import json
+from typing import Dict, Iterable, List, Optional
+
+
+def _script(data) -> str:
+    return ('<script type="application/ld+json">'
+            + json.dumps(data, ensure_ascii=False)
+            + '</script>')
+
+
+def episode_synopsis(series_id: str, number: int, size: int = 200) -> str:
+    """話数ごとに決定的なあらすじ文字列を生成します。"""
+    base = f'{series_id} 第{number}話のあらすじ。"引用"や\\記号、改行\nを含みます。'
+    return (base * (size // len(base) + 1))[:size]
+
+
+def _tv_episodes(series_id: str, numbers: Iterable[int]) -> List[Dict]:
+    return [
+        {
+            '@type': 'TVEpisode',
+            'episodeNumber': number,
+            'name': f'第{number}話 エピソード{number}',
+            'description': episode_synopsis(series_id, number),
+            'url': f'https://abema.tv/video/episode/{series_id}_s1_p{number}',
+        }
+        for number in numbers
+    ]
+
+
+def make_season_document(series_id: str = '189-85', numbers: Iterable[int] = (),
+                         title: str = 'ベンチマークシリーズ') -> str:
+    """シーズン単位の JSON-LD 文書（TVSeason と各話の TVEpisode）を生成します。"""
+    return json.dumps({
+        '@context': 'https://schema.org',
+        '@type': 'TVSeason',
+        'seasonNumber': 1,
+        'partOfSeries': {'@type': 'TVSeries', 'name': title},
+        'episode': _tv_episodes(series_id, numbers),
+    }, ensure_ascii=False)
+
+
+def make_series_page(series_id: str = '189-85', episodes: int = 500,
+                     title: str = 'ベンチマークシリーズ', padding: int = 200,
+                     caption_extra: int = 0, embedded_synopses: Iterable[int] = (),
+                     season_url: Optional[str] = None) -> str:
+    """AbemaTV 風のシリーズページHTMLを生成します。
+
+    Args:
+        series_id: シリーズID（URLの /video/title/ 以降）
+        episodes: エピソード数
+        title: シリーズタイトル
+        padding: 各エピソードの JSON-LD 間に挟む通常HTMLの文字数
+        caption_extra: 各 ImageObject に付加する説明文の文字数（JSON-LD サイズの調整用）
+        embedded_synopses: あらすじを TVSeries の JSON-LD として埋め込む話数
+        season_url: 指定した場合、シーズン単位の JSON-LD 文書を指す link タグを追加する
+
+    Returns:
+        HTML文字列
+    """
+    parts = ['<!DOCTYPE html><html><head><title>', title, '</title>']
+    if season_url:
+        parts.append(f'<link rel="alternate" type="application/ld+json" href="{season_url}">')
+    parts.append(_script({
+        '@context': 'https://schema.org',
+        '@type': 'BreadcrumbList',
+        'itemListElement': [
+            {'@type': 'ListItem', 'position': 1, 'name': 'ホーム', 'item': 'https://abema.tv/'},
+            {'@type': 'ListItem', 'position': 2, 'name': 'アニメ', 'item': 'https://abema.tv/video/genre/animation'},
+            {'@type': 'ListItem', 'position': 3, 'name': title,
+             'item': f'https://abema.tv/video/title/{series_id}'},
+        ],
+    }))
+    embedded = list(embedded_synopses)
+    if embedded:
+        parts.append(_script({
+            '@context': 'https://schema.org',
+            '@type': 'TVSeries',
+            'name': title,
+            'containsSeason': [{'@type': 'TVSeason', 'seasonNumber': 1,
+                                'episode': _tv_episodes(series_id, embedded)}],
+        }))
+    parts.append('</head><body>')
+    filler = ('<div class="c-tile"><span>' + 'あ' * padding + '</span></div>') if padding else ''
+    for number in range(1, episodes + 1):
+        image = {
+            '@context': 'https://schema.org',
+            '@type': 'ImageObject',
+            'caption': f'{title} 第{number}話 エピソード{number}のサムネイル',
+            'url': f'https://image.p-c2-x.abema-tv.com/image/programs/{series_id}_s1_p{number}/thumb001.png',
+        }
+        if caption_extra:
+            image['description'] = 'い' * caption_extra
+        parts.append(filler)
+        parts.append(_script(image))
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def make_episode_page(series_id: str = '189-85', number: int = 1,
+                      title: str = 'ベンチマークシリーズ', synopsis: Optional[str] = None,
+                      padding: int = 20000) -> str:
+    """AbemaTV 風のエピソードページHTMLを生成します。
+
+    Args:
+        series_id: シリーズID
+        number: 話数
+        title: シリーズタイトル
+        synopsis: あらすじ。省略時は episode_synopsis() の結果を使用。
+        padding: JSON-LD の後に続く通常HTMLの文字数
+
+    Returns:
+        HTML文字列
+    """
+    synopsis = episode_synopsis(series_id, number) if synopsis is None else synopsis
+    return ''.join([
+        '<!DOCTYPE html><html><head><title>', title, '</title>',
+        _script({
+            '@context': 'https://schema.org',
+            '@type': 'TVEpisode',
+            'name': f'第{number}話 エピソード{number}',
+            'episodeNumber': number,
+            'description': synopsis,
+            'url': f'https://abema.tv/video/episode/{series_id}_s1_p{number}',
+        }),
+        '</head><body>',
+        '<div>' + 'う' * padding + '</div>',
+        '</body></html>',
+    ])
+
+
+def make_site(series_id: str = '189-85', episodes: int = 500, jsonld_size: int = 0,
+              episode_padding: int = 20000, title: str = 'ベンチマークシリーズ',
+              embedded_synopses: int = 0, season_synopses: int = 0) -> Dict[str, str]:
+    """1シリーズ分のシリーズページと全エピソードページを、配信パスをキーとして生成します。
+
+    Args:
+        series_id: シリーズID
+        episodes: エピソード数
+        jsonld_size: シリーズページの各 ImageObject に付加する説明文の文字数
+        episode_padding: エピソードページの JSON-LD の後に続く通常HTMLの文字数
+        title: シリーズタイトル
+        embedded_synopses: シリーズページに埋め込むあらすじの話数（第1話から）
+        season_synopses: シーズン単位の JSON-LD 文書に含めるあらすじの話数（0 で文書なし）
+
+    Returns:
+        パス（例: '/video/title/189-85'）をキー、HTMLを値とする辞書
+    """
+    season_path = f'/video/title/{series_id}/season.jsonld' if season_synopses else None
+    pages = {
+        f'/video/title/{series_id}': make_series_page(series_id, episodes, title=title,
+                                                      caption_extra=jsonld_size,
+                                                      embedded_synopses=range(1, embedded_synopses + 1),
+                                                      season_url=season_path),
+    }
+    if season_path:
+        pages[season_path] = make_season_document(series_id, range(1, season_synopses + 1), title=title)
+    for number in range(1, episodes + 1):
+        pages[f'/video/episode/{series_id}_s1_p{number}'] = make_episode_page(
+            series_id, number, title=title, padding=episode_padding)
+    return pages
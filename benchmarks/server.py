@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+フィクスチャページを配信するローカルHTTPサーバー（abema.tv の代替）
+"""
+
+import gzip
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from abema_metadata.session import HTTPSession
+
+
+ABEMA_BASE_URL = 'https://abema.tv/'
+
+
+class FixtureServer:
+    """パスごとに用意したHTMLを keep-alive/gzip 対応で配信するサーバー
+
+    応答の遅延とエラー応答を注入でき、実サイトに近い条件で取得処理を計測できます。
+    with 文で使用すると、バックグラウンドスレッドで起動・停止します。
+    """
+
+    def __init__(self, pages: Dict[str, str], compress: bool = True, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 seed: int = 0, capacity: Optional[int] = None, etags: bool = False):
+        """初期化
+
+        Args:
+            pages: パス（例: '/video/title/189-85'）をキー、HTMLを値とする辞書
+            compress: Accept-Encoding に gzip が含まれる場合に圧縮して返すかどうか
+            latency: 各応答を返すまでの遅延秒数
+            jitter: 遅延に加える 0〜jitter 秒の一様乱数
+            error_rate: エラー応答を返す割合（0〜1）
+            error_status: 注入するエラー応答のステータスコード（Retry-After: 0 を付与）
+            seed: 遅延とエラー注入に使う乱数のシード（同じシードで同じ順序になる）
+            capacity: 同時に処理するリクエスト数の上限。超過したリクエストには
+                429 (Retry-After: 0) を返し、混雑時のレート制限を再現します（None で無制限）
+            etags: ページの内容から ETag を付与し、If-None-Match が一致すれば 304 を返すかどうか
+        """
+        self.pages = {path: html.encode('utf-8') for path, html in pages.items()}
+        self.compress = compress
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.capacity = capacity
+        self.etags = etags
+        self.not_modified = 0
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._gzip_cache: Dict[str, bytes] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def start(self) -> 'FixtureServer':
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        # クライアントが途中で切断した場合のエラー出力を抑制する
+        self._server.handle_error = lambda *args: None
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'FixtureServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def set_page(self, path: str, html: str) -> None:
+        """配信するページを追加・差し替えます（起動中でも可）。"""
+        with self._lock:
+            self.pages[path] = html.encode('utf-8')
+            self._gzip_cache.pop(path, None)
+
+    def etag_for(self, path: str) -> Optional[str]:
+        """ページの ETag を返します（存在しない場合は None）。"""
+        body = self.pages.get(path)
+        return None if body is None else '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+    def _body_for(self, path: str, accept_encoding: str):
+        body = self.pages.get(path)
+        if body is None:
+            return None, None
+        if self.compress and 'gzip' in accept_encoding:
+            with self._lock:
+                if path not in self._gzip_cache:
+                    self._gzip_cache[path] = gzip.compress(body, compresslevel=6)
+                return self._gzip_cache[path], 'gzip'
+        return body, None
+
+    def _inject(self):
+        """(遅延秒数, 返すエラーのステータスコード) を決めます（エラーを返さない場合は None）。"""
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if self.capacity is not None and self.in_flight > self.capacity:
+                self.throttled += 1
+                return 0.0, 429
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return delay, self.error_status if fail else None
+
+    def _done(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _make_handler(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # ヘッダーとボディを別々に書き込むため、Nagle アルゴリズムによる遅延を避ける
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                try:
+                    self._respond()
+                finally:
+                    fixture._done()
+
+            def _respond(self):
+                delay, error_status = fixture._inject()
+                if delay > 0:
+                    time.sleep(delay)
+                if error_status is not None:
+                    self.send_response(error_status)
+                    self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                etag = fixture.etag_for(self.path) if fixture.etags else None
+                if etag is not None and self.headers.get('If-None-Match') == etag:
+                    with fixture._lock:
+                        fixture.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                body, encoding = fixture._body_for(self.path, self.headers.get('Accept-Encoding', ''))
+                if body is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                if etag is not None:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                if encoding:
+                    self.send_header('Content-Encoding', encoding)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self._write(body)
+
+            def _write(self, body: bytes) -> None:
+                # 小さな単位で書き込み、クライアントが打ち切った時点で送信を止める
+                view = memoryview(body)
+                for offset in range(0, len(body), 65536):
+                    try:
+                        self.wfile.write(view[offset:offset + 65536])
+                    except OSError:
+                        return
+                    with fixture._lock:
+                        fixture.bytes_sent += len(view[offset:offset + 65536])
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class RedirectingSession(HTTPSession):
+    """https://abema.tv/ 宛てのリクエストをローカルサーバーへ振り向けるセッション"""
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.local_base_url = base_url
+
+    def request(self, url, headers=None, method='GET'):
+        if url.startswith(ABEMA_BASE_URL):
+            url = self.local_base_url + url[len(ABEMA_BASE_URL):]
+        return super().request(url, headers, method)
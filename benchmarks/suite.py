@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+合成フィクスチャとローカルサーバーを使ったオフラインのベンチマークスイート
+
+解析のスループット（MB/s・pages/s）、エンドツーエンドの所要時間、ピークメモリを計測し、
+結果をJSONで保存します。保存済みの結果を --compare に指定すると、指標ごとの差分と
+しきい値を超えた性能低下を表示します（性能低下がある場合は終了コード 1）。
+
+使い方:
+    python -m benchmarks.suite -o results.json
+    python -m benchmarks.suite --quick --compare results.json
+    python -m benchmarks.suite --episodes 10 100 2000 --jsonld-size 0 2000 --latency 0.005 --error-rate 0.02
+"""
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.jsonld import JsonLdDocument
+from abema_metadata.retry import RetryPolicy
+from .fixtures import make_episode_page, make_series_page, make_site
+from .server import FixtureServer, RedirectingSession
+
+
+# 結果ファイルの形式のバージョン
+RESULTS_VERSION = 1
+
+# 値が大きいほど良い指標（それ以外は小さいほど良い）
+HIGHER_IS_BETTER = frozenset(['mb_per_s', 'pages_per_s'])
+
+# 比較対象とする指標
+COMPARED_METRICS = ('mb_per_s', 'pages_per_s', 'wall_seconds', 'peak_memory_kib')
+
+SERIES_ID = '189-85'
+SERIES_URL = f'https://abema.tv/video/title/{SERIES_ID}'
+
+
+def _best_time(func: Callable[[], Any], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_memory(func: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_parse_series(episodes: int, jsonld_size: int, repeat: int) -> Dict[str, Any]:
+    """シリーズページの解析（タイトルと全エピソードの抽出）を計測します。"""
+    content = make_series_page(SERIES_ID, episodes, caption_extra=jsonld_size)
+    extractor = AbemaMetadataExtractor()
+
+    def parse():
+        document = JsonLdDocument.parse(content)
+        extractor.extract_series_title(document)
+        return extractor.extract_episodes(document, SERIES_URL)
+
+    assert len(parse()) == episodes
+    seconds = _best_time(parse, repeat)
+    size = len(content.encode('utf-8'))
+    return {
+        'name': f'parse_series/episodes={episodes}/jsonld={jsonld_size}',
+        'params': {'episodes': episodes, 'jsonld_size': jsonld_size, 'bytes': size},
+        'metrics': {
+            'mb_per_s': size / 1e6 / seconds,
+            'pages_per_s': 1 / seconds,
+            'wall_seconds': seconds,
+            'peak_memory_kib': _peak_memory(parse) / 1024,
+        },
+    }
+
+
+def bench_parse_episodes(pages: int, padding: int, repeat: int) -> Dict[str, Any]:
+    """エピソードページからのあらすじ抽出を計測します。"""
+    contents = [make_episode_page(SERIES_ID, number, padding=padding) for number in range(1, pages + 1)]
+    extractor = AbemaMetadataExtractor()
+
+    def parse():
+        for content in contents:
+            extractor.extract_synopsis(content)
+
+    seconds = _best_time(parse, repeat)
+    size = sum(len(content.encode('utf-8')) for content in contents)
+    return {
+        'name': f'parse_episode/padding={padding}',
+        'params': {'pages': pages, 'padding': padding, 'bytes': size},
+        'metrics': {
+            'mb_per_s': size / 1e6 / seconds,
+            'pages_per_s': pages / seconds,
+            'wall_seconds': seconds,
+            'peak_memory_kib': _peak_memory(parse) / 1024,
+        },
+    }
+
+
+def bench_end_to_end(episodes: int, jsonld_size: int, padding: int, jobs: int, latency: float,
+                     error_rate: float, seed: int = 0, memory: bool = True) -> Dict[str, Any]:
+    """ローカルサーバーに対して extract_all_metadata を実行し、全体の所要時間を計測します。"""
+    pages = make_site(SERIES_ID, episodes, jsonld_size=jsonld_size, episode_padding=padding)
+
+    def extract(base_url: str):
+        extractor = AbemaMetadataExtractor(session=RedirectingSession(base_url, pool_size=jobs),
+                                           max_workers=jobs,
+                                           retry_policy=RetryPolicy(base_delay=0.01, max_delay=0.1))
+        # エラー注入時のリトライのログを計測結果の出力に混ぜない
+        logger = logging.getLogger('abema_metadata')
+        level = logger.level
+        logger.setLevel(logging.ERROR)
+        try:
+            return extractor.extract_all_metadata(SERIES_URL), extractor.metrics
+        finally:
+            logger.setLevel(level)
+            extractor.close()
+
+    with FixtureServer(pages, latency=latency, error_rate=error_rate, seed=seed) as server:
+        start = time.perf_counter()
+        metadata, metrics = extract(server.base_url)
+        wall = time.perf_counter() - start
+        requests, errors, sent = server.requests, server.errors, server.bytes_sent
+        peak = _peak_memory(lambda: extract(server.base_url)) if memory else 0
+
+    missing = sum(1 for episode in metadata.episodes if episode.synopsis is None)
+    return {
+        'name': f'end_to_end/episodes={episodes}/jsonld={jsonld_size}/latency={latency:g}/errors={error_rate:g}',
+        'params': {'episodes': episodes, 'jsonld_size': jsonld_size, 'padding': padding, 'jobs': jobs,
+                   'latency': latency, 'error_rate': error_rate},
+        'metrics': {
+            'wall_seconds': wall,
+            'pages_per_s': requests / wall,
+            'mb_per_s': sent / 1e6 / wall,
+            'peak_memory_kib': peak / 1024,
+            'requests': requests,
+            'errors_injected': errors,
+            'synopses_missing': missing,
+            'retries': metrics.counter('retries'),
+        },
+        # 処理段階ごとの合計所要時間（秒）。比較対象ではなく内訳の確認用
+        'stages': {name: stats['sum'] for name, stats in metrics.snapshot()['timings'].items()},
+    }
+
+
+def run_suite(episodes: List[int], jsonld_sizes: List[int], padding: int = 20000, jobs: int = 8,
+              latency: float = 0.0, error_rate: float = 0.0, repeat: int = 5,
+              memory: bool = True, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """すべてのシナリオを実行し、結果ファイルに保存する形式の辞書を返します。
+
+    Args:
+        episodes: シリーズのエピソード数のリスト
+        jsonld_sizes: ImageObject に付加する説明文の文字数のリスト
+        padding: エピソードページの JSON-LD 以降に続くHTMLの文字数
+        jobs: エンドツーエンド計測時の同時接続数
+        latency: ローカルサーバーの応答遅延秒数
+        error_rate: ローカルサーバーがエラー応答を返す割合
+        repeat: 解析の計測回数（最短時間を採用）
+        memory: エンドツーエンド計測でピークメモリも計測するかどうか
+        progress: 各シナリオの結果を受け取るコールバック
+
+    Returns:
+        環境情報・設定・結果一覧を含む辞書
+    """
+    config = {
+        'episodes': episodes, 'jsonld_sizes': jsonld_sizes, 'padding': padding, 'jobs': jobs,
+        'latency': latency, 'error_rate': error_rate, 'repeat': repeat,
+    }
+    results = []
+
+    def record(result):
+        results.append(result)
+        if progress:
+            progress(result)
+
+    for count in episodes:
+        for size in jsonld_sizes:
+            record(bench_parse_series(count, size, repeat))
+    record(bench_parse_episodes(min(50, max(episodes)), padding, repeat))
+    for count in episodes:
+        record(bench_end_to_end(count, jsonld_sizes[0], padding, jobs, latency, error_rate, memory=memory))
+
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+        },
+        'config': config,
+        'results': results,
+    }
+
+
+def save_results(data: Dict[str, Any], path: str) -> None:
+    """計測結果をJSONファイルに保存します。"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """保存済みの計測結果を読み込みます。
+
+    Raises:
+        ValueError: 対応していない形式の場合
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get('version') != RESULTS_VERSION:
+        raise ValueError(f"対応していない結果ファイルです: {path}")
+    return data
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """2つの計測結果を比較し、同名シナリオの指標ごとの変化を返します。
+
+    Args:
+        baseline: 比較元の計測結果
+        current: 今回の計測結果
+        threshold: 性能低下とみなす変化率（0.10 で10%）
+
+    Returns:
+        {'name', 'metric', 'baseline', 'current', 'change', 'regression'} の辞書のリスト。
+        change は改善方向を正とした変化率です。
+    """
+    previous = {result['name']: result['metrics'] for result in baseline.get('results', [])}
+    rows = []
+    for result in current.get('results', []):
+        before = previous.get(result['name'])
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), result['metrics'].get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if metric not in HIGHER_IS_BETTER:
+                change = -change
+            rows.append({
+                'name': result['name'],
+                'metric': metric,
+                'baseline': old,
+                'current': new,
+                'change': change,
+                'regression': change < -threshold,
+            })
+    return rows
+
+
+def _format_result(result: Dict[str, Any]) -> str:
+    metrics = result['metrics']
+    text = (f"{result['name']:<64} {metrics['mb_per_s']:9.2f} MB/s {metrics['pages_per_s']:10.1f} pages/s"
+            f" {metrics['wall_seconds'] * 1000:10.2f} ms")
+    if metrics.get('peak_memory_kib'):
+        text += f" {metrics['peak_memory_kib']:10.1f} KiB"
+    if 'synopses_missing' in metrics:
+        text += f"  (注入エラー {metrics['errors_injected']} / あらすじ欠落 {metrics['synopses_missing']})"
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='オフラインのベンチマークスイート')
+    parser.add_argument('--episodes', type=int, nargs='+', default=[10, 100, 500, 2000],
+                        help='シリーズのエピソード数 (デフォルト: 10 100 500 2000)')
+    parser.add_argument('--jsonld-size', type=int, nargs='+', default=[0, 2000],
+                        help='各 ImageObject に付加する説明文の文字数 (デフォルト: 0 2000)')
+    parser.add_argument('--padding', type=int, default=20000,
+                        help='エピソードページの JSON-LD 以降に続くHTMLの文字数 (デフォルト: 20000)')
+    parser.add_argument('-j', '--jobs', type=int, default=8, help='エンドツーエンド計測の同時接続数 (デフォルト: 8)')
+    parser.add_argument('--latency', type=float, default=0.0, help='サーバーの応答遅延秒数 (デフォルト: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='サーバーがエラー応答を返す割合 0〜1 (デフォルト: 0)')
+    parser.add_argument('--repeat', type=int, default=5, help='解析の計測回数 (デフォルト: 5)')
+    parser.add_argument('--no-memory', action='store_true', help='エンドツーエンド計測でのピークメモリ計測を省略')
+    parser.add_argument('--quick', action='store_true', help='小さな構成で短時間に実行（10話と100話のみ）')
+    parser.add_argument('-o', '--output', help='計測結果を保存するJSONファイル')
+    parser.add_argument('--compare', metavar='BASELINE', help='比較元の計測結果JSONファイル')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='性能低下とみなす変化率 (デフォルト: 0.10)')
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.episodes = [10, 100]
+        args.repeat = min(args.repeat, 3)
+
+    def progress(result):
+        print(_format_result(result), flush=True)
+
+    data = run_suite(args.episodes, args.jsonld_size, padding=args.padding, jobs=args.jobs,
+                     latency=args.latency, error_rate=args.error_rate, repeat=args.repeat,
+                     memory=not args.no_memory, progress=progress)
+    if args.output:
+        save_results(data, args.output)
+        print(f"\n計測結果を保存しました: {args.output}")
+
+    if args.compare:
+        rows = compare_results(load_results(args.compare), data, args.threshold)
+        regressions = [row for row in rows if row['regression']]
+        print(f"\n{args.compare} との比較（改善方向を + で表示）:")
+        for row in rows:
+            mark = '  ← 性能低下' if row['regression'] else ''
+            print(f"  {row['name']:<64} {row['metric']:<16} {row['change'] * 100:+7.1f}%{mark}")
+        if regressions:
+            print(f"\n{len(regressions)} 件の指標が {args.threshold * 100:.0f}% を超えて低下しました")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
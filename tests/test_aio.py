@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+非同期版エクストラクターのテスト（ローカルの asyncio HTTP サーバーを使用）
+"""
+
+import asyncio
+import gzip
+import json
+import time
+
+import pytest
+from abema_metadata.aio import AsyncAbemaMetadataExtractor, AsyncHTTPSession
+from abema_metadata.extractor import InvalidURLError, NetworkError
+
+
+SERIES_ID = 'test-series'
+EPISODES = 200
+
+
+def _script(data):
+    return '<script type="application/ld+json">' + json.dumps(data, ensure_ascii=False) + '</script>'
+
+
+def _series_page():
+    parts = [_script({
+        '@type': 'BreadcrumbList',
+        'itemListElement': [
+            {'@type': 'ListItem', 'name': 'ホーム'},
+            {'@type': 'ListItem', 'name': '非同期テストシリーズ'},
+        ],
+    })]
+    for n in range(1, EPISODES + 1):
+        parts.append(_script({'@type': 'ImageObject', 'caption': f'非同期テストシリーズ 第{n}話 タイトル{n}'}))
+    return ''.join(parts)
+
+
+def _episode_page(number):
+    return _script({'@type': 'TVEpisode', 'description': f'あらすじ{number}'}) + '<p>' + 'x' * 50000 + '</p>'
+
+
+class StandInServer:
+    """keep-alive・gzip・チャンク転送に対応した最小限の asyncio HTTP サーバー"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._server = None
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.base_url = f'http://127.0.0.1:{port}/'
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _route(self, path):
+        if path == f'/video/title/{SERIES_ID}':
+            return 200, _series_page()
+        if path.startswith(f'/video/episode/{SERIES_ID}_s1_p'):
+            number = int(path.rsplit('p', 1)[1])
+            if number == 3:
+                return 500, 'error'
+            return 200, _episode_page(number)
+        return 404, 'not found'
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                self.requests += 1
+                self._in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self._in_flight)
+                try:
+                    await asyncio.sleep(self.latency)
+                finally:
+                    self._in_flight -= 1
+
+                status, text = self._route(request_line.split()[1].decode())
+                body = text.encode('utf-8')
+                head = [f'HTTP/1.1 {status} OK']
+                if 'gzip' in headers.get('accept-encoding', '') and status == 200:
+                    body = gzip.compress(body)
+                    head.append('Content-Encoding: gzip')
+                if status == 200 and request_line.split()[1].startswith(b'/video/title/'):
+                    # シリーズページはチャンク転送で返す
+                    head.append('Transfer-Encoding: chunked')
+                    payload = b''.join(
+                        b'%x\r\n%s\r\n' % (len(body[i:i + 4096]), body[i:i + 4096])
+                        for i in range(0, len(body), 4096)
+                    ) + b'0\r\n\r\n'
+                else:
+                    head.append(f'Content-Length: {len(body)}')
+                    payload = body
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def test_async_extract_all_metadata():
+    """1つのイベントループで多数のあらすじを並行取得するテスト"""
+    async def scenario():
+        async with StandInServer(latency=0.05) as server:
+            extractor = AsyncAbemaMetadataExtractor(max_concurrency=50, base_url=server.base_url)
+            start = time.perf_counter()
+            try:
+                metadata = await extractor.extract_all_metadata(f'{server.base_url}video/title/{SERIES_ID}')
+            finally:
+                extractor.close()
+            return server, extractor, metadata, time.perf_counter() - start
+
+    server, extractor, metadata, elapsed = asyncio.run(scenario())
+
+    assert metadata.title == '非同期テストシリーズ'
+    assert [ep.number for ep in metadata.episodes] == list(range(1, EPISODES + 1))
+    assert metadata.episodes[0].synopsis == 'あらすじ1'
+    assert metadata.episodes[0].url == f'{server.base_url}video/episode/{SERIES_ID}_s1_p1'
+    # サーバーエラーの話は None にフォールバックする
+    assert metadata.episodes[2].synopsis is None
+    assert metadata.episodes[-1].synopsis == f'あらすじ{EPISODES}'
+
+    # 同時実行数はセマフォの上限を超えない
+    assert 1 < server.max_in_flight <= 50
+    # 逐次取得（201 × 0.05 秒）よりも十分に速い
+    assert elapsed < EPISODES * 0.05 / 4
+    assert extractor.session.stats.connections_opened <= 51
+
+
+def test_async_session_reuses_connections():
+    """非同期セッションで接続が再利用されることのテスト"""
+    async def scenario():
+        async with StandInServer() as server:
+            async with AsyncHTTPSession() as session:
+                for _ in range(3):
+                    status, body = await session.get(f'{server.base_url}video/episode/{SERIES_ID}_s1_p1')
+                    assert status == 200
+                    assert 'あらすじ1' in body.decode('utf-8')
+                return session.stats
+
+    stats = asyncio.run(scenario())
+    assert stats.connections_opened == 1
+    assert stats.connections_reused == 2
+
+
+def test_async_errors():
+    """非同期版でも同期版と同じ例外階層を使用することのテスト"""
+    async def scenario():
+        async with StandInServer() as server:
+            extractor = AsyncAbemaMetadataExtractor(base_url=server.base_url)
+            try:
+                with pytest.raises(InvalidURLError):
+                    await extractor.fetch_page('https://google.com')
+                with pytest.raises(InvalidURLError):
+                    await extractor.fetch_page(f'{server.base_url}video/title/missing')
+                with pytest.raises(NetworkError):
+                    await extractor.fetch_page(f'{server.base_url}video/episode/{SERIES_ID}_s1_p3', retries=1)
+            finally:
+                extractor.close()
+
+    asyncio.run(scenario())
+
+
+def test_async_deadline_counts_only_skipped_synopses():
+    """期限前に失敗した話はスキップに数えず、期限切れで取得しなかった話のみを数えることのテスト"""
+    def on_episode(episode):
+        # 1話目の書き出しに時間がかかり、取得済みの3話目（サーバーエラー）を待つのは期限後になる
+        if episode.number == 1:
+            time.sleep(0.6)
+
+    async def scenario():
+        async with StandInServer(latency=0.05) as server:
+            extractor = AsyncAbemaMetadataExtractor(max_concurrency=4, base_url=server.base_url,
+                                                    series_deadline=0.5)
+            try:
+                metadata = await extractor.extract_all_metadata(f'{server.base_url}video/title/{SERIES_ID}',
+                                                                on_episode=on_episode)
+            finally:
+                extractor.close()
+            return extractor, metadata
+
+    extractor, metadata = asyncio.run(scenario())
+
+    missing = [ep.number for ep in metadata.episodes if ep.synopsis is None]
+    assert 3 in missing
+    skipped = extractor.metrics.counter('synopsis_skipped')
+    assert skipped > 0
+    assert skipped == len(missing) - 1
+    assert extractor.metrics.counter('synopsis_failures') == 1
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+一括処理と共有スケジューラーのテスト
+"""
+
+import io
+import json
+import os
+import threading
+import time
+
+import yaml
+from abema_metadata.batch import BatchRunner, read_series_urls
+from abema_metadata.extractor import AbemaMetadataExtractor, InvalidURLError
+from abema_metadata.scheduler import FairScheduler, TokenBucket
+
+
+def _series_page(name, episodes):
+    blocks = [{'@type': 'BreadcrumbList', 'itemListElement': [{'name': 'ホーム'}, {'name': name}]}]
+    blocks += [{'@type': 'ImageObject', 'caption': f'{name} 第{n}話 タイトル{n}'} for n in range(1, episodes + 1)]
+    return ''.join('<script type="application/ld+json">' + json.dumps(b, ensure_ascii=False) + '</script>'
+                   for b in blocks)
+
+
+class _FakeExtractor(AbemaMetadataExtractor):
+    """通信を行わず、取得したURLを記録するエクストラクター"""
+
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+        self.fetched = []
+        self._lock = threading.Lock()
+
+    def fetch_page(self, url, retries=3, deadline=None):
+        with self._lock:
+            self.fetched.append(url)
+        if url not in self.pages:
+            raise InvalidURLError(f"指定されたページが見つかりません (404 Not Found): {url}")
+        return self.pages[url]
+
+    def fetch_synopsis(self, episode_url, deadline=None):
+        with self._lock:
+            self.fetched.append(episode_url)
+        return f"{episode_url} のあらすじ"
+
+
+def test_read_series_urls():
+    """URL一覧の読み込みテスト（空行・コメント・重複の除去）"""
+    stream = io.StringIO('# コメント\nhttps://abema.tv/video/title/a\n\nhttps://abema.tv/video/title/b\nhttps://abema.tv/video/title/a\n')
+    assert read_series_urls(stream) == ['https://abema.tv/video/title/a', 'https://abema.tv/video/title/b']
+
+
+def test_token_bucket_rate():
+    """トークンバケットがバースト後にレートを制限することのテスト"""
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.05 < bucket.reserve() <= 0.1
+
+
+def test_scheduler_round_robin():
+    """グループ間でラウンドロビンにジョブが実行されることのテスト"""
+    order = []
+    gate = threading.Event()
+    with FairScheduler(max_concurrency=1, rate_per_host=0) as scheduler:
+        # 最初のジョブでワーカーを止めている間に全ジョブを登録する
+        scheduler.submit('block', None, gate.wait)
+        futures = [scheduler.submit(group, None, order.append, f'{group}{n}')
+                   for group in ('a', 'b', 'c') for n in range(3)]
+        gate.set()
+        for future in futures:
+            future.result()
+    assert order == ['a0', 'b0', 'c0', 'a1', 'b1', 'c1', 'a2', 'b2', 'c2']
+
+
+def test_scheduler_global_concurrency():
+    """全体の同時実行数が上限を超えないことのテスト"""
+    lock = threading.Lock()
+    state = {'running': 0, 'max': 0}
+
+    def job():
+        with lock:
+            state['running'] += 1
+            state['max'] = max(state['max'], state['running'])
+        time.sleep(0.01)
+        with lock:
+            state['running'] -= 1
+
+    with FairScheduler(max_concurrency=3, rate_per_host=0) as scheduler:
+        futures = [scheduler.submit(n % 5, 'abema.tv', job) for n in range(30)]
+        for future in futures:
+            future.result()
+    assert state['max'] == 3
+
+
+def test_batch_runner_writes_outputs(tmp_path):
+    """シリーズごとの出力とサマリーの書き出しテスト"""
+    urls = [
+        'https://abema.tv/video/title/series-a',
+        'https://abema.tv/video/title/series-b',
+        'https://abema.tv/video/title/missing',
+    ]
+    extractor = _FakeExtractor({
+        urls[0]: _series_page('シリーズA', 3),
+        urls[1]: _series_page('シリーズB', 2),
+    })
+    with FairScheduler(max_concurrency=4, rate_per_host=0) as scheduler:
+        summary = BatchRunner(extractor, scheduler, str(tmp_path)).run(urls)
+
+    assert summary.succeeded == 2
+    assert summary.failed == 1
+    # シリーズページ3件 + エピソードページ5件
+    assert summary.pages == 8
+    assert summary.results[2].error is not None
+
+    with open(tmp_path / 'series-a.yaml', encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    assert data['series_title'] == 'シリーズA'
+    assert [ep['episode_number'] for ep in data['episodes']] == [1, 2, 3]
+    assert data['episodes'][0]['synopsis'] == 'https://abema.tv/video/episode/series-a_s1_p1 のあらすじ'
+
+    with open(tmp_path / 'summary.yaml', encoding='utf-8') as f:
+        summary_data = yaml.safe_load(f)
+    assert summary_data['total_series'] == 3
+    assert summary_data['total_pages'] == 8
+    assert 'pages_per_second' in summary_data
+
+
+def test_batch_runner_jsonl(tmp_path):
+    """JSON Lines 形式での出力と、書き出し完了後に .part が残らないことのテスト"""
+    url = 'https://abema.tv/video/title/series-a'
+    extractor = _FakeExtractor({url: _series_page('シリーズA', 4)})
+    with FairScheduler(max_concurrency=4, rate_per_host=0) as scheduler:
+        summary = BatchRunner(extractor, scheduler, str(tmp_path), fmt='jsonl').run([url])
+
+    assert summary.results[0].output == str(tmp_path / 'series-a.jsonl')
+    with open(tmp_path / 'series-a.jsonl', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert records[0]['type'] == 'series'
+    assert [record['episode_number'] for record in records[1:]] == [1, 2, 3, 4]
+    assert sorted(os.listdir(tmp_path)) == ['series-a.jsonl', 'summary.json']
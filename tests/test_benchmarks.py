@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+ベンチマークスイートのスモークテスト（小さな構成で実行できることのみ確認）
+"""
+
+import copy
+
+from abema_metadata.session import HTTPSession
+from benchmarks.fixtures import make_site
+from benchmarks.server import FixtureServer
+from benchmarks.suite import compare_results, load_results, run_suite, save_results
+
+
+def test_fixture_server_injects_errors_deterministically():
+    """同じシードであれば同じ順序でエラー応答が注入されることのテスト"""
+    pages = make_site('s', episodes=3, episode_padding=10)
+    statuses = []
+    for _ in range(2):
+        with FixtureServer(pages, error_rate=0.5, seed=1) as server, HTTPSession() as session:
+            statuses.append([session.get(server.base_url + 'video/title/s')[0] for _ in range(10)])
+            assert server.errors == statuses[-1].count(503)
+    assert statuses[0] == statuses[1]
+    assert set(statuses[0]) == {200, 503}
+
+
+def test_run_suite_and_compare(tmp_path):
+    """スイートの実行・保存・読み込み・比較の一連の流れのテスト"""
+    data = run_suite([10], [0], padding=100, jobs=2, repeat=1, memory=False)
+    names = [result['name'] for result in data['results']]
+    assert names == ['parse_series/episodes=10/jsonld=0', 'parse_episode/padding=100',
+                     'end_to_end/episodes=10/jsonld=0/latency=0/errors=0']
+    end_to_end = data['results'][-1]['metrics']
+    assert end_to_end['requests'] == 11
+    assert end_to_end['synopses_missing'] == 0
+
+    path = str(tmp_path / 'results.json')
+    save_results(data, path)
+    baseline = load_results(path)
+    assert not any(row['regression'] for row in compare_results(baseline, data))
+
+    # 比較元の方が2倍速かった場合は性能低下として検出される
+    faster = copy.deepcopy(baseline)
+    faster['results'][0]['metrics']['mb_per_s'] *= 2
+    rows = compare_results(faster, data)
+    flagged = [(row['name'], row['metric']) for row in rows if row['regression']]
+    assert flagged == [('parse_series/episodes=10/jsonld=0', 'mb_per_s')]
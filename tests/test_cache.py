@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+ディスクキャッシュと条件付き再検証のテスト
+"""
+
+import os
+import time
+
+import pytest
+from abema_metadata.cache import ResponseCache, classify_url
+from abema_metadata.cli import parse_cache_ttls
+from abema_metadata.extractor import AbemaMetadataExtractor, NetworkError
+
+
+SERIES_URL = 'https://abema.tv/video/title/test-series'
+EPISODE_URL = 'https://abema.tv/video/episode/test-series_s1_p1'
+
+
+class _FakeResponse:
+    def __init__(self, status, body=b'', headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self._body = body
+
+    def read(self):
+        return self._body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class _FakeSession:
+    """送信されたヘッダーを記録し、用意したレスポンスを順に返すセッション"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def request(self, url, headers=None, method='GET'):
+        self.sent_headers.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+    def close(self):
+        pass
+
+
+def test_classify_url():
+    """URL種別の分類テスト"""
+    assert classify_url(SERIES_URL) == 'series'
+    assert classify_url(EPISODE_URL) == 'episode'
+    assert classify_url('https://abema.tv/') == 'default'
+
+
+def test_cache_store_and_get(tmp_path):
+    """保存と読み出し、TTL判定のテスト"""
+    cache = ResponseCache(str(tmp_path), ttls={'series': 10, 'episode': 1000})
+    cache.store(SERIES_URL, 'シリーズ'.encode('utf-8'), {'ETag': '"abc"'})
+
+    entry = cache.get(SERIES_URL)
+    assert entry.body.decode('utf-8') == 'シリーズ'
+    assert entry.conditional_headers() == {'If-None-Match': '"abc"'}
+    assert cache.is_fresh(entry)
+    assert not cache.is_fresh(entry, now=entry.stored_at + 11)
+
+    episode = cache.store(EPISODE_URL, b'episode')
+    assert cache.is_fresh(episode, now=episode.stored_at + 11)
+    assert cache.get('https://abema.tv/video/title/unknown') is None
+
+
+def test_cache_lru_eviction(tmp_path):
+    """サイズ上限を超えた際に最終アクセスの古いものから削除されることのテスト"""
+    cache = ResponseCache(str(tmp_path), max_bytes=350)
+    urls = [f'{SERIES_URL}-{n}' for n in range(3)]
+    for n, url in enumerate(urls):
+        cache.store(url, b'x' * 100)
+        body_path, _ = cache._paths(url)
+        os.utime(body_path, (time.time() - 100 + n, time.time() - 100 + n))
+
+    # 最も古い urls[0] にアクセスして最新にする
+    assert cache.get(urls[0]) is not None
+    cache.store(f'{SERIES_URL}-new', b'x' * 100)
+
+    assert cache.get(urls[0]) is not None
+    assert cache.get(urls[1]) is None
+    assert cache.get(urls[2]) is not None
+    assert cache.stats.evictions == 1
+
+
+def test_cache_eviction_leaves_headroom(tmp_path, monkeypatch):
+    """上限を超えた際に上限の9割まで削除し、保存のたびにディレクトリを走査しないことのテスト"""
+    cache = ResponseCache(str(tmp_path), max_bytes=1000)
+    scans = []
+    scan = cache._scan
+    monkeypatch.setattr(cache, '_scan', lambda: scans.append(1) or scan())
+    for n in range(20):
+        cache.store(f'{SERIES_URL}-{n}', b'x' * 100)
+        assert cache._total_bytes <= 1000
+    assert cache._total_bytes == sum(size for _, size, _ in scan())
+    # 上限を超えた11件目以降、2件の保存ごとに1回だけ走査する
+    assert len(scans) == 5
+    assert cache.stats.evictions == 10
+
+
+def test_fetch_page_revalidates_with_conditional_headers(tmp_path):
+    """期限切れエントリを条件付きリクエストで再検証するテスト"""
+    cache = ResponseCache(str(tmp_path), ttls={'series': 0})
+    session = _FakeSession([
+        _FakeResponse(200, 'ページ'.encode('utf-8'), {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}),
+        _FakeResponse(304, b'', {'ETag': '"v1"'}),
+    ])
+    extractor = AbemaMetadataExtractor(session=session, cache=cache)
+
+    assert extractor.fetch_page(SERIES_URL) == 'ページ'
+    assert extractor.fetch_page(SERIES_URL) == 'ページ'
+
+    assert 'If-None-Match' not in session.sent_headers[0]
+    assert session.sent_headers[1]['If-None-Match'] == '"v1"'
+    assert session.sent_headers[1]['If-Modified-Since'] == 'Mon, 01 Jan 2024 00:00:00 GMT'
+    assert cache.stats.revalidated == 1
+
+
+def test_fetch_page_fresh_hit_and_offline(tmp_path):
+    """TTL内のヒットとオフラインモードのテスト"""
+    cache = ResponseCache(str(tmp_path))
+    cache.store(EPISODE_URL, 'キャッシュ済み'.encode('utf-8'))
+
+    session = _FakeSession([])
+    extractor = AbemaMetadataExtractor(session=session, cache=cache)
+    assert extractor.fetch_page(EPISODE_URL) == 'キャッシュ済み'
+    assert session.sent_headers == []
+    assert cache.stats.hits == 1
+
+    offline = AbemaMetadataExtractor(session=session, cache=cache, offline=True)
+    with pytest.raises(NetworkError):
+        offline.fetch_page(SERIES_URL)
+
+    with pytest.raises(ValueError):
+        AbemaMetadataExtractor(offline=True)
+
+
+def test_parse_cache_ttls():
+    """--cache-ttl 指定値の解析テスト"""
+    assert parse_cache_ttls(None) == {}
+    assert parse_cache_ttls(['60']) == {'series': 60, 'episode': 60, 'default': 60}
+    assert parse_cache_ttls(['60', 'episode=3600']) == {'series': 60, 'episode': 3600, 'default': 60}
+    with pytest.raises(ValueError):
+        parse_cache_ttls(['unknown=60'])
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite カタログのテスト
+"""
+
+import json
+
+import pytest
+from abema_metadata.catalog import Catalog, guess_format
+from abema_metadata.cli import main
+from abema_metadata.models import EpisodeMetadata, SeriesMetadata
+from abema_metadata.output import write_metadata
+
+
+def _series(series_id, title, episodes):
+    return SeriesMetadata(
+        title=title,
+        source_url=f'https://abema.tv/video/title/{series_id}',
+        extraction_date='2024-01-01',
+        episodes=[EpisodeMetadata(number=n, title=t, synopsis=s,
+                                  url=f'https://abema.tv/video/episode/{series_id}_s1_p{n}')
+                  for n, t, s in episodes]
+    )
+
+
+@pytest.fixture
+def catalog():
+    with Catalog(':memory:') as catalog:
+        catalog.add_many([
+            _series('189-85', '魔法少女の物語', [
+                (1, '始まりの朝', '少女は不思議な杖を拾う。'),
+                (2, '秘密の約束', '友達に魔法のことを打ち明ける。'),
+                (3, '夜空の下で', None),
+            ]),
+            _series('26-1', '宇宙探偵', [
+                (1, '消えた宇宙船', '探偵は宇宙港で不思議な依頼を受ける。'),
+            ]),
+        ])
+        yield catalog
+
+
+def test_search_full_text(catalog):
+    """タイトル・あらすじの部分一致検索と、複数語の AND 検索のテスト"""
+    assert catalog.full_text
+    assert [(hit.series_id, hit.number) for hit in catalog.search('不思議な')] in (
+        [('189-85', 1), ('26-1', 1)], [('26-1', 1), ('189-85', 1)])
+    hits = catalog.search('秘密の約束')
+    assert [(hit.series_id, hit.number, hit.series_title) for hit in hits] == [('189-85', 2, '魔法少女の物語')]
+    assert [hit.number for hit in catalog.search('不思議な 宇宙港')] == [1]
+    assert catalog.search('不思議な', series_id='26-1')[0].title == '消えた宇宙船'
+    assert catalog.search('存在しない語句') == []
+    # FTS5 の演算子や引用符を含む語もそのまま文字列として扱う
+    assert catalog.search('"OR" NEAR(') == []
+
+
+def test_search_short_terms_fall_back_to_like(catalog):
+    """trigram 索引で扱えない2文字以下の語の検索のテスト"""
+    assert [(hit.series_id, hit.number) for hit in catalog.search('魔法')] == [('189-85', 2)]
+    assert [hit.number for hit in catalog.search('夜空')] == [3]
+    assert catalog.search('%') == []
+
+
+def test_reingest_replaces_episodes(catalog):
+    """再登録時に古いエピソードと全文索引が置き換えられることのテスト"""
+    catalog.add_series(_series('189-85', '魔法少女の物語', [(1, '新しい朝', '少女は旅に出る。')]))
+    assert catalog.counts() == (2, 2)
+    assert catalog.search('秘密の約束') == []
+    assert catalog.search('旅に出る')[0].title == '新しい朝'
+    assert catalog.get_episode('189-85', 2) is None
+    assert catalog.get_series('189-85').episodes[0].title == '新しい朝'
+
+    assert catalog.remove_series('26-1')
+    assert not catalog.remove_series('26-1')
+    assert catalog.search('宇宙港') == []
+
+
+def test_duplicate_numbers_leave_no_stale_index_entries():
+    """同じ話数が重複するシリーズを再登録しても、全文索引に古い行が残らないことのテスト"""
+    with Catalog(':memory:') as catalog:
+        catalog.add_series(_series('189-85', '魔法少女の物語', [
+            (1, '差し替え前の題名', None), (1, '差し替え後の題名', None), (2, '二話の題名', None)]))
+        assert catalog.counts() == (1, 2)
+        assert catalog.get_series('189-85').episodes[0].title == '差し替え後の題名'
+        assert catalog.search('差し替え前') == []
+
+        catalog.add_series(_series('189-85', '魔法少女の物語', [(1, '新しい朝', '少女は旅に出る。')]))
+        assert catalog.search('差し替え前') == []
+        assert catalog.search('差し替え後') == []
+        assert [hit.title for hit in catalog.search('新しい朝')] == ['新しい朝']
+        if catalog.full_text:
+            # 外部コンテンツの全文索引が episodes テーブルと一致していること
+            catalog.connection.execute("INSERT INTO episodes_fts(episodes_fts) VALUES ('integrity-check')")
+
+
+def test_ingest_counts_merged_episodes(tmp_path):
+    """取り込んだエピソード数が、重複する話数をまとめた後の件数であることのテスト"""
+    path = str(tmp_path / '189-85.json')
+    write_metadata(_series('189-85', '魔法少女の物語', [
+        (1, '差し替え前の題名', None), (1, '差し替え後の題名', None), (2, '二話の題名', None)]), path, 'json')
+    with Catalog(':memory:') as catalog:
+        assert catalog.ingest_files([path]) == (1, 2)
+        assert catalog.counts() == (1, 2)
+
+
+def test_batched_transaction_rolls_back_on_error(tmp_path):
+    """登録途中のエラーで未確定のバッチが破棄されることのテスト"""
+    def broken():
+        yield _series('1-1', 'A', [(1, 'a', None), (2, 'b', None)])
+        yield _series('2-1', 'B', [(1, 'c', None)])
+        raise RuntimeError('stop')
+
+    with Catalog(str(tmp_path / 'catalog.sqlite3')) as catalog:
+        with pytest.raises(RuntimeError):
+            catalog.add_many(broken(), batch_size=3)
+        # 1件目（シリーズ1行 + エピソード2行）は確定済み、2件目はロールバックされる
+        assert catalog.counts() == (1, 2)
+
+
+def test_ingest_and_query_cli(tmp_path, capsys):
+    """catalog ingest / query サブコマンドのテスト（形式混在・不正ファイルはスキップ）"""
+    library = tmp_path / 'library'
+    (library / 'sub').mkdir(parents=True)
+    write_metadata(_series('189-85', '魔法少女の物語', [(1, '始まりの朝', '少女は不思議な杖を拾う。')]),
+                   str(library / '189-85.yaml'), 'yaml')
+    write_metadata(_series('26-1', '宇宙探偵', [(1, '消えた宇宙船', None)]),
+                   str(library / 'sub' / '26-1.jsonl'), 'jsonl')
+    (library / 'summary.json').write_text('{"results": []}', encoding='utf-8')
+    (library / 'notes.txt').write_text('ignored', encoding='utf-8')
+    db = str(tmp_path / 'catalog.sqlite3')
+
+    main(['catalog', 'ingest', '--db', db, str(library)])
+    out = capsys.readouterr().out
+    assert '2 シリーズ (2 話)' in out
+    assert 'スキップ 1 ファイル' in out
+
+    main(['catalog', 'query', '--db', db, '不思議な杖'])
+    assert '189-85 第1話 始まりの朝  [魔法少女の物語]' in capsys.readouterr().out
+
+    main(['catalog', 'query', '--db', db, '--series', '26-1', '--episode', '1', '--json'])
+    hit = json.loads(capsys.readouterr().out)
+    assert hit['title'] == '消えた宇宙船' and hit['synopsis'] is None
+
+    with pytest.raises(SystemExit):
+        main(['catalog', 'query', '--db', db, '見つからない語句'])
+
+
+def test_guess_format():
+    """拡張子から出力形式を推定するテスト"""
+    assert guess_format('a/b.yml') == 'yaml'
+    assert guess_format('a/b.JSONL') == 'jsonl'
+    assert guess_format('a/b.json') == 'json'
+    assert guess_format('a/b.txt') is None
@@ -166,4 +166,85 @@ def test_generate_episode_id():
         "https://invalid.url",
         1
     )
-    assert episode_id is None
\ No newline at end of file
+    assert episode_id is None
+
+
+def test_extractor_rejects_invalid_max_workers():
+    """不正なワーカー数指定のテスト"""
+    with pytest.raises(ValueError):
+        AbemaMetadataExtractor(max_workers=0)
+
+
+def test_extract_all_metadata_concurrent_synopsis(monkeypatch):
+    """あらすじの並列取得で話数順と None フォールバックが保たれることのテスト"""
+    import time
+
+    extractor = AbemaMetadataExtractor(max_workers=4)
+    mock_content = ''.join(
+        '<script type="application/ld+json">'
+        f'{{"@type": "ImageObject", "caption": "テスト 第{n}話 エピソード{n}", "url": "https://abema.tv/x/{n}"}}'
+        '</script>'
+        for n in range(1, 9)
+    )
+
+    def fake_fetch_synopsis(episode_url, deadline=None):
+        number = int(episode_url.rsplit('p', 1)[1])
+        # 後の話ほど早く終わるようにして完了順を入れ替える
+        time.sleep(0.02 * (9 - number))
+        return None if number == 3 else f"あらすじ{number}"
+
+    monkeypatch.setattr(extractor, 'fetch_page', lambda url, retries=3, deadline=None: mock_content)
+    monkeypatch.setattr(extractor, 'fetch_synopsis', fake_fetch_synopsis)
+
+    metadata = extractor.extract_all_metadata("https://abema.tv/video/title/test-series")
+    assert [ep.number for ep in metadata.episodes] == list(range(1, 9))
+    assert metadata.episodes[0].synopsis == "あらすじ1"
+    assert metadata.episodes[2].synopsis is None
+    assert metadata.episodes[7].synopsis == "あらすじ8"
+
+
+def test_fetch_synopsis_streaming_stops_early():
+    """あらすじ取得時に必要な JSON-LD を受信した時点で受信を打ち切ることのテスト"""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from abema_metadata.session import HTTPSession
+
+    page = (
+        '<html><head><script type="application/ld+json">'
+        '{"@type": "TVEpisode", "description": "ストリーミングのあらすじ"}'
+        '</script></head><body>' + 'x' * 2_000_000 + '</body></html>'
+    ).encode('utf-8')
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(page)))
+            self.end_headers()
+            try:
+                self.wfile.write(page)
+            except OSError:
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.handle_error = lambda *args: None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    local = f'http://127.0.0.1:{server.server_address[1]}/'
+
+    class LocalSession(HTTPSession):
+        def request(self, url, headers=None, method='GET'):
+            return super().request(url.replace('https://abema.tv/', local), headers, method)
+
+    try:
+        extractor = AbemaMetadataExtractor(session=LocalSession())
+        synopsis = extractor.fetch_synopsis("https://abema.tv/video/episode/test-series_s1_p1")
+        assert synopsis == "ストリーミングのあらすじ"
+        assert extractor.session.stats.bytes_received < len(page) // 10
+    finally:
+        extractor.close()
+        server.shutdown()
+        server.server_close()
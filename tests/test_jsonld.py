@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+JSON-LD ドキュメントモデルのテスト
+"""
+
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.jsonld import JsonLdDocument, JsonLdScanner, iter_block_texts
+
+
+MOCK_PAGE = '''
+<html><head>
+<script src="/app.js"></script>
+<script type="application/ld+json">
+{
+    "@context": "https://schema.org",
+    "@graph": [
+        {"@type": "BreadcrumbList", "itemListElement": [
+            {"@type": "ListItem", "position": 1, "name": "ホーム"},
+            {"@type": "ListItem", "position": 2, "name": "シリーズ \\"引用\\" 付き"}
+        ]},
+        {"@type": ["TVEpisode", "CreativeWork"], "description": "1行目\\n2行目 \\u2605"}
+    ]
+}
+</script>
+<script type="application/ld+json">{ invalid json }</script>
+<script type="application/ld+json">
+{"@type": "ImageObject", "caption": "シリーズ 第3話 \\"約束\\"のサムネイル", "url": "https://abema.tv/x"}
+</script>
+</head></html>
+'''
+
+
+def test_iter_block_texts():
+    """JSON-LD 以外のスクリプトタグを除外して本文を列挙するテスト"""
+    blocks = list(iter_block_texts(MOCK_PAGE))
+    assert len(blocks) == 3
+    assert '@graph' in blocks[0]
+
+
+def test_document_index_by_type():
+    """@graph と複数 @type を含むブロックの索引付けテスト"""
+    document = JsonLdDocument.parse(MOCK_PAGE)
+    # 不正なJSONのブロックは無視される
+    assert len(document.blocks) == 2
+    assert len(document.of_type('BreadcrumbList')) == 1
+    assert len(document.of_type('ListItem')) == 2
+    assert document.of_type('TVEpisode') == document.of_type('CreativeWork')
+    assert document.of_type('Unknown') == []
+    assert JsonLdDocument.coerce(document) is document
+
+
+def test_extract_with_escaped_quotes():
+    """エスケープされた引用符やUnicodeエスケープを正しく扱えることのテスト"""
+    extractor = AbemaMetadataExtractor()
+    document = JsonLdDocument.parse(MOCK_PAGE)
+
+    assert extractor.extract_series_title(document) == 'シリーズ "引用" 付き'
+    assert extractor.extract_synopsis(document) == '1行目\n2行目 ★'
+
+    episodes = extractor.extract_episodes(document, 'https://abema.tv/video/title/test-series')
+    assert len(episodes) == 1
+    assert episodes[0].number == 3
+    assert episodes[0].title == '"約束"'
+    assert episodes[0].url == 'https://abema.tv/video/episode/test-series_s1_p3'
+
+
+def test_extract_synopsis_missing():
+    """あらすじが存在しないページのテスト"""
+    extractor = AbemaMetadataExtractor()
+    assert extractor.extract_synopsis('<html></html>') is None
+
+
+def test_scanner_handles_split_chunks():
+    """タグやブロックが断片の境界で分割されても正しく取り出せることのテスト"""
+    scanner = JsonLdScanner()
+    blocks = []
+    for i in range(0, len(MOCK_PAGE), 7):
+        blocks.extend(scanner.feed(MOCK_PAGE[i:i + 7]))
+    assert blocks == list(iter_block_texts(MOCK_PAGE))
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+応答時間とエラーに応じた同時リクエスト数の調整（AIMD）とサーキットブレーカーのテスト
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from abema_metadata.extractor import AbemaMetadataExtractor, CircuitOpenError, NetworkError
+from abema_metadata.limiter import CLOSED, HALF_OPEN, OPEN, AdaptiveLimiter, CircuitBreaker, FlowControl
+from abema_metadata.retry import RetryPolicy
+from benchmarks.server import FixtureServer
+
+PAGES = {f'/video/episode/189-85_s1_p{n}': f'<html><body>{n}</body></html>' for n in range(1, 61)}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_additive_increase_only_when_saturated():
+    """上限を使っている状態での成功のみで上限が増え、上限の上限で止まることのテスト"""
+    limiter = AdaptiveLimiter(initial_limit=4, max_limit=6)
+    # 1件ずつの送信では上限を使っていないため増やさない
+    for _ in range(10):
+        limiter.release(limiter.acquire(), 200, 0.01)
+    assert limiter.limit == 4
+
+    for _ in range(10):
+        tokens = [limiter.acquire() for _ in range(limiter.limit)]
+        for token in tokens:
+            limiter.release(token, 200, 0.01)
+    assert limiter.limit == 6
+    assert limiter.snapshot()['in_flight'] == 0
+
+
+@pytest.mark.parametrize('status, latency', [(429, 0.01), (503, 0.01), (None, None), (200, 1.0)])
+def test_multiplicative_decrease_once_per_window(status, latency):
+    """過負荷（429/5xx・通信エラー・応答時間の急増）で上限を半減し、同じ混雑では重ねて減らさないことのテスト"""
+    limiter = AdaptiveLimiter(initial_limit=8, max_limit=8)
+    limiter.release(limiter.acquire(), 200, 0.01)
+    tokens = [limiter.acquire() for _ in range(8)]
+    for token in tokens:
+        limiter.release(token, status, latency)
+    assert limiter.limit == 4 and limiter.decreases == 1
+
+    # 引き下げ後に送信したリクエストの失敗では再び引き下げ、下限で止まる
+    for _ in range(5):
+        limiter.release(limiter.acquire(), status, latency)
+    assert limiter.limit == 1
+
+
+def test_circuit_breaker_transitions():
+    """連続失敗で open、一定時間後に1件だけ試行し、結果に応じて closed / open に戻ることのテスト"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    assert breaker.record_failure() and breaker.state == OPEN
+    assert not breaker.allow() and breaker.retry_in() == 10
+
+    clock.now = 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # 試行中は他の送信を許可しない
+    assert breaker.record_failure() and breaker.state == OPEN and breaker.opened == 2
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def _fetch_all(extractor, base_url, workers=12):
+    """すべてのページを並列に取得し、取得できたページ数を返す"""
+    def fetch(url):
+        try:
+            return extractor.fetch_page(url, retries=20)
+        except NetworkError:
+            return None
+
+    urls = [base_url + path.lstrip('/') for path in PAGES]
+    with ThreadPoolExecutor(workers) as executor:
+        return sum(1 for content in executor.map(fetch, urls) if content is not None)
+
+
+def _extractor(base_url, **kwargs):
+    return AbemaMetadataExtractor(base_url=base_url, max_workers=12,
+                                  retry_policy=RetryPolicy(base_delay=0.01, max_delay=0.05), **kwargs)
+
+
+def test_adaptive_limit_reduces_throttling():
+    """混雑時に 429 を返すサーバーに対して、固定の並列数より 429 を大幅に減らせることのテスト"""
+    with FixtureServer(PAGES, latency=0.02, capacity=3) as site, _extractor(site.base_url) as extractor:
+        _fetch_all(extractor, site.base_url)
+        fixed_throttled = site.throttled
+
+    flow_control = FlowControl(initial_limit=2, max_limit=12)
+    with FixtureServer(PAGES, latency=0.02, capacity=3) as site, \
+            _extractor(site.base_url, flow_control=flow_control) as extractor:
+        assert _fetch_all(extractor, site.base_url) == len(PAGES)
+        adaptive_throttled = site.throttled
+        host = site.base_url.split('/')[2]
+        state = flow_control.snapshot()[host]
+        assert state['state'] == CLOSED and state['in_flight'] == 0
+        assert 1 <= state['limit'] <= 12 and state['increases'] > 0
+        assert extractor.collect_metrics()['gauges'][f'flow.{host}.limit'] == state['limit']
+
+    assert fixed_throttled > 0
+    assert adaptive_throttled < fixed_throttled / 2
+
+
+def test_circuit_opens_after_sustained_failures():
+    """失敗が続いたホストへの送信を止め、サーバーへのリクエストが増えなくなることのテスト"""
+    flow_control = FlowControl(failure_threshold=4, reset_timeout=60)
+    with FixtureServer(PAGES, error_rate=1.0) as site, \
+            _extractor(site.base_url, flow_control=flow_control) as extractor:
+        url = site.base_url + 'video/episode/189-85_s1_p1'
+        with pytest.raises(CircuitOpenError):
+            extractor.fetch_page(url, retries=10)
+        assert site.requests == 4
+        with pytest.raises(CircuitOpenError):
+            extractor.fetch_page(url)
+        assert site.requests == 4
+        assert extractor.metrics.counter('circuit_rejections') == 2
+        assert flow_control.breaker(url).state == OPEN
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+処理段階ごとの計測（Metrics）と抽出処理への組み込みのテスト
+"""
+
+import asyncio
+import json
+import logging
+
+from abema_metadata.aio import AsyncAbemaMetadataExtractor
+from abema_metadata.cli import main
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.metrics import Histogram, Metrics
+from abema_metadata.retry import RetryPolicy
+from benchmarks.fixtures import make_site
+from benchmarks.server import FixtureServer, RedirectingSession
+
+SERIES_ID = '189-85'
+SERIES_URL = f'https://abema.tv/video/title/{SERIES_ID}'
+
+
+def test_histogram_percentiles():
+    """パーセンタイルがバケット単位（2倍以内の誤差）で近似されることのテスト"""
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.observe(value / 1000)
+    assert histogram.count == 100
+    assert abs(histogram.mean - 0.0505) < 1e-9
+    assert histogram.min == 0.001 and histogram.max == 0.1
+    p50 = histogram.percentile(0.50)
+    assert 0.050 <= p50 <= 0.100
+    assert histogram.percentile(0.99) == 0.1
+    assert histogram.percentile(0.0) <= 0.002
+    assert Histogram().to_dict() == {'count': 0, 'sum': 0.0}
+
+
+def test_metrics_hooks_and_snapshot():
+    """フックへの通知・スナップショット・リセットのテスト"""
+    metrics = Metrics()
+    received = []
+    hook = lambda kind, name, value: received.append((kind, name))
+    metrics.add_hook(hook)
+
+    metrics.increment('requests')
+    metrics.increment('requests', 2)
+    with metrics.time('fetch'):
+        pass
+    metrics.observe('page_bytes', 1024)
+    metrics.set_gauge('session.requests', 3)
+    metrics.remove_hook(hook)
+    metrics.increment('requests')
+
+    assert received == [('counter', 'requests'), ('counter', 'requests'), ('timing', 'fetch'),
+                        ('histogram', 'page_bytes'), ('gauge', 'session.requests')]
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'] == {'requests': 4}
+    assert snapshot['timings']['fetch']['count'] == 1
+    assert snapshot['histograms']['page_bytes']['max'] == 1024
+    assert snapshot['gauges'] == {'session.requests': 3}
+    json.dumps(snapshot)
+    assert '通信' in metrics.format_summary()
+
+    metrics.reset()
+    assert metrics.snapshot()['counters'] == {}
+
+
+def test_extractor_records_stages_and_retries(caplog):
+    """抽出処理の各段階の時間・リトライ・ステータス別件数が記録されることのテスト"""
+    episodes = 12
+    pages = make_site(SERIES_ID, episodes, episode_padding=100)
+    with FixtureServer(pages, error_rate=0.3, seed=3) as server:
+        extractor = AbemaMetadataExtractor(session=RedirectingSession(server.base_url),
+                                           max_workers=2,
+                                           retry_policy=RetryPolicy(base_delay=0.001, max_delay=0.01))
+        with caplog.at_level(logging.WARNING, logger='abema_metadata'):
+            metadata = extractor.extract_all_metadata(SERIES_URL)
+        snapshot = extractor.collect_metrics()
+        extractor.close()
+        errors = server.errors
+
+    counters = snapshot['counters']
+    assert len(metadata.episodes) == episodes
+    assert counters['episodes'] == episodes
+    assert errors > 0
+    assert counters['http_status.503'] == errors
+    assert counters['http_status.200'] == episodes + 1 - counters.get('synopsis_failures', 0)
+    assert counters['requests'] == snapshot['gauges']['session.requests']
+    assert counters['retries'] >= errors - counters.get('synopsis_failures', 0)
+    for stage in ('series', 'fetch', 'decode', 'jsonld_scan', 'episode_parse', 'synopsis'):
+        assert snapshot['timings'][stage]['count'] >= 1, stage
+    assert snapshot['timings']['synopsis']['count'] == episodes
+    assert snapshot['gauges']['session.bytes_received'] > 0
+    # リトライは標準出力ではなくログに構造化された情報付きで出力される
+    retry_records = [record for record in caplog.records if 'リトライします' in record.getMessage()]
+    assert len(retry_records) == counters['retries']
+    assert all(record.status == 503 for record in retry_records)
+
+
+def test_async_extractor_records_stages():
+    """asyncio 版でも同じ名前で計測されることのテスト"""
+    pages = make_site(SERIES_ID, 5, episode_padding=100)
+
+    async def run(base_url):
+        metrics = Metrics()
+        async with AsyncAbemaMetadataExtractor(base_url=base_url, metrics=metrics) as extractor:
+            await extractor.extract_all_metadata(base_url + f'video/title/{SERIES_ID}')
+            return extractor.collect_metrics()
+
+    with FixtureServer(pages) as server:
+        snapshot = asyncio.run(run(server.base_url))
+
+    assert snapshot['counters']['requests'] == 6
+    assert snapshot['counters']['http_status.200'] == 6
+    assert snapshot['counters']['episodes'] == 5
+    assert snapshot['timings']['synopsis']['count'] == 5
+    assert snapshot['timings']['series']['count'] == 1
+
+
+def test_cli_metrics_json(tmp_path, monkeypatch, capsys):
+    """--stats と --metrics-json の出力のテスト"""
+    import abema_metadata.extractor as extractor_module
+
+    pages = make_site(SERIES_ID, 3, episode_padding=100)
+    closed = []
+    with FixtureServer(pages) as server:
+        original = extractor_module.AbemaMetadataExtractor
+
+        def redirected(**kwargs):
+            extractor = original(session=RedirectingSession(server.base_url), **kwargs)
+            close = extractor.close
+            extractor.close = lambda: (closed.append(extractor), close())
+            return extractor
+
+        # CLI は実行時に extractor モジュールから読み込むため、モジュール側を差し替える
+        monkeypatch.setattr(extractor_module, 'AbemaMetadataExtractor', redirected)
+        output = tmp_path / 'out.yaml'
+        metrics_path = tmp_path / 'metrics.json'
+        main([SERIES_URL, '-o', str(output), '--stats', '--metrics-json', str(metrics_path)])
+
+    assert '処理段階ごとの所要時間' in capsys.readouterr().out
+    data = json.loads(metrics_path.read_text(encoding='utf-8'))
+    assert data['counters']['requests'] == 4
+    assert data['gauges']['session.connections_opened'] >= 1
+    assert data['timings']['series']['count'] == 1
+    # 終了時に抽出クラスの接続を閉じる
+    assert len(closed) == 1
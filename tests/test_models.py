@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+データモデル（__slots__ 付きのデータクラスと列形式の EpisodeTable）のテスト
+"""
+
+import pickle
+import sys
+
+import pytest
+from abema_metadata.models import EpisodeMetadata, EpisodeTable, SeriesMetadata
+from abema_metadata.output import build_output_data
+from benchmarks.bench_memory import build_catalog, measure
+
+SERIES_URL = 'https://abema.tv/video/title/189-85'
+
+
+def _episodes():
+    return [
+        EpisodeMetadata(1, '一話', 'あらすじ1', 'https://abema.tv/video/episode/189-85_s1_p1'),
+        EpisodeMetadata(2, '二話', None, 'https://abema.tv/video/episode/189-85_s1_p2'),
+        EpisodeMetadata(3, '特別編', 'あらすじ3', 'https://abema.tv/video/episode/189-85_sp1'),
+        EpisodeMetadata(4, '四話', None, None),
+    ]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason='__slots__ 付きのデータクラスは Python 3.10 以降')
+def test_models_have_no_instance_dict():
+    """EpisodeMetadata / SeriesMetadata がインスタンスごとの __dict__ を持たないことのテスト"""
+    assert not hasattr(EpisodeMetadata(1, 'a'), '__dict__')
+    assert not hasattr(SeriesMetadata('t', SERIES_URL, '2026-01-01'), '__dict__')
+
+
+def test_episode_table_keeps_attribute_api():
+    """列形式でも EpisodeMetadata と同じ属性で読み書きでき、URLを話数から導出することのテスト"""
+    table = EpisodeTable(_episodes())
+    assert table == _episodes() and _episodes() == table
+    assert table.url_prefix == 'https://abema.tv/video/episode/189-85_s1_p'
+    # 導出できないURL（別パターン・URLなし）のみを個別に保持する
+    assert table._urls == {2: 'https://abema.tv/video/episode/189-85_sp1', 3: None}
+    assert [episode.url for episode in table[-2:]] == ['https://abema.tv/video/episode/189-85_sp1', None]
+
+    table[1].synopsis = '取得したあらすじ'
+    table[0].url = 'https://example.com/other'
+    assert table[1].synopsis == '取得したあらすじ'
+    assert table[0].url == 'https://example.com/other'
+    assert table.to_list()[1] == EpisodeMetadata(2, '二話', '取得したあらすじ',
+                                                 'https://abema.tv/video/episode/189-85_s1_p2')
+    with pytest.raises(IndexError):
+        table[4]
+
+
+def test_compact_series_round_trips():
+    """compact() した結果が出力・pickle で元と同じ内容になることのテスト"""
+    metadata = SeriesMetadata('シリーズ', SERIES_URL, '2026-01-01', _episodes())
+    compact = metadata.compact()
+    assert isinstance(compact.episodes, EpisodeTable)
+    assert build_output_data(compact) == build_output_data(metadata)
+    restored = pickle.loads(pickle.dumps(compact))
+    assert restored == compact and restored.episodes.url_prefix == compact.episodes.url_prefix
+    table = EpisodeTable.for_series('https://abema.tv/', '189-85', _episodes()[:2])
+    assert table._urls == {} and table == _episodes()[:2]
+
+
+def test_episode_table_reduces_memory():
+    """大量のエピソードを保持する場合に、従来のデータクラスより使用メモリが大幅に少ないことのテスト"""
+    legacy = measure(lambda: build_catalog(50, 100, False, 'legacy'))
+    table = measure(lambda: build_catalog(50, 100, False, 'table'))
+    assert table < legacy * 0.6
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+出力ライター（YAML / JSON Lines / JSON）のテスト
+"""
+
+import json
+import os
+import threading
+
+import pytest
+import yaml
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.models import EpisodeMetadata, SeriesMetadata
+from abema_metadata.output import PART_SUFFIX, build_output_data, load_metadata, open_writer, write_metadata
+
+
+SERIES_URL = 'https://abema.tv/video/title/test-series'
+
+
+def _metadata(count):
+    episodes = [
+        EpisodeMetadata(number=n, title=f'第{n}話: 「タイトル」', synopsis=f'あらすじ{n}\n二行目' if n % 3 else None,
+                        url=f'https://abema.tv/video/episode/test-series_s1_p{n}')
+        for n in range(1, count + 1)
+    ]
+    return SeriesMetadata('テストシリーズ', SERIES_URL, '2024-01-01', episodes)
+
+
+@pytest.mark.parametrize('count', [0, 1, 5])
+def test_yaml_writer_matches_full_dump(tmp_path, count):
+    """逐次書き出したYAMLが、一覧全体を yaml.dump した従来の出力と同一であることのテスト"""
+    metadata = _metadata(count)
+    path = str(tmp_path / 'out.yaml')
+    write_metadata(metadata, path, 'yaml')
+
+    expected = yaml.dump(build_output_data(metadata), allow_unicode=True, default_flow_style=False,
+                         sort_keys=False, indent=2, width=120)
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == expected
+    assert not os.path.exists(path + PART_SUFFIX)
+
+
+def test_yaml_writer_keeps_non_bmp_characters(tmp_path):
+    """絵文字等の BMP 外の文字を含む場合も、Python 実装の yaml.Dumper と同一の出力になることのテスト"""
+    metadata = _metadata(2)
+    metadata.title = 'テストシリーズ😀'
+    metadata.episodes[1].synopsis = 'あらすじ🎉\n二行目'
+    path = str(tmp_path / 'out.yaml')
+    write_metadata(metadata, path, 'yaml')
+
+    expected = yaml.dump(build_output_data(metadata), Dumper=yaml.Dumper, allow_unicode=True,
+                         default_flow_style=False, sort_keys=False, indent=2, width=120)
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    assert content == expected
+    assert '😀' in content and '\\U' not in content
+    assert load_metadata(path, 'yaml') == metadata
+    if hasattr(yaml, 'CDumper'):
+        # libyaml はエスケープして出力するため、そのままでは一致しない
+        assert yaml.dump(build_output_data(metadata), Dumper=yaml.CDumper, allow_unicode=True,
+                         default_flow_style=False, sort_keys=False, indent=2, width=120) != expected
+
+
+@pytest.mark.parametrize('fmt', ['yaml', 'jsonl', 'json'])
+def test_roundtrip(tmp_path, fmt):
+    """各形式で保存したファイルを読み込むと元のメタ情報に戻ることのテスト"""
+    metadata = _metadata(4)
+    path = str(tmp_path / f'out.{fmt}')
+    write_metadata(metadata, path, fmt)
+    assert load_metadata(path, fmt) == metadata
+
+
+@pytest.mark.parametrize('episodes', [
+    ['第1話'],                                  # 辞書でない要素
+    [{'title': '第1話'}],                       # 話数がない
+    [{'episode_number': None}],                 # 話数が null
+    [{'episode_number': '一'}],                 # 話数が数値でない
+    '第1話',                                    # 一覧が文字列
+])
+def test_load_rejects_malformed_episodes(tmp_path, episodes):
+    """エピソード一覧の形式が不正なファイルは ValueError になることのテスト"""
+    path = str(tmp_path / 'out.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'series_title': 'テストシリーズ', 'episodes': episodes}, f, ensure_ascii=False)
+    with pytest.raises(ValueError):
+        load_metadata(path, 'json')
+
+
+def test_jsonl_layout(tmp_path):
+    """JSON Lines の1行目がシリーズ情報、以降が1話ずつのレコードであることのテスト"""
+    path = str(tmp_path / 'out.jsonl')
+    write_metadata(_metadata(2), path, 'jsonl')
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['type'] for record in records] == ['series', 'episode', 'episode']
+    assert records[0]['total_episodes'] == 2
+    assert records[2]['synopsis'] == 'あらすじ2\n二行目'
+
+
+def test_interrupted_write_keeps_previous_output(tmp_path):
+    """中断時に既存の出力が壊れず、途中までの結果が .part に残ることのテスト"""
+    path = str(tmp_path / 'out.jsonl')
+    write_metadata(_metadata(1), path, 'jsonl')
+    with open(path, encoding='utf-8') as f:
+        previous = f.read()
+
+    metadata = _metadata(3)
+    with pytest.raises(KeyboardInterrupt):
+        with open_writer(path, 'jsonl') as writer:
+            writer.begin(metadata)
+            writer.write_episode(metadata.episodes[0])
+            raise KeyboardInterrupt
+
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == previous
+    with open(path + PART_SUFFIX, encoding='utf-8') as f:
+        assert len(f.readlines()) == 2
+
+
+class _SlowFirstExtractor(AbemaMetadataExtractor):
+    """第1話のあらすじだけ遅れて返るエクストラクター"""
+
+    def __init__(self, page):
+        super().__init__(max_workers=4)
+        self.page = page
+        self.release = threading.Event()
+
+    def fetch_page(self, url, retries=3, deadline=None):
+        return self.page
+
+    def fetch_synopsis(self, episode_url, deadline=None):
+        if episode_url.endswith('_p1'):
+            self.release.wait(5)
+        return f'{episode_url} のあらすじ'
+
+
+def test_extract_all_metadata_streams_in_order(tmp_path):
+    """on_episode が取得完了順ではなく話数順に呼ばれることのテスト"""
+    blocks = [{'@type': 'BreadcrumbList', 'itemListElement': [{'name': 'ホーム'}, {'name': 'テストシリーズ'}]}]
+    blocks += [{'@type': 'ImageObject', 'caption': f'テストシリーズ 第{n}話 タイトル{n}'} for n in range(1, 5)]
+    page = ''.join('<script type="application/ld+json">' + json.dumps(b, ensure_ascii=False) + '</script>'
+                   for b in blocks)
+    extractor = _SlowFirstExtractor(page)
+    path = str(tmp_path / 'out.json')
+    order = []
+
+    # 他の話の取得が終わってから第1話を返す
+    threading.Timer(0.1, extractor.release.set).start()
+    with open_writer(path, 'json') as writer:
+        def on_episode(episode):
+            order.append(episode.number)
+            writer.write_episode(episode)
+
+        metadata = extractor.extract_all_metadata(SERIES_URL, on_series=writer.begin, on_episode=on_episode)
+
+    assert order == [1, 2, 3, 4]
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    assert data == build_output_data(metadata)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+取得→解析→書き出しのパイプライン（プロセスプールでの解析）のテスト
+"""
+
+import os
+import time
+
+import pytest
+import yaml
+from abema_metadata.batch import BatchRunner
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.jsonld import has_description
+from abema_metadata.pipeline import ParsePool, parse_series_page, parse_synopsis_page
+from abema_metadata.scheduler import FairScheduler
+from benchmarks.fixtures import episode_synopsis, make_episode_page, make_series_page, make_site
+from benchmarks.server import FixtureServer
+
+SERIES_ID = '189-85'
+EPISODES = 12
+
+
+@pytest.fixture(scope='module')
+def site():
+    pages = make_site(SERIES_ID, EPISODES, episode_padding=20000)
+    pages.update(make_site('26-1', 3, episode_padding=100, title='別シリーズ'))
+    with FixtureServer(pages) as fixture:
+        yield fixture
+
+
+def _records(metadata):
+    return [(ep.number, ep.title, ep.synopsis, ep.url) for ep in metadata.episodes]
+
+
+def test_parse_functions_match_extractor():
+    """プロセスで実行する解析関数が抽出クラスと同じ結果を返すことのテスト"""
+    extractor = AbemaMetadataExtractor()
+    series_url = f'https://abema.tv/video/title/{SERIES_ID}'
+    page = make_series_page(SERIES_ID, 5)
+    title, episodes, lookups = parse_series_page(page, series_url, 'https://abema.tv/')
+    assert lookups == []
+    assert title == extractor.extract_series_title(page)
+    assert episodes == extractor.extract_episodes(page, series_url)
+    episode_page = make_episode_page(SERIES_ID, 2, padding=100)
+    assert parse_synopsis_page(episode_page) == extractor.extract_synopsis(episode_page)
+
+
+def test_parse_pool_applies_backpressure():
+    """解析タスクの上限に達すると submit が空きを待つことのテスト"""
+    inline = ParsePool(0)
+    assert inline.submit(max, 1, 2).result() == 2
+    with pytest.raises(ValueError):
+        inline.submit(int, 'x').result()
+
+    pool = ParsePool(1, max_pending=1)
+    try:
+        pool.submit(abs, -1).result()  # ワーカープロセスを起動しておく
+        start = time.monotonic()
+        first = pool.submit(time.sleep, 0.3)
+        pool.submit(abs, -2)
+        # 2件目は1件目の完了後に登録される
+        assert time.monotonic() - start >= 0.25
+        assert first.done()
+    finally:
+        pool.close()
+
+
+def test_pipeline_matches_sequential_extraction(site):
+    """パイプライン処理の結果と受信量が従来の処理と一致することのテスト"""
+    url = site.base_url + f'video/title/{SERIES_ID}'
+    with AbemaMetadataExtractor(base_url=site.base_url) as sequential:
+        expected = sequential.extract_all_metadata(url)
+        expected_bytes = sequential.metrics.snapshot()['histograms']['page_bytes']['sum']
+
+    written = []
+    with AbemaMetadataExtractor(base_url=site.base_url, max_workers=3, parse_workers=2) as pipelined:
+        metadata = pipelined.extract_all_metadata(url, on_episode=lambda ep: written.append(ep.number))
+        snapshot = pipelined.metrics.snapshot()
+
+    assert metadata.title == expected.title
+    assert _records(metadata) == _records(expected)
+    assert all(ep.synopsis for ep in metadata.episodes)
+    assert written == list(range(1, EPISODES + 1))
+    # あらすじのブロックを受信した時点で打ち切るため、受信量は従来と同程度
+    assert snapshot['histograms']['page_bytes']['sum'] <= expected_bytes * 1.1
+    assert snapshot['counters']['episodes'] == EPISODES
+
+
+def test_pipeline_ignores_meta_description():
+    """<head> の <meta name="description"> で受信を打ち切らず、JSON-LD のあらすじを取得することのテスト"""
+    pages = make_site('26-1', 3, episode_padding=20000)
+    for path, html in pages.items():
+        if '/episode/' in path:
+            pages[path] = html.replace('<title>', '<meta name="description" content="番組の説明"><title>', 1)
+    with FixtureServer(pages) as server, \
+            AbemaMetadataExtractor(base_url=server.base_url, parse_workers=1) as extractor:
+        page = extractor.fetch_page_until(server.base_url + 'video/episode/26-1_s1_p1', has_description)
+        assert extractor.extract_synopsis(page) == episode_synopsis('26-1', 1)
+        metadata = extractor.extract_all_metadata(server.base_url + 'video/title/26-1')
+
+    assert [ep.synopsis for ep in metadata.episodes] == [episode_synopsis('26-1', n) for n in (1, 2, 3)]
+
+
+def test_batch_with_parse_workers(site, tmp_path):
+    """一括処理でもプロセスプールで解析した結果が出力されることのテスト"""
+    urls = [site.base_url + f'video/title/{SERIES_ID}', site.base_url + 'video/title/26-1',
+            site.base_url + 'video/title/missing']
+    with AbemaMetadataExtractor(base_url=site.base_url, parse_workers=2) as extractor:
+        with FairScheduler(4, rate_per_host=0) as scheduler:
+            summary = BatchRunner(extractor, scheduler, str(tmp_path)).run(urls)
+
+    assert summary.succeeded == 2 and summary.failed == 1
+    assert summary.pages == EPISODES + 3 + 3
+    with open(os.path.join(str(tmp_path), f'{SERIES_ID}.yaml'), encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    assert [ep['episode_number'] for ep in data['episodes']] == list(range(1, EPISODES + 1))
+    assert all(ep['synopsis'].startswith(f'{SERIES_ID} 第') for ep in data['episodes'])
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+タイムアウト・処理期限・バックオフのテスト
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from abema_metadata.extractor import AbemaMetadataExtractor, NetworkError
+from abema_metadata.retry import Deadline, RetryPolicy, parse_retry_after
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status, headers, body, delay = self.server.responses.pop(0)
+        self.server.requested.append(time.monotonic())
+        time.sleep(delay)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """(ステータス, ヘッダー, ボディ, 応答までの遅延秒数) の順に応答するローカルサーバー"""
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.handle_error = lambda *args: None
+    httpd.responses = []
+    httpd.requested = []
+    httpd.base_url = f'http://127.0.0.1:{httpd.server_address[1]}/'
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_parse_retry_after():
+    """Retry-After の秒数形式と日時形式の解釈テスト"""
+    now = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after(format_datetime(now + timedelta(seconds=30), usegmt=True), now=now) == 30.0
+    assert parse_retry_after(format_datetime(now - timedelta(seconds=30), usegmt=True), now=now) == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_grows_exponentially_with_jitter():
+    """待ち時間が指数的に増え、上限を超えず、ジッターでばらつくことのテスト"""
+    fixed = RetryPolicy(base_delay=0.5, max_delay=4.0, jitter=False)
+    assert [fixed.backoff(n) for n in range(5)] == [0.5, 1.0, 2.0, 4.0, 4.0]
+
+    policy = RetryPolicy(base_delay=0.5, max_delay=4.0)
+    delays = [policy.backoff(3) for _ in range(200)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert len(set(delays)) > 100
+
+
+def test_retry_after_only_for_throttling_statuses():
+    """Retry-After は 429 / 503 の場合のみ従い、上限で切り詰められることのテスト"""
+    policy = RetryPolicy(base_delay=1.0, max_retry_after=60.0, jitter=False)
+    assert policy.delay(0, 503, '5') == 5.0
+    assert policy.delay(0, 429, '600') == 60.0
+    assert policy.delay(0, 500, '5') == 1.0
+    assert policy.delay(2, None, None) == 4.0
+
+
+def test_deadline():
+    """処理期限の残り時間と判定のテスト"""
+    unlimited = Deadline(None)
+    assert unlimited.remaining() is None
+    assert not unlimited.expired()
+    assert unlimited.allows(1e9)
+
+    deadline = Deadline(10)
+    assert 9 < deadline.remaining() <= 10
+    assert deadline.allows(1)
+    assert not deadline.allows(11)
+    assert Deadline(0).expired()
+
+
+def test_fetch_page_honors_retry_after(server):
+    """503 の Retry-After に従ってリトライすることのテスト（バックオフの上限より優先）"""
+    server.responses = [
+        (503, {'Retry-After': '0'}, b'busy', 0),
+        (200, {}, b'<html>ok</html>', 0),
+    ]
+    extractor = AbemaMetadataExtractor(base_url=server.base_url,
+                                       retry_policy=RetryPolicy(base_delay=30, jitter=False))
+    start = time.monotonic()
+    assert extractor.fetch_page(server.base_url + 'video/title/x') == '<html>ok</html>'
+    assert time.monotonic() - start < 5
+    assert len(server.requested) == 2
+    extractor.close()
+
+
+def test_read_timeout_bounds_stalled_response(server):
+    """応答が途絶えたサーバーに対して read_timeout で打ち切ることのテスト"""
+    server.responses = [(200, {}, b'late', 3)]
+    extractor = AbemaMetadataExtractor(base_url=server.base_url, read_timeout=0.2)
+    start = time.monotonic()
+    with pytest.raises(NetworkError):
+        extractor.fetch_page(server.base_url + 'video/title/x', retries=1)
+    assert time.monotonic() - start < 2
+    extractor.close()
+
+
+def test_deadline_skips_retry_that_would_overrun(server):
+    """待ち時間が処理期限を超える場合はリトライしないことのテスト"""
+    server.responses = [(503, {'Retry-After': '60'}, b'busy', 0)]
+    extractor = AbemaMetadataExtractor(base_url=server.base_url)
+    start = time.monotonic()
+    with pytest.raises(NetworkError):
+        extractor.fetch_page(server.base_url + 'video/title/x', deadline=Deadline(5))
+    assert time.monotonic() - start < 2
+    assert len(server.requested) == 1
+    extractor.close()
+
+
+class _SlowSynopsisExtractor(AbemaMetadataExtractor):
+    def __init__(self, page, **kwargs):
+        super().__init__(max_workers=1, **kwargs)
+        self.page = page
+        self.fetched = []
+
+    def fetch_page(self, url, retries=3, deadline=None):
+        return self.page
+
+    def fetch_synopsis(self, episode_url, deadline=None):
+        self.fetched.append(episode_url)
+        time.sleep(0.1)
+        return 'あらすじ'
+
+
+def test_series_deadline_skips_remaining_synopses(caplog):
+    """シリーズの処理期限を超えた後のあらすじ取得がスキップされることのテスト"""
+    blocks = [{'@type': 'BreadcrumbList', 'itemListElement': [{'name': 'ホーム'}, {'name': 'テスト'}]}]
+    blocks += [{'@type': 'ImageObject', 'caption': f'テスト 第{n}話 タイトル{n}'} for n in range(1, 21)]
+    page = ''.join('<script type="application/ld+json">' + json.dumps(b, ensure_ascii=False) + '</script>'
+                   for b in blocks)
+    extractor = _SlowSynopsisExtractor(page, series_deadline=0.35)
+
+    metadata = extractor.extract_all_metadata('https://abema.tv/video/title/test')
+
+    assert len(metadata.episodes) == 20
+    assert 2 <= len(extractor.fetched) <= 6
+    assert all(ep.synopsis is None for ep in metadata.episodes[len(extractor.fetched):])
+    assert f'{20 - len(extractor.fetched)} 話のあらすじ取得をスキップしました' in caplog.text
+    assert extractor.metrics.counter('synopsis_skipped') == 20 - len(extractor.fetched)
+
+
+def test_async_read_timeout_and_retry_after(server):
+    """asyncio 版でも Retry-After に従い、応答が途絶えた接続を read_timeout で打ち切ることのテスト"""
+    import asyncio
+    from abema_metadata.aio import AsyncAbemaMetadataExtractor
+
+    server.responses = [
+        (429, {'Retry-After': '0'}, b'slow down', 0),
+        (200, {}, b'<html>ok</html>', 0),
+        (200, {}, b'late', 3),
+    ]
+
+    async def run():
+        async with AsyncAbemaMetadataExtractor(base_url=server.base_url, read_timeout=0.2,
+                                               retry_policy=RetryPolicy(base_delay=30)) as extractor:
+            assert await extractor.fetch_page(server.base_url + 'video/title/x') == '<html>ok</html>'
+            start = time.monotonic()
+            with pytest.raises(NetworkError):
+                await extractor.fetch_page(server.base_url + 'video/title/x', retries=1)
+            assert time.monotonic() - start < 2
+
+    asyncio.run(run())
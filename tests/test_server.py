@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+常駐サーバー（問い合わせAPI・取得結果の保持・同時要求の集約）のテスト
+"""
+
+import errno
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.server import MetadataService, SingleFlight, create_server
+from benchmarks.fixtures import make_site
+from benchmarks.server import FixtureServer
+
+SERIES_ID = '189-85'
+EPISODES = 4
+
+
+@pytest.fixture
+def site():
+    with FixtureServer(make_site(SERIES_ID, EPISODES, episode_padding=100), latency=0.02) as fixture:
+        yield fixture
+
+
+@pytest.fixture
+def api(site):
+    """フィクスチャサーバーを取得先とする問い合わせサーバーを起動し、(サービス, ポート) を返す"""
+    extractor = AbemaMetadataExtractor(base_url=site.base_url)
+    service = MetadataService(extractor, ttl=60)
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield service, server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    extractor.close()
+
+
+def _get(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    """実行中の同じキーへの呼び出しが1回の実行にまとめられ、例外も共有されることのテスト"""
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return 'value'
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(value == 'value' for value, _ in results)
+
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        flight.do('key', fail)
+    # 完了後は同じキーでも新たに実行される
+    assert flight.do('key', lambda: 'again') == ('again', False)
+
+
+def test_series_and_episode_endpoints(api, site):
+    """シリーズ・エピソードの問い合わせと、2回目以降に通信しないことのテスト"""
+    service, port = api
+    status, data = _get(port, f'/series/{SERIES_ID}')
+    assert status == 200
+    assert data['total_episodes'] == EPISODES
+    assert data['episodes'][0]['synopsis'].startswith(f'{SERIES_ID} 第1話のあらすじ')
+    requests = site.requests
+    assert requests == EPISODES + 1
+
+    status, episode = _get(port, f'/series/{SERIES_ID}/episodes/2')
+    assert status == 200
+    assert episode['episode_number'] == 2
+    assert episode['series_title'] == data['series_title']
+    status, light = _get(port, f'/lookup?url=https://abema.tv/video/title/{SERIES_ID}&synopsis=0')
+    assert status == 200
+    assert 'synopsis' not in light['episodes'][0]
+    assert site.requests == requests
+    assert service.metrics.counter('service.hits') == 2
+
+    status, health = _get(port, '/health')
+    assert status == 200 and health['cached_series'] == 1
+    assert health['metrics']['counters']['service.misses'] == 1
+
+    _get(port, f'/series/{SERIES_ID}?refresh=1')
+    assert site.requests == requests * 2
+
+
+def test_error_statuses(api):
+    """不正な指定・存在しないページ・存在しない話数のステータスコードのテスト"""
+    _, port = api
+    assert _get(port, '/series/bad%20id')[0] == 400
+    assert _get(port, '/series/999-1')[0] == 404
+    assert _get(port, f'/series/{SERIES_ID}/episodes/x')[0] == 400
+    status, body = _get(port, f'/series/{SERIES_ID}/episodes/{EPISODES + 1}')
+    assert status == 404 and '見つかりません' in body['error']
+    assert _get(port, '/unknown')[0] == 404
+
+
+def test_concurrent_requests_share_one_fetch(api, site):
+    """同じシリーズへの同時の問い合わせが1回の取得にまとめられることのテスト"""
+    service, port = api
+    statuses = []
+    threads = [threading.Thread(target=lambda: statuses.append(_get(port, f'/series/{SERIES_ID}')[0]))
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200] * 6
+    assert site.requests == EPISODES + 1
+    assert service.metrics.counter('service.coalesced') + service.metrics.counter('service.hits') == 5
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='Unix ドメインソケット非対応')
+def test_unix_socket(site, tmp_path):
+    """Unix ドメインソケットで問い合わせできることのテスト"""
+    path = str(tmp_path / 'abema.sock')
+    extractor = AbemaMetadataExtractor(base_url=site.base_url)
+    server = create_server(MetadataService(extractor), socket_path=path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(path)
+        connection = http.client.HTTPConnection('localhost')
+        connection.sock = client
+        connection.request('GET', f'/series/{SERIES_ID}?synopsis=0')
+        response = connection.getresponse()
+        assert response.status == 200
+        assert json.loads(response.read())['total_episodes'] == EPISODES
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        extractor.close()
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='Unix ドメインソケット非対応')
+def test_unix_socket_keeps_regular_file(tmp_path):
+    """--socket に既存のソケットは置き換え、通常のファイルは削除しないことのテスト"""
+    path = str(tmp_path / 'abema.sock')
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    with AbemaMetadataExtractor() as extractor:
+        service = MetadataService(extractor)
+        create_server(service, socket_path=path).server_close()
+
+        regular = tmp_path / 'notes.txt'
+        regular.write_text('消してはいけないファイル', encoding='utf-8')
+        with pytest.raises(FileExistsError):
+            create_server(service, socket_path=str(regular))
+    assert regular.read_text(encoding='utf-8') == '消してはいけないファイル'
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='Unix ドメインソケット非対応')
+def test_unix_socket_in_use_is_not_taken_over(tmp_path):
+    """待ち受け中のソケットと同じパスで2つ目のサーバーを開始すると失敗することのテスト"""
+    path = str(tmp_path / 'abema.sock')
+    with AbemaMetadataExtractor() as extractor:
+        service = MetadataService(extractor)
+        first = create_server(service, socket_path=path)
+        try:
+            with pytest.raises(OSError) as excinfo:
+                create_server(service, socket_path=path)
+            assert excinfo.value.errno == errno.EADDRINUSE
+            # 1つ目のサーバーのソケットは残っており、接続できる
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.connect(path)
+            client.close()
+        finally:
+            first.server_close()
+    assert not os.path.exists(path)
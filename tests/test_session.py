@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+HTTPセッション層（持続的接続・圧縮展開）のテスト
+"""
+
+import gzip
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from abema_metadata.session import HTTPSession
+
+
+PAGE = ('<html><body>' + 'テストページ' * 2000 + '</body></html>').encode('utf-8')
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    """keep-alive と gzip/deflate に対応したテスト用ハンドラー"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/redirect':
+            self.send_response(302)
+            self.send_header('Location', '/page')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        accept = self.headers.get('Accept-Encoding', '')
+        body, encoding = PAGE, None
+        if self.path == '/deflate' and 'deflate' in accept:
+            body, encoding = zlib.compress(PAGE), 'deflate'
+        elif 'gzip' in accept:
+            body, encoding = gzip.compress(PAGE), 'gzip'
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_reuses_connections(server_url):
+    """同一ホストへの連続リクエストで接続が再利用されることのテスト"""
+    with HTTPSession(user_agent='TestAgent/1.0') as session:
+        for _ in range(5):
+            status, body = session.get(f'{server_url}/page')
+            assert status == 200
+            assert body == PAGE
+
+        assert session.stats.requests == 5
+        assert session.stats.connections_opened == 1
+        assert session.stats.connections_reused == 4
+        # gzip で受信しているため、展開後のサイズより小さい
+        assert session.stats.bytes_received < len(PAGE) * 5
+
+
+def test_session_decodes_deflate(server_url):
+    """deflate 圧縮されたボディの展開テスト"""
+    with HTTPSession() as session:
+        status, body = session.get(f'{server_url}/deflate')
+    assert status == 200
+    assert body == PAGE
+
+
+def test_session_follows_redirect(server_url):
+    """リダイレクト追従と接続再利用のテスト"""
+    with HTTPSession() as session:
+        status, body = session.get(f'{server_url}/redirect')
+        assert status == 200
+        assert body == PAGE
+        assert session.stats.connections_opened == 1
+
+
+def test_session_concurrent_requests(server_url):
+    """複数スレッドからの同時利用で接続数がプールサイズ程度に収まることのテスト"""
+    session = HTTPSession(pool_size=4)
+    results = []
+
+    def worker():
+        for _ in range(5):
+            results.append(session.get(f'{server_url}/page'))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    session.close()
+
+    assert len(results) == 20
+    assert all(status == 200 and body == PAGE for status, body in results)
+    assert session.stats.connections_opened <= 4
+    assert session.stats.connections_reused == 20 - session.stats.connections_opened
+
+
+def test_session_rejects_unsupported_scheme():
+    """対応していないスキームのテスト"""
+    with pytest.raises(ValueError):
+        HTTPSession().request('ftp://abema.tv/video/title/123')
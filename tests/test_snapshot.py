@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+保存済みのHTML（ディレクトリ・tar アーカイブ）からの一括抽出のテスト
+"""
+
+import os
+import tarfile
+
+import pytest
+from abema_metadata.catalog import Catalog
+from abema_metadata.cli import main
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.jsonld import JsonLdDocument, iter_block_bytes, iter_block_texts
+from abema_metadata.output import load_metadata
+from abema_metadata.snapshot import extract_snapshots
+from benchmarks.fixtures import episode_synopsis, make_series_page, make_site
+
+SERIES_ID = '189-85'
+EPISODES = 5
+
+
+def _save_site(root, series_id=SERIES_ID, episodes=EPISODES, **kwargs):
+    """wget でミラーした場合と同じ配置（abema.tv/video/...）でページを保存する"""
+    for path, html in make_site(series_id, episodes, episode_padding=500, **kwargs).items():
+        file_path = os.path.join(str(root), 'abema.tv' + path + '.html')
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+
+def _synopses(metadata):
+    return [episode.synopsis for episode in metadata.episodes]
+
+
+def test_bytes_scanner_matches_text_scanner():
+    """バイト列の走査が文字列の走査と同じブロックを返すことのテスト"""
+    html = make_series_page(SERIES_ID, 20, caption_extra=10, embedded_synopses=range(1, 4))
+    data = html.encode('utf-8')
+    assert [block.decode('utf-8') for block in iter_block_bytes(data)] == list(iter_block_texts(html))
+    parsed = JsonLdDocument.parse_bytes(data)
+    assert parsed.blocks == JsonLdDocument.parse(html).blocks
+    # 範囲指定では、その範囲内で完結するブロックのみを返す
+    first_end = data.find(b'</script>') + len(b'</script>')
+    assert len(list(iter_block_bytes(data, 0, first_end))) == 1
+
+
+def test_extract_directory(tmp_path):
+    """ディレクトリのシリーズ・エピソードページを対応付けて抽出することのテスト"""
+    _save_site(tmp_path)
+    _save_site(tmp_path, '26-1', 3, embedded_synopses=3)
+    # 対応するシリーズページのないエピソードページと、種別を判定できないページ
+    os.remove(os.path.join(str(tmp_path), 'abema.tv', 'video', 'title', '26-1.html'))
+    _save_site(tmp_path, '26-1', 0, embedded_synopses=0)
+    with open(os.path.join(str(tmp_path), 'notes.html'), 'w', encoding='utf-8') as f:
+        f.write('<html><body>メモ</body></html>')
+
+    results, report = extract_snapshots([str(tmp_path)], workers=0)
+
+    assert [metadata.source_url for metadata in results] == [
+        f'https://abema.tv/video/title/{SERIES_ID}', 'https://abema.tv/video/title/26-1']
+    first = results[0]
+    with AbemaMetadataExtractor() as extractor:
+        expected = extractor.extract_episodes(make_series_page(SERIES_ID, EPISODES), first.source_url)
+    assert [(ep.number, ep.title, ep.url) for ep in first.episodes] == \
+        [(ep.number, ep.title, ep.url) for ep in expected]
+    assert _synopses(first) == [episode_synopsis(SERIES_ID, n) for n in range(1, EPISODES + 1)]
+    assert results[1].episodes == []
+    assert report.files == EPISODES + 1 + 3 + 1 + 1
+    assert (report.series, report.episodes, report.synopses) == (2, EPISODES, EPISODES)
+    assert report.orphans == 3 and report.unknown == 1 and report.errors == 0
+
+
+def test_canonical_url_takes_precedence(tmp_path):
+    """ファイル名ではなく canonical URL でページの種別を判定することのテスト"""
+    html = make_series_page(SERIES_ID, 2).replace(
+        '</title>', f'</title><link href="https://abema.tv/video/title/{SERIES_ID}" rel="canonical">')
+    (tmp_path / 'saved-page-1.htm').write_text(html, encoding='utf-8')
+    results, report = extract_snapshots([str(tmp_path)], workers=0)
+    assert report.series == 1
+    assert results[0].source_url == f'https://abema.tv/video/title/{SERIES_ID}'
+    assert len(results[0].episodes) == 2
+
+
+@pytest.mark.parametrize('mode, workers', [('w', 0), ('w:gz', 0), ('w', 1)])
+def test_extract_tar_archive(tmp_path, mode, workers):
+    """非圧縮・圧縮の tar アーカイブから、展開せずに抽出できることのテスト"""
+    site = tmp_path / 'site'
+    _save_site(site)
+    archive = str(tmp_path / ('archive.tar' + ('.gz' if mode.endswith('gz') else '')))
+    with tarfile.open(archive, mode) as tar:
+        tar.add(str(site / 'abema.tv'), arcname='abema.tv')
+
+    results, report = extract_snapshots([archive], workers=workers)
+
+    assert len(results) == 1 and report.files == EPISODES + 1
+    assert _synopses(results[0]) == [episode_synopsis(SERIES_ID, n) for n in range(1, EPISODES + 1)]
+    assert report.bytes == sum(os.path.getsize(os.path.join(root, name))
+                               for root, _, names in os.walk(str(site)) for name in names)
+
+
+def test_snapshot_command(tmp_path, capsys):
+    """snapshot サブコマンドで出力ファイルとカタログに登録されることのテスト"""
+    _save_site(tmp_path / 'site')
+    output_dir = str(tmp_path / 'out')
+    db = str(tmp_path / 'catalog.sqlite3')
+    main(['snapshot', str(tmp_path / 'site'), '-d', output_dir, '--format', 'jsonl',
+          '-j', '0', '--catalog', db])
+
+    metadata = load_metadata(os.path.join(output_dir, f'{SERIES_ID}.jsonl'), 'jsonl')
+    assert len(metadata.episodes) == EPISODES and all(_synopses(metadata))
+    with Catalog(db) as catalog:
+        assert catalog.counts() == (1, EPISODES)
+    assert '一括抽出が完了しました' in capsys.readouterr().out
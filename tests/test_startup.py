@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+CLI の起動時に読み込むモジュールと起動時間のテスト
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 引数の解析までに読み込まないモジュール（HTTP通信・TLS・YAML・キャッシュ・ログ・並列処理・カタログ）
+DEFERRED_MODULES = (
+    'abema_metadata.extractor', 'abema_metadata.cache', 'abema_metadata.limiter', 'abema_metadata.update',
+    'http.client', 'ssl', 'email.utils', 'urllib.parse', 'yaml', 'hashlib', 'logging',
+    'asyncio', 'concurrent.futures', 'multiprocessing', 'sqlite3',
+)
+
+# abema_metadata.cli の読み込み時間の上限（同じ実行で先に読み込んだ argparse の読み込み時間に対する倍率）。
+# 環境による速度差を打ち消すため絶対時間ではなく比で判定する。現状は 3 倍前後で、
+# yaml を起動時に読み込むようになると 5 倍、asyncio では 9 倍程度になる
+IMPORT_RATIO_LIMIT = 4.0
+
+
+def _imported_modules(*args):
+    """-X importtime 付きで実行し、(実行結果, 読み込まれたモジュール名の集合) を返します。"""
+    result, times = _import_times(*args)
+    return result, set(times)
+
+
+def _import_times(*args):
+    """-X importtime 付きで実行し、(実行結果, モジュール名をキー・累積の読み込み時間（マイクロ秒）を値とする辞書) を返します。"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].rsplit('|', 2)
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return result, times
+
+
+def test_help_does_not_import_heavy_modules():
+    """--help の表示では通信・YAML 等のモジュールを読み込まないことのテスト"""
+    result, modules = _imported_modules('abema_extractor.py', '--help')
+    assert result.returncode == 0
+    assert 'usage:' in result.stdout
+    assert not [name for name in DEFERRED_MODULES if name in modules]
+
+
+def test_cli_import_defers_heavy_modules():
+    """abema_metadata.cli の読み込みでは通信・YAML 等のモジュールを読み込まないことのテスト"""
+    result, modules = _imported_modules('-c', 'import abema_metadata.cli')
+    assert result.returncode == 0
+    assert 'abema_metadata.cli' in modules
+    assert not [name for name in DEFERRED_MODULES if name in modules]
+
+
+def test_cli_import_time_relative_to_argparse():
+    """abema_metadata.cli の読み込み時間が、argparse の読み込み時間の一定倍率以内であることのテスト"""
+    # 初回はバイトコードの生成を含むため、一度読み込んでから計測し、揺れを抑えるため中央値で判定する
+    _import_times('-c', 'import abema_metadata.cli')
+    ratios = []
+    for _ in range(5):
+        result, times = _import_times('-c', 'import argparse; import abema_metadata.cli')
+        assert result.returncode == 0
+        ratios.append(times['abema_metadata.cli'] / times['argparse'])
+    assert statistics.median(ratios) < IMPORT_RATIO_LIMIT
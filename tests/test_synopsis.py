@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+シリーズ単位のあらすじの取得元（埋め込み JSON-LD・シーズン単位の文書）のテスト
+"""
+
+import asyncio
+import os
+
+import pytest
+import yaml
+from abema_metadata.aio import AsyncAbemaMetadataExtractor
+from abema_metadata.batch import BatchRunner
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.jsonld import JsonLdDocument
+from abema_metadata.scheduler import FairScheduler
+from abema_metadata.synopsis import episode_synopses, find_alternate_jsonld
+from benchmarks.fixtures import episode_synopsis, make_site
+from benchmarks.server import FixtureServer
+
+SERIES_ID = '189-85'
+EPISODES = 6
+
+
+def _serve(**kwargs):
+    return FixtureServer(make_site(SERIES_ID, EPISODES, episode_padding=100, **kwargs))
+
+
+def _expected():
+    return [episode_synopsis(SERIES_ID, number) for number in range(1, EPISODES + 1)]
+
+
+def test_episode_synopses_filters_other_seasons_and_series():
+    """他のシーズン・他のシリーズの話と、あらすじが食い違う話数を除外することのテスト"""
+    document = JsonLdDocument([{
+        '@type': 'TVSeries',
+        'containsSeason': [
+            {'@type': 'TVSeason', 'seasonNumber': 1, 'episode': [
+                {'@type': 'TVEpisode', 'episodeNumber': 1, 'description': 'S1E1'},
+                {'@type': 'TVEpisode', 'episodeNumber': '2', 'description': 'S1E2'},
+                {'@type': 'TVEpisode', 'episodeNumber': 3, 'description': ''},
+            ]},
+            {'@type': 'TVSeason', 'seasonNumber': 2, 'episode': [
+                {'@type': 'TVEpisode', 'episodeNumber': 1, 'description': 'S2E1'},
+            ]},
+        ],
+    }, {'@type': 'TVEpisode', 'episodeNumber': 4, 'description': '別シリーズ',
+        'url': 'https://abema.tv/video/episode/26-1_s1_p4'},
+       {'@type': 'TVEpisode', 'episodeNumber': 5, 'description': 'A'},
+       {'@type': 'TVEpisode', 'episodeNumber': 5, 'description': 'B'}])
+
+    assert episode_synopses(document, f'https://abema.tv/video/title/{SERIES_ID}') == {1: 'S1E1', 2: 'S1E2'}
+
+
+def test_find_alternate_jsonld():
+    """link タグの属性の順序・引用符・相対URLを扱えることのテスト"""
+    series_url = f'https://abema.tv/video/title/{SERIES_ID}'
+    html = ('<html><head><link rel="stylesheet" href="/a.css">'
+            '<link href=\'season.jsonld\' TYPE="application/ld+json" rel="alternate nofollow">'
+            '</head><body><link rel="alternate" type="application/ld+json" href="/ignored"></body></html>')
+    assert find_alternate_jsonld(html, series_url) == 'https://abema.tv/video/title/season.jsonld'
+    assert find_alternate_jsonld('<head><link rel="alternate" hreflang="en" href="/en"></head>', series_url) is None
+
+
+@pytest.mark.parametrize('site_options, sources, requests', [
+    ({'embedded_synopses': EPISODES}, None, 1),
+    ({'embedded_synopses': 2}, None, 1 + EPISODES - 2),
+    ({'season_synopses': EPISODES}, None, 2),
+    ({'embedded_synopses': 2, 'season_synopses': 4}, None, 2 + EPISODES - 4),
+    ({'embedded_synopses': EPISODES}, [], 1 + EPISODES),
+])
+def test_bulk_sources_fetch_only_gaps(site_options, sources, requests):
+    """まとめて取り出せなかった話のみ個別ページを取得することのテスト"""
+    with _serve(**site_options) as site, \
+            AbemaMetadataExtractor(base_url=site.base_url, synopsis_sources=sources) as extractor:
+        metadata = extractor.extract_all_metadata(site.base_url + f'video/title/{SERIES_ID}')
+        assert [episode.synopsis for episode in metadata.episodes] == _expected()
+        assert site.requests == requests
+
+
+def test_missing_season_document_falls_back_to_pages():
+    """シーズン単位の文書を取得できない場合は個別ページから取得することのテスト"""
+    pages = make_site(SERIES_ID, EPISODES, episode_padding=100, season_synopses=EPISODES)
+    del pages[f'/video/title/{SERIES_ID}/season.jsonld']
+    with FixtureServer(pages) as site, AbemaMetadataExtractor(base_url=site.base_url) as extractor:
+        metadata = extractor.extract_all_metadata(site.base_url + f'video/title/{SERIES_ID}')
+        assert [episode.synopsis for episode in metadata.episodes] == _expected()
+        assert site.requests == 2 + EPISODES
+        assert extractor.metrics.counter('synopsis_document_failures') == 1
+
+
+@pytest.mark.parametrize('parse_workers', [0, 1])
+def test_batch_uses_bulk_sources(tmp_path, parse_workers):
+    """一括処理でもシーズン単位の文書を取得し、残りの話のみ個別ページを取得することのテスト"""
+    with _serve(embedded_synopses=1, season_synopses=3) as site, \
+            AbemaMetadataExtractor(base_url=site.base_url, parse_workers=parse_workers) as extractor:
+        with FairScheduler(4, rate_per_host=0) as scheduler:
+            summary = BatchRunner(extractor, scheduler, str(tmp_path)).run(
+                [site.base_url + f'video/title/{SERIES_ID}'])
+        assert summary.failed == 0
+        assert summary.pages == site.requests == 2 + EPISODES - 3
+        assert extractor.metrics.counter('synopsis_source.embedded') == 1
+        assert extractor.metrics.counter('synopsis_source.season') == 2
+
+    with open(os.path.join(str(tmp_path), f'{SERIES_ID}.yaml'), encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    assert [episode['synopsis'] for episode in data['episodes']] == _expected()
+
+
+def test_async_extractor_uses_bulk_sources():
+    """非同期版でもシリーズ単位の取得元を使用することのテスト"""
+    async def run(base_url):
+        async with AsyncAbemaMetadataExtractor(base_url=base_url) as extractor:
+            return await extractor.extract_all_metadata(base_url + f'video/title/{SERIES_ID}')
+
+    with _serve(embedded_synopses=2, season_synopses=4) as site:
+        metadata = asyncio.run(run(site.base_url))
+        assert [episode.synopsis for episode in metadata.episodes] == _expected()
+        assert site.requests == 2 + EPISODES - 4
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+差分更新（--update）のテスト
+"""
+
+import json
+
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.models import EpisodeMetadata, SeriesMetadata
+from abema_metadata.output import build_output_data, load_yaml, write_yaml
+from abema_metadata.update import update_metadata
+
+
+SERIES_URL = 'https://abema.tv/video/title/test-series'
+
+
+def _series_page(titles):
+    blocks = [{'@type': 'BreadcrumbList', 'itemListElement': [{'name': 'ホーム'}, {'name': 'テストシリーズ'}]}]
+    blocks += [{'@type': 'ImageObject', 'caption': f'テストシリーズ 第{n}話 {title}'} for n, title in titles.items()]
+    return ''.join('<script type="application/ld+json">' + json.dumps(b, ensure_ascii=False) + '</script>'
+                   for b in blocks)
+
+
+class _FakeExtractor(AbemaMetadataExtractor):
+    def __init__(self, page):
+        super().__init__(max_workers=1)
+        self.page = page
+        self.requested = []
+
+    def fetch_page(self, url, retries=3, deadline=None):
+        self.requested.append(url)
+        return self.page
+
+    def fetch_synopsis(self, episode_url, deadline=None):
+        self.requested.append(episode_url)
+        return f'新しいあらすじ {episode_url[-1]}'
+
+
+def _episode(number, title, synopsis):
+    return EpisodeMetadata(number=number, title=title, synopsis=synopsis,
+                           url=f'https://abema.tv/video/episode/test-series_s1_p{number}')
+
+
+def test_load_yaml_roundtrip(tmp_path):
+    """write_yaml で保存したファイルの読み込みテスト（あらすじなしは None に戻る）"""
+    metadata = SeriesMetadata('テストシリーズ', SERIES_URL, '2024-01-01',
+                              [_episode(1, '一話', 'あらすじ1'), _episode(2, '二話', None)])
+    path = str(tmp_path / 'out.yaml')
+    write_yaml(build_output_data(metadata), path)
+
+    loaded = load_yaml(path)
+    assert loaded == metadata
+
+
+def test_update_fetches_only_new_and_missing():
+    """新しい話とあらすじが欠けている話だけを取得することのテスト"""
+    existing = SeriesMetadata('テストシリーズ', SERIES_URL, '2024-01-01', [
+        _episode(1, '一話', 'あらすじ1'),
+        _episode(2, '二話', None),
+        _episode(3, '三話', 'あらすじ3'),
+    ])
+    extractor = _FakeExtractor(_series_page({1: '一話', 2: '二話', 3: '三話（改題）', 4: '四話'}))
+
+    metadata, report = update_metadata(extractor, existing, SERIES_URL)
+
+    assert extractor.requested == [
+        SERIES_URL,
+        'https://abema.tv/video/episode/test-series_s1_p2',
+        'https://abema.tv/video/episode/test-series_s1_p4',
+    ]
+    assert report.requests == 3
+    assert (report.added, report.changed, report.unchanged) == (1, 2, 1)
+    assert [ep.number for ep in metadata.episodes] == [1, 2, 3, 4]
+    assert metadata.episodes[0].synopsis == 'あらすじ1'
+    assert metadata.episodes[1].synopsis == '新しいあらすじ 2'
+    assert metadata.episodes[2].title == '三話（改題）'
+    assert metadata.episodes[2].synopsis == 'あらすじ3'
+    assert metadata.episodes[3].synopsis == '新しいあらすじ 4'
+
+
+def test_update_weekly_refresh_costs_two_requests():
+    """週1回の新話追加で、リクエストがシリーズページと新話の2件で済むことのテスト"""
+    existing = SeriesMetadata('テストシリーズ', SERIES_URL, '2024-01-01',
+                              [_episode(n, f'{n}話', f'あらすじ{n}') for n in range(1, 6)])
+    extractor = _FakeExtractor(_series_page({n: f'{n}話' for n in range(1, 7)}))
+
+    metadata, report = update_metadata(extractor, existing, SERIES_URL)
+    assert report.requests == 2
+    assert (report.added, report.changed, report.unchanged) == (1, 0, 5)
+    assert len(metadata.episodes) == 6
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+条件付きリクエストで新しい話を検出する監視モードのテスト
+"""
+
+import json
+
+from abema_metadata.cli import main
+from abema_metadata.extractor import AbemaMetadataExtractor
+from abema_metadata.watch import SeriesState, WatchPolicy, Watcher, load_states
+from benchmarks.fixtures import episode_synopsis, make_site
+from benchmarks.server import FixtureServer, RedirectingSession
+
+SERIES_ID = '189-85'
+DAY = 86400.0
+
+
+class FakeClock:
+    def __init__(self, now=1700000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _site(episodes, series_id=SERIES_ID):
+    return make_site(series_id, episodes, episode_padding=100)
+
+
+def test_dormant_series_back_off():
+    """更新のないシリーズは確認間隔を倍々に延ばし、上限で止まることのテスト"""
+    policy = WatchPolicy(min_interval=300, max_interval=DAY)
+    state = SeriesState('https://abema.tv/video/title/1-1')
+    delays = []
+    for idle_polls in range(10):
+        state.idle_polls = idle_polls
+        delays.append(policy.next_delay(state, 0.0))
+    assert delays[:4] == [300, 600, 1200, 2400]
+    assert delays[-1] == DAY
+    state.failures = 3
+    assert policy.next_delay(state, 0.0) == 2400
+
+
+def test_learned_cadence_wakes_up_before_release():
+    """学習した配信周期の予定時刻の前に確認し、予定時刻の前後は短い間隔で確認することのテスト"""
+    policy = WatchPolicy(min_interval=300, max_interval=DAY, release_window=3600)
+    state = SeriesState('https://abema.tv/video/title/1-1', idle_polls=10)
+    for week in range(3):
+        state.record_release(week * 7 * DAY, policy.min_interval)
+    assert state.cadence() == 7 * DAY
+
+    last = 14 * DAY
+    assert policy.next_delay(state, last + DAY) == DAY
+    assert policy.next_delay(state, last + 6.5 * DAY) == DAY / 2 - 3600
+    assert policy.next_delay(state, last + 7 * DAY - 60) == 300
+    assert policy.next_delay(state, last + 7 * DAY + 1800) == 300
+    # 配信予定を過ぎても検出できなかった場合は、次の周期の予定時刻に合わせる
+    assert policy.next_delay(state, last + 7 * DAY + 7200) == DAY
+
+
+def test_watcher_detects_new_episodes_with_conditional_requests(tmp_path):
+    """初回は既知の話を記録し、変更がなければ 304、新しい話のみあらすじを取得することのテスト"""
+    pages = _site(3)
+    events = []
+    clock = FakeClock()
+    state_path = str(tmp_path / 'state.json')
+    with FixtureServer(pages, etags=True) as site, AbemaMetadataExtractor(base_url=site.base_url) as extractor:
+        url = site.base_url + f'video/title/{SERIES_ID}'
+        watcher = Watcher(extractor, [url], state_path, events.append, clock=clock)
+
+        assert watcher.poll_due() == 1
+        assert [event['event'] for event in events] == ['series_added']
+        assert events[0]['episodes'] == 3 and site.requests == 1
+
+        # 確認時刻前は確認しない
+        assert watcher.poll_due() == 0
+        clock.now = watcher.next_due()
+        assert watcher.poll_due() == 1
+        assert site.not_modified == 1 and len(events) == 1
+        assert watcher.states[url].idle_polls == 1
+
+        # 4話目が追加されると、シリーズページと4話目のページのみを取得する
+        for path, html in _site(4).items():
+            if path not in pages or path.endswith(SERIES_ID):
+                site.set_page(path, html)
+        requests = site.requests
+        clock.now = watcher.next_due()
+        watcher.poll_due()
+        assert site.requests - requests == 2
+        new_episode = events[-1]
+        assert new_episode['event'] == 'new_episode' and new_episode['number'] == 4
+        assert new_episode['synopsis'] == episode_synopsis(SERIES_ID, 4)
+        assert new_episode['series_id'] == SERIES_ID
+        assert watcher.states[url].idle_polls == 0
+        assert extractor.metrics.counter('watch.new_episodes') == 1
+
+    stored = load_states(state_path)[url]
+    assert sorted(stored.episodes) == [1, 2, 3, 4]
+    assert stored.etag and stored.last_changed == clock.now
+    assert stored.next_check == clock.now + 300
+
+
+def test_watcher_reports_errors_and_backs_off(tmp_path):
+    """確認に失敗したシリーズはエラーイベントを出し、間隔を延ばして再確認することのテスト"""
+    events = []
+    clock = FakeClock()
+    with FixtureServer({}) as site, AbemaMetadataExtractor(base_url=site.base_url) as extractor:
+        url = site.base_url + 'video/title/0-0'
+        watcher = Watcher(extractor, [url], str(tmp_path / 'state.json'), events.append, clock=clock)
+        watcher.poll_due()
+        assert events[0]['event'] == 'error' and '404' in events[0]['message']
+        assert watcher.next_due() == clock.now + 600
+        assert not watcher.states[url].initialized
+
+
+def test_watcher_reschedules_after_unexpected_error(tmp_path, monkeypatch):
+    """想定外の例外が発生したシリーズも、エラーイベントを出して間隔を延ばし、監視を続けることのテスト"""
+    events = []
+    clock = FakeClock()
+    with FixtureServer(_site(2), etags=True) as site, AbemaMetadataExtractor(base_url=site.base_url) as extractor:
+        url = site.base_url + f'video/title/{SERIES_ID}'
+        watcher = Watcher(extractor, [url], str(tmp_path / 'state.json'), events.append, clock=clock)
+
+        def broken(*args):
+            raise OSError('キャッシュを読み込めません')
+
+        monkeypatch.setattr(extractor, 'fetch_page_conditional', broken)
+        assert watcher.poll_due() == 1
+        assert events[0]['event'] == 'error' and 'キャッシュ' in events[0]['message']
+        assert watcher.next_due() == clock.now + 600
+
+        monkeypatch.undo()
+        clock.now = watcher.next_due()
+        assert watcher.poll_due() == 1
+        assert events[-1]['event'] == 'series_added'
+
+
+def test_watcher_keeps_state_when_page_has_no_episodes(tmp_path):
+    """既知の話があるシリーズのページから話を取得できない場合、状態を保持して間隔を延ばすことのテスト"""
+    pages = _site(3)
+    events = []
+    clock = FakeClock()
+    with FixtureServer(pages, etags=True) as site, AbemaMetadataExtractor(base_url=site.base_url) as extractor:
+        url = site.base_url + f'video/title/{SERIES_ID}'
+        watcher = Watcher(extractor, [url], str(tmp_path / 'state.json'), events.append, clock=clock)
+        watcher.poll_due()
+        series_path = next(path for path in pages if path.endswith(SERIES_ID))
+        site.set_page(series_path, '<html><body>しばらくお待ちください</body></html>')
+
+        clock.now = watcher.next_due()
+        watcher.poll_due()
+        assert [event['event'] for event in events] == ['series_added', 'error']
+        assert sorted(watcher.states[url].episodes) == [1, 2, 3]
+        assert watcher.next_due() == clock.now + 600
+
+        # ページが元に戻っても、既知の話を新しい話として通知しない
+        site.set_page(series_path, pages[series_path])
+        clock.now = watcher.next_due()
+        watcher.poll_due()
+        assert [event['event'] for event in events] == ['series_added', 'error']
+        assert watcher.states[url].failures == 0
+
+
+def test_watch_command_once(tmp_path, monkeypatch, capsys):
+    """watch --once で確認時刻を過ぎたシリーズのみを確認し、状態とイベントを保存することのテスト"""
+    import abema_metadata.extractor as extractor_module
+
+    pages = _site(2)
+    pages.update(_site(1, '26-1'))
+    state_path = str(tmp_path / 'state.json')
+    events_path = str(tmp_path / 'events.jsonl')
+    url_list = tmp_path / 'watchlist.txt'
+    url_list.write_text(f'https://abema.tv/video/title/{SERIES_ID}\nhttps://abema.tv/video/title/26-1\n',
+                        encoding='utf-8')
+    with FixtureServer(pages, etags=True) as site:
+        original = extractor_module.AbemaMetadataExtractor
+
+        def redirected(**kwargs):
+            return original(session=RedirectingSession(site.base_url), **kwargs)
+
+        # CLI は実行時に extractor モジュールから読み込むため、モジュール側を差し替える
+        monkeypatch.setattr(extractor_module, 'AbemaMetadataExtractor', redirected)
+        argv = ['watch', str(url_list), '--state', state_path, '--events', events_path, '--once']
+        main(argv)
+        # 2回目は確認時刻前のため通信しない
+        main(argv)
+        assert site.requests == 2
+
+    with open(events_path, encoding='utf-8') as f:
+        events = [json.loads(line) for line in f]
+    assert sorted((event['event'], event['series_id']) for event in events) == [
+        ('series_added', SERIES_ID), ('series_added', '26-1')]
+    assert len(load_states(state_path)) == 2
+    err = capsys.readouterr().err
+    assert '2 シリーズを確認しました' in err and '0 シリーズを確認しました' in err
+
+
+def test_watch_command_keeps_stdout_jsonl(tmp_path, monkeypatch, capsys):
+    """--events - と --stats / --metrics-json - を併用しても、標準出力は JSON Lines のみであることのテスト"""
+    import abema_metadata.extractor as extractor_module
+
+    url_list = tmp_path / 'watchlist.txt'
+    url_list.write_text(f'https://abema.tv/video/title/{SERIES_ID}\n', encoding='utf-8')
+    with FixtureServer(_site(2), etags=True) as site:
+        original = extractor_module.AbemaMetadataExtractor
+
+        def redirected(**kwargs):
+            return original(session=RedirectingSession(site.base_url), **kwargs)
+
+        monkeypatch.setattr(extractor_module, 'AbemaMetadataExtractor', redirected)
+        main(['watch', str(url_list), '--state', str(tmp_path / 'state.json'), '--once',
+              '--stats', '--metrics-json', '-'])
+
+    captured = capsys.readouterr()
+    events = [json.loads(line) for line in captured.out.splitlines()]
+    assert [event['event'] for event in events] == ['series_added']
+    assert '処理段階ごとの所要時間' in captured.err and '"watch.polls": 1' in captured.err